@@ -1,7 +1,9 @@
+import asyncio
 import json
+import logging
+import threading
 import time
-from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from poke_env.player import Player
 from poke_env.environment.battle import Battle
@@ -9,23 +11,51 @@ from poke_env.environment.move import Move
 from poke_env.environment.pokemon import Pokemon
 from poke_env.data.gen_data import GenData
 
-from helpers import move_type_damage_wrapper
+from helpers import compile_type_chart
+from executors import BoundedExecutor
+from embedding_cache import EmbeddingCache
+from embedding_service import EmbeddingService, batch_limit
+from embedding_storage import EmbeddingStorage
+from battle_log_writer import BattleLogWriter
+from memory_backends import AtlasMemoryBackend, MemoryBackend
+from state_renderer import BattleStateRenderer
+from decision_tiers import HeuristicConfig, TierDecision, TieredDecisionEngine
+from decision_cache import DecisionCache, canonical_state_key
+from streaming import IncrementalDecisionParser
+from outcomes import MemoryRanking, battle_outcome, outcome_record, outcome_update, utc_now
+from memory_prompt import MemoryPromptConfig, memory_line, summarize_memories
+from matchups import MatchupTable, matchup_table, team_from_battle, team_from_packed
+from battle_store import BattleStore, TurnRecord
+from llm_prompt import LLMPromptConfig, input_token_usage, llm_request, system_text, team_brief, turn_prompt
+from opponent_stats import OpponentStats, OpponentStatsConfig
+from prefetch import ContextState, Prefetch, PrefetchConfig, Prefetcher, context_state
+from bedrock_client import BedrockGateway, BedrockUnavailable, make_bedrock_client
+from instrumentation import Instrumentation, get_logger
 
-import boto3
 import re
 from pymongo import MongoClient
 
+logger = get_logger(__name__)
 
-# AWS Bedrock clients
-bedrock_runtime = boto3.client(
-    service_name="bedrock-runtime",
-    region_name="ap-southeast-2"  # adjust as needed
-)
+# Bump whenever battle_context changes, so stored vectors built from the old format
+# can be told apart (and re-embedded by embedding_backfill.py).
+CONTEXT_FORMAT_VERSION = 1
 
-bedrock_embeddings = boto3.client(
-    service_name="bedrock-runtime",
-    region_name="ap-southeast-2"
-)
+
+def format_context(state: ContextState) -> str:
+    return (
+        f"Active: {state.active}, "
+        f"Opponent: {state.opponent}, "
+        f"MyHP: {state.active_hp:.2f}, "
+        f"OpponentHP: {state.opponent_hp:.2f}, "
+        f"AvailableMoves: {list(state.moves)}, "
+        f"AvailableSwitches: {list(state.switches)}"
+    )
+
+
+def battle_context(battle: Battle) -> str:
+    """Concise, normalized context for embedding and retrieval."""
+    return format_context(context_state(battle))
 
 
 class ClaudePlayer(Player):
@@ -36,142 +66,491 @@ class ClaudePlayer(Player):
         db_name: str = "pokemon_ai",
         collection_name: str = "battle_logs",
         embedding_model_id: str = "amazon.titan-embed-text-v2:0",
+        bedrock_concurrency: int = 8,
+        embedding_concurrency: int = 8,
+        mongo_concurrency: int = 4,
+        embedding_cache_size: int = 4096,
+        embedding_cache_ttl_s: Optional[float] = 6 * 3600,
+        log_batch_size: int = 50,
+        log_flush_interval_s: float = 2.0,
+        log_spill_path: str = "battle_logs_spill.jsonl",
+        memory_backend: Optional[MemoryBackend] = None,
+        state_format: str = "text",
+        heuristic_config: Optional[HeuristicConfig] = None,
+        decision_cache_size: int = 2048,
+        decision_cache_ttl_s: Optional[float] = 7 * 24 * 3600,
+        decision_cache_path: Optional[str] = None,
+        llm_streaming: bool = True,
+        llm_deadline_s: Optional[float] = 25.0,
+        instrumentation: Optional[Instrumentation] = None,
+        memory_compatible_only: bool = False,
+        memory_ranking: Optional[MemoryRanking] = None,
+        memory_prompt: Optional[MemoryPromptConfig] = None,
+        precompute_matchups: bool = True,
+        max_retained_battles: Optional[int] = 100,
+        llm_gateway: Optional[BedrockGateway] = None,
+        embedding_gateway: Optional[BedrockGateway] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        embedding_batch_window_s: Optional[float] = 0.002,
+        embedding_storage: Optional[EmbeddingStorage] = None,
+        prefetch: Optional[PrefetchConfig] = None,
+        llm_prompt: Optional[LLMPromptConfig] = None,
+        opponent_stats: Optional[OpponentStatsConfig] = None,
         *args,
         **kwargs
     ):
         super().__init__(*args, **kwargs)
         self.gen = GenData.from_format("gen1ou")
         self.embedding_model_id = embedding_model_id
+        self.type_table = compile_type_chart(self.gen.type_chart)
+
+        # Stage spans, Bedrock token/byte counters and component gauges. Pass a shared
+        # Instrumentation(trace_path=..., ...) and call .serve(port) to export them.
+        self.instrumentation = Instrumentation() if instrumentation is None else instrumentation
+
+        # "text" keeps the prose sections; "json" is a compact rendering with fewer tokens.
+        self.state_format = state_format
+
+        # Our team is fixed for a battle, so its matchups against every gen 1 species are
+        # computed when the battle starts (once per team) and each turn only looks them up.
+        self.precompute_matchups = precompute_matchups
+
+        # Renderers and matchups per running battle, dropped when it ends. Only the last
+        # max_retained_battles finished battles stay in self.battles (None keeps them all);
+        # the n_*_battles counters still include the evicted ones.
+        self.battle_store = BattleStore(max_retained_battles)
+
+        # What each opponent species has revealed, how it switches and how our actions
+        # against it turned out, updated as turns are logged and checkpointed to disk.
+        self.opponent_stats = OpponentStats(opponent_stats)
+        if self.opponent_stats.config.enabled and self.opponent_stats.load():
+            logger.info("📈 Loaded opponent stats for %d species", len(self.opponent_stats))
+
+        # Forced and clear-cut turns are decided locally; the rest go to Claude.
+        self.decision_engine = TieredDecisionEngine(
+            self.type_table, heuristic_config, self.opponent_stats if self.opponent_stats.config.enabled else None
+        )
+        # Decisions from won battles, reused when the same position comes up again.
+        # decision_cache_path adds a sqlite tier shared across bot processes.
+        self.decision_cache = DecisionCache(decision_cache_size, decision_cache_ttl_s, decision_cache_path)
+
+        # Claude's reply is streamed and read only up to the first complete decision
+        # object. Past llm_deadline_s the turn goes out with whatever is usable so far
+        # (a partial answer, else the best heuristic option) instead of waiting on the
+        # Showdown turn timer.
+        self.llm_streaming = llm_streaming
+        self.llm_deadline_s = llm_deadline_s
+
+        # Requests open with the same system text and, per battle, the same team brief,
+        # both behind prompt-cache breakpoints; only memories and state change per turn.
+        self.llm_prompt = LLMPromptConfig() if llm_prompt is None else llm_prompt
+        self.llm_system = system_text(self.type_table)
+
+        # Blocking boto3/pymongo calls run on bounded thread pools so one slow
+        # round-trip doesn't stall every other battle on the event loop.
+        # A concurrency of 0 runs the call inline on the loop.
+        # Clients are created per player, so each bot process gets its own pools.
+        self.bedrock_runtime = make_bedrock_client(max(bedrock_concurrency, 1))
+        self.bedrock_embeddings = make_bedrock_client(max(embedding_concurrency, 1))
+        self.bedrock_executor = BoundedExecutor("bedrock", bedrock_concurrency)
+        self.embedding_executor = BoundedExecutor("embeddings", embedding_concurrency)
+        self.mongo_executor = BoundedExecutor("mongo", mongo_concurrency)
+        self.embedding_cache = EmbeddingCache(embedding_cache_size, embedding_cache_ttl_s)
+
+        # Rate limit, retries and circuit breaker per model (bedrock_client.BedrockPolicy).
+        # While the Claude breaker is open, LLM turns are played by the heuristic.
+        self.llm_gateway = BedrockGateway("llm") if llm_gateway is None else llm_gateway
+        self.embedding_gateway = BedrockGateway("embeddings") if embedding_gateway is None else embedding_gateway
+
+        # Titan output size and how vectors are stored and searched (int8/binary
+        # quantization, exact rerank); every logged turn records these settings.
+        self.embedding_storage = EmbeddingStorage() if embedding_storage is None else embedding_storage
+
+        # Titan requests from every battle go through one EmbeddingService: callers asking
+        # for a text already in flight share its request, and texts asked for within
+        # embedding_batch_window_s are dispatched together (in one request for models that
+        # take several texts). Pass one service to several players to share it process-wide.
+        if embedding_service is None:
+            max_batch = batch_limit(embedding_model_id)
+            embedding_service = EmbeddingService(
+                self._invoke_embedding_model,
+                self.embedding_executor,
+                self.embedding_gateway,
+                self.embedding_cache,
+                embed_batch=self._invoke_embedding_batch if max_batch > 1 else None,
+                max_batch=min(max_batch, 16) if max_batch > 1 else max(embedding_concurrency, 1) * 2,
+                window_s=embedding_batch_window_s,
+                max_in_flight=max(embedding_concurrency, 1),
+            )
+        self.embedding_service = embedding_service
 
         # MongoDB setup
-        self.mongo_client = MongoClient(mongo_uri)
+        self.mongo_client = MongoClient(mongo_uri, maxPoolSize=max(mongo_concurrency, 1) + 2)
         self.db = self.mongo_client[db_name]
         self.collection = self.db[collection_name]
         self.wins_collection = self.db["wins"]  # ✅ New collection for win/loss
 
-    # ----------------------------
-    # Embedding & Memory Functions
-    # ----------------------------
+        # Turn logs are written behind the decision, batched with insert_many.
+        self.log_writer = BattleLogWriter(
+            self.collection,
+            self.mongo_executor,
+            batch_size=log_batch_size,
+            flush_interval_s=log_flush_interval_s,
+            spill_path=log_spill_path,
+            instrumentation=self.instrumentation,
+        )
+        self._background_tasks = set()
+        # Background turn-log tasks per battle; the outcome is stamped once they're queued.
+        self._log_tasks = {}
+
+        # Retrieved memories are reranked by similarity, the outcome of their battle and
+        # their age, and only the best few go into the prompt.
+        self.memory_ranking = MemoryRanking() if memory_ranking is None else memory_ranking
+        # They're then grouped by action, near-duplicates collapsed, within a token budget.
+        self.memory_prompt = MemoryPromptConfig() if memory_prompt is None else memory_prompt
+
+        # Atlas $vectorSearch unless a local index (memory_backends.LocalVectorIndex) is given.
+        # memory_compatible_only restricts it to vectors from this embedding model and
+        # context format; turn it on once embedding_backfill.py has tagged the corpus.
+        if memory_backend is None:
+            memory_filter = {}
+            if memory_compatible_only:
+                memory_filter["embedding_model"] = {"$eq": embedding_model_id}
+                memory_filter["context_version"] = {"$eq": CONTEXT_FORMAT_VERSION}
+                memory_filter["embedding_dim"] = {"$eq": self.embedding_storage.dimensions}
+            if self.memory_ranking.enabled and self.memory_ranking.exclude_losses:
+                memory_filter["outcome"] = {"$ne": "loss"}
+            memory_backend = AtlasMemoryBackend(
+                self.collection, self.mongo_executor, filter=memory_filter or None, storage=self.embedding_storage
+            )
+        self.memory_backend = memory_backend
+
+        # While the opponent moves, the likely next states are embedded and searched
+        # ahead; an LLM turn whose state was predicted skips both on its critical path.
+        self.prefetcher = Prefetcher(self._get_embedding, self._search_memories, format_context, prefetch)
+
+        self.instrumentation.register_gauges("log_writer", self.log_writer.stats)
+        self.instrumentation.register_gauges("embedding_cache", self.embedding_cache.stats)
+        self.instrumentation.register_gauges("embedding_service", self.embedding_service.stats)
+        self.instrumentation.register_gauges("decision_cache", self.decision_cache.stats)
+        self.instrumentation.register_gauges("battle_store", self.battle_store.stats)
+        self.instrumentation.register_gauges("prefetch", self.prefetcher.stats)
+        self.instrumentation.register_gauges("opponent_stats", self.opponent_stats.stats)
+        for gateway in (self.llm_gateway, self.embedding_gateway):
+            self.instrumentation.register_gauges(f"bedrock_{gateway.name}", gateway.stats)
+        for executor in (self.bedrock_executor, self.embedding_executor, self.mongo_executor):
+            self.instrumentation.register_gauges(f"executor_{executor.name}", executor.stats)
+
+    async def _create_battle(self, split_message: List[str]):
+        battle = await super()._create_battle(split_message)
+        # Replays logs spilled before a restart, even if no turn gets logged.
+        self.log_writer.start()
+        state = self.battle_store.state(battle)
+        if self.precompute_matchups and self._team is not None and state.matchups is None:
+            try:
+                state.matchups = matchup_table(
+                    self.type_table, team_from_packed(self._team.yield_team()), self.gen.gen
+                )
+            except Exception as e:
+                logger.warning("⚠️ Matchup precomputation failed: %s", e, extra={"battle": battle.battle_tag})
+        return battle
 
-    def _get_embedding(self, text: str) -> Optional[List[float]]:
-        """Generate embedding using Amazon Titan."""
+    def _battle_matchups(self, battle: Battle) -> Optional[MatchupTable]:
+        """The battle's MatchupTable; rebuilt from the battle's own team if it doesn't cover it."""
+        if not self.precompute_matchups:
+            return None
+        state = self.battle_store.state(battle)
+        table = state.matchups
+        if table is None or any(p.species not in table.member_index for p in battle.team.values()):
+            if not battle.team:
+                return table
+            table = state.matchups = matchup_table(self.type_table, team_from_battle(battle), self.gen.gen)
+        return table
+
+    def _team_brief(self, battle: Battle) -> str:
+        """The prompt's per-battle section, rendered on the battle's first LLM turn."""
+        state = self.battle_store.state(battle)
+        if state.team_brief is None:
+            state.team_brief = team_brief(battle, self.type_table)
+        return state.team_brief
+
+    def _battle_finished_callback(self, battle: Battle):
+        self.battle_store.finish(self._battles, battle.battle_tag)
+        self.prefetcher.battle_finished(battle.battle_tag)
+        self.decision_cache.battle_finished(battle.battle_tag, battle.won)
+        if self.opponent_stats.config.enabled:
+            self.opponent_stats.battle_finished(battle.battle_tag, battle_outcome(battle))
+        self.instrumentation.finish_battle(battle.battle_tag, won=battle.won, turns=battle.turn)
+        task = asyncio.get_running_loop().create_task(self._record_outcome(battle))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _record_outcome(self, battle: Battle):
+        """Write the result to ``wins`` and stamp it on every turn of the battle in ``battle_logs``."""
+        # The battle's last turns may still be embedding or queued; they have to be in before the update.
+        pending = self._log_tasks.pop(battle.battle_tag, None)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self.log_writer.flush()
+        outcome = battle_outcome(battle)
         try:
-            body = json.dumps({"inputText": text})
-            response = bedrock_embeddings.invoke_model(
-                body=body,
-                modelId=self.embedding_model_id,
-                accept="application/json",
-                contentType="application/json"
+            await self.mongo_executor.run(self.wins_collection.insert_one, outcome_record(battle))
+            result = await self.mongo_executor.run(
+                self.collection.update_many, {"battle_id": battle.battle_tag}, outcome_update(battle)
+            )
+            logger.info(
+                "🏁 Battle %s: %s in %d turns (%s turn logs updated)",
+                battle.battle_tag, outcome, battle.turn, getattr(result, "modified_count", "?"),
+                extra={"battle": battle.battle_tag},
             )
-            response_body = json.loads(response.get("body").read())
-            return response_body["embedding"]
         except Exception as e:
-            print(f"⚠️ Embedding error: {e}")
-            return None
+            logger.warning("⚠️ Failed to record battle outcome: %s", e, extra={"battle": battle.battle_tag})
+        self.memory_backend.battle_finished(battle.battle_tag, outcome)
+        try:
+            await self.decision_cache.sync(self.mongo_executor)
+        except Exception as e:
+            logger.warning("⚠️ Decision cache sync failed: %s", e, extra={"battle": battle.battle_tag})
+
+    @property
+    def n_finished_battles(self) -> int:
+        return super().n_finished_battles + self.battle_store.evicted
+
+    @property
+    def n_won_battles(self) -> int:
+        return super().n_won_battles + self.battle_store.evicted_won
+
+    @property
+    def n_lost_battles(self) -> int:
+        return super().n_lost_battles + self.battle_store.evicted_lost
+
+    @property
+    def n_finished_turns(self) -> int:
+        """Turns played in finished battles, evicted ones included."""
+        return sum(b.turn for b in self._battles.values() if b.finished) + self.battle_store.evicted_turns
+
+    def reset_battles(self):
+        super().reset_battles()
+        self.battle_store.reset()
+
+    async def _drain_background_tasks(self):
+        self.prefetcher.cancel_all()
+        while self._background_tasks:
+            await asyncio.gather(*list(self._background_tasks), return_exceptions=True)
+
+    async def shutdown(self):
+        """Flush pending logs and release backend worker threads. Call once the player is done battling."""
+        if self._background_tasks:
+            # Tasks live on the loop battles run on (poke-env's own loop in agent.py).
+            loop = next(iter(self._background_tasks)).get_loop()
+            if loop is asyncio.get_running_loop():
+                await self._drain_background_tasks()
+            else:
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._drain_background_tasks(), loop))
+        await self.log_writer.close()
+        self.decision_cache.close()
+        if self.opponent_stats.config.enabled:
+            self.opponent_stats.save()
+        self.instrumentation.flush()
+        for executor in (self.bedrock_executor, self.embedding_executor, self.mongo_executor):
+            executor.shutdown(wait=False)
 
-    
-    def _get_battle_context(self, battle: Battle) -> str:
-        """Concise, normalized context for embedding and retrieval."""
-        my_team_hp = []
-        for pkmn in battle.team.values():
-            my_team_hp.append(f"{pkmn.species.lower()}:{pkmn.current_hp_fraction:.2f}")
-        return (
-            f"Active: {battle.active_pokemon.species.lower()}, "
-            f"Opponent: {battle.opponent_active_pokemon.species.lower()}, "
-            f"MyHP: {battle.active_pokemon.current_hp_fraction:.2f}, "
-            f"OpponentHP: {battle.opponent_active_pokemon.current_hp_fraction:.2f}, "
-            f"AvailableMoves: {[m.id for m in battle.available_moves]}, "
-            f"AvailableSwitches: {[p.species.lower() for p in battle.available_switches]}"
+    # ----------------------------
+    # Embedding & Memory Functions
+    # ----------------------------
+
+    def _invoke_embedding_model(self, text: str) -> List[float]:
+        if "titan-embed-text-v2" in self.embedding_model_id:
+            body = json.dumps(self.embedding_storage.titan_request(text))
+        else:
+            body = json.dumps({"inputText": text})
+        response = self.bedrock_embeddings.invoke_model(
+            body=body,
+            modelId=self.embedding_model_id,
+            accept="application/json",
+            contentType="application/json"
+        )
+        raw_body = response.get("body").read()
+        response_body = json.loads(raw_body)
+        self._count_bedrock(self.embedding_model_id, len(body), len(raw_body), response_body.get("inputTextTokenCount"), None)
+        return response_body["embedding"]
+
+    def _invoke_embedding_batch(self, texts: List[str]) -> List[List[float]]:
+        """One request for several texts, for models in `embedding_service.BATCH_LIMITS`.
+
+        Stored turns and queries are embedded the same way, so one input type serves both.
+        """
+        body = json.dumps({"texts": texts, "input_type": "search_document"})
+        response = self.bedrock_embeddings.invoke_model(
+            body=body,
+            modelId=self.embedding_model_id,
+            accept="application/json",
+            contentType="application/json"
         )
+        raw_body = response.get("body").read()
+        self._count_bedrock(self.embedding_model_id, len(body), len(raw_body), None, None)
+        return json.loads(raw_body)["embeddings"]
+
+    def _count_bedrock(
+        self, model_id: str, request_bytes: int, response_bytes: int, input_tokens, output_tokens,
+        cache_read_tokens: int = 0, cache_write_tokens: int = 0,
+    ):
+        """``bedrock_input_tokens`` counts uncached input only; prompt-cache reads and writes have their own counters."""
+        metrics = self.instrumentation
+        metrics.count("bedrock_requests", 1, model=model_id)
+        metrics.count("bedrock_request_bytes", request_bytes, model=model_id)
+        metrics.count("bedrock_response_bytes", response_bytes, model=model_id)
+        if input_tokens is not None:
+            metrics.count("bedrock_input_tokens", input_tokens, model=model_id)
+        if output_tokens is not None:
+            metrics.count("bedrock_output_tokens", output_tokens, model=model_id)
+        if cache_read_tokens:
+            metrics.count("bedrock_cache_read_tokens", cache_read_tokens, model=model_id)
+        if cache_write_tokens:
+            metrics.count("bedrock_cache_write_tokens", cache_write_tokens, model=model_id)
+
+    async def _get_embedding(self, text: str, deadline: Optional[float] = None) -> Optional[List[float]]:
+        """Generate embedding using Amazon Titan, served from the LRU cache when possible."""
+        return await self.embedding_service.embed(text, deadline)
 
     
-    def _get_battle_memories(self, battle: Battle, k: int = 3) -> str:
-        """Retrieve top-k similar past decisions using Atlas Vector Search."""
-        query_text = self._get_battle_context(battle)  
-        embedding = self._get_embedding(query_text)
-        if not embedding:
+    def _get_battle_context(self, battle: Battle) -> str:
+        return battle_context(battle)
+
+    async def _build_turn_context(self, battle: Battle, deadline: Optional[float] = None) -> TurnRecord:
+        context = self._get_battle_context(battle)
+        with self.instrumentation.span("embedding", battle.battle_tag):
+            embedding = await self._get_embedding(context, deadline)
+        return TurnRecord.from_battle(battle, context, embedding, deadline)
+
+    def _memory_candidates(self, k: Optional[int] = None) -> int:
+        """How many memories to fetch for a prompt of ``k``."""
+        ranking, prompt = self.memory_ranking, self.memory_prompt
+        k = ranking.k if k is None else k
+        return max(k, ranking.candidates) if ranking.enabled or prompt.enabled else k
+
+    async def _search_memories(self, embedding: List[float]) -> List[dict]:
+        return await self.memory_backend.search(embedding, self._memory_candidates())
+
+    async def _get_battle_memories(
+        self, turn: TurnRecord, k: Optional[int] = None, prefetched: Optional[List[dict]] = None
+    ) -> str:
+        """Retrieve similar past decisions from the memory backend, reranked by outcome and recency.
+
+        ``prefetched`` are candidates already searched for this turn by the `Prefetcher`.
+        """
+        embedding = turn.embedding
+        if not embedding and prefetched is None:
             return "No memory available (embedding failed)."
 
+        ranking, prompt = self.memory_ranking, self.memory_prompt
+        k = ranking.k if k is None else k
+        candidates = self._memory_candidates(k)
+        battle_tag = turn.battle_tag
         try:
-            pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": "vector_index",
-                        "path": "embedding",
-                        "queryVector": embedding,
-                        "numCandidates": 100,
-                        "limit": k
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 0,
-                        "thought": "$llm_decision_raw.thought",
-                        "action_type": 1,
-                        "action_name": 1,
-                        "turn": 1,
-                        "battle_id": 1,
-                        "fallback_used": 1,
-                        "score": {"$meta": "vectorSearchScore"}
-                    }
-                }
-            ]
-
-            results = list(self.collection.aggregate(pipeline))
+            if prefetched is None:
+                with self.instrumentation.span("memory_search", battle_tag, k=k, candidates=candidates):
+                    results = await self.memory_backend.search(embedding, candidates)
+            else:
+                results = prefetched
+            if ranking.enabled:
+                # With summarization on, every candidate close to the best is kept and k caps the action groups.
+                results = ranking.rerank(results, k=candidates if prompt.enabled else k)
             if not results:
                 return "No relevant past experiences found."
 
-            memory_lines = []
-            for res in results:
-                thought = res.get("thought", "No reasoning.")
-                action_type = res["action_type"]
-                action_name = res["action_name"]
-                score = res["score"]
-                fallback = "(fallback)" if res.get("fallback_used") else ""
-                memory_lines.append(
-                    f"- Similarity {score:.3f} {fallback} → {thought} → Action: {action_type} '{action_name}'"
-                )
-            return "\n".join(memory_lines)
+            if not prompt.enabled:
+                results = results[:k]
+                turn.memories_used = len(results)
+                return "\n".join(memory_line(res) for res in results)
+
+            with self.instrumentation.span("memory_summary", battle_tag) as span:
+                summary = summarize_memories(results, prompt, max_groups=k)
+                span.update(memories=summary.memories, tokens=summary.tokens, saved=summary.tokens_saved)
+            self.instrumentation.count("memory_prompts")
+            self.instrumentation.count("memory_prompt_tokens", summary.tokens)
+            self.instrumentation.count("memory_prompt_tokens_saved", summary.tokens_saved)
+            turn.memories_used = summary.memories
+            return summary.text or "No relevant past experiences found."
 
         except Exception as e:
-            print(f"⚠️ Vector search error: {e}")
+            logger.warning("⚠️ Vector search error: %s", e)
             return "Failed to retrieve memories."
 
-    def _log_action_to_mongodb(
+    def _build_log_entry(
+        self,
+        turn: TurnRecord,
+        battle_state_str: str,
+        decision: dict | None,
+        action_type: str,
+        action_name: str,
+        fallback_used: bool,
+        decision_tier: str = "llm",
+    ) -> dict:
+        return {
+            "timestamp": utc_now(),
+            "battle_id": turn.battle_tag,
+            "turn": turn.turn,
+            "player_username": turn.player_username,
+            "opponent_username": turn.opponent_username,
+            "observation": battle_state_str,
+            "llm_decision_raw": decision,
+            "action_type": action_type,
+            "action_name": action_name,
+            "fallback_used": fallback_used,
+            "decision_tier": decision_tier,
+            "active_pokemon": turn.active,
+            "opponent_active": turn.opponent_active,
+            "context": turn.context,
+            "context_version": CONTEXT_FORMAT_VERSION,
+            "embedding": turn.embedding,
+            "embedding_model": self.embedding_model_id if turn.embedding else None,
+            "memories_used": turn.memories_used,
+            "opponent_moves": list(turn.opponent_moves),
+            "opponent_fainted": list(turn.opponent_fainted),
+        }
+
+    def _observe_opponent(self, log_entry: dict):
+        """Feed the turn to the opponent-stats index; called in turn order, before logging."""
+        if self.opponent_stats.config.enabled:
+            self.opponent_stats.observe(log_entry)
+
+    async def _queue_log_entry(self, log_entry: dict):
+        with self.instrumentation.span("log_queue", log_entry["battle_id"]):
+            await self.log_writer.put(self.embedding_storage.encode_doc(log_entry))
+            self.memory_backend.add(log_entry)
+        logger.debug(
+            "💾 MEMORY QUEUED → Turn %s, Action: %s '%s' %s",
+            log_entry["turn"], log_entry["action_type"], log_entry["action_name"],
+            "(fallback)" if log_entry["fallback_used"] else "",
+        )
+
+    async def _log_action_to_mongodb(
         self,
-        battle: Battle,
+        turn: TurnRecord,
         battle_state_str: str,
         decision: dict | None,
         action_type: str,
         action_name: str,
         fallback_used: bool
     ):
-        """Log turn to MongoDB with embedding for future retrieval."""
+        """Queue the turn for MongoDB with its embedding for future retrieval."""
         try:
-            context = self._get_battle_context(battle)  
-            embedding = self._get_embedding(context)
-
-            log_entry = {
-                "timestamp": datetime.utcnow(),
-                "battle_id": battle.battle_tag,
-                "turn": battle.turn,
-                "player_username": battle.player_username,
-                "opponent_username": battle.opponent_username,
-                "observation": battle_state_str,
-                "llm_decision_raw": decision,
-                "action_type": action_type,
-                "action_name": action_name,
-                "fallback_used": fallback_used,
-                "active_pokemon": battle.active_pokemon.species,
-                "opponent_active": battle.opponent_active_pokemon.species,
-                "embedding": embedding,
-            }
-
-            self.collection.insert_one(log_entry)
-            print(f"💾 MEMORY LOGGED → Turn {battle.turn}, Action: {action_type} '{action_name}' {'(fallback)' if fallback_used else ''}")
+            log_entry = self._build_log_entry(turn, battle_state_str, decision, action_type, action_name, fallback_used)
+            self._observe_opponent(log_entry)
+            await self._queue_log_entry(log_entry)
+        except Exception as e:
+            logger.warning("⚠️ Failed to log to MongoDB: %s", e)
 
+    async def _log_tiered_decision(self, log_entry: dict, context: str):
+        """Embed and queue a locally decided turn after its order has gone out."""
+        try:
+            with self.instrumentation.span("embedding", log_entry["battle_id"], background=True):
+                log_entry["embedding"] = await self._get_embedding(context)
+            if log_entry["embedding"]:
+                log_entry["embedding_model"] = self.embedding_model_id
+            await self._queue_log_entry(log_entry)
         except Exception as e:
-            print(f"⚠️ Failed to log to MongoDB: {e}")
+            logger.warning("⚠️ Failed to log to MongoDB: %s", e)
 
     # ----------------------------
     # Battle Logic (Unchanged Core)
@@ -195,207 +574,370 @@ class ClaudePlayer(Player):
         return None
 
     def _format_battle_state(self, battle: Battle) -> str:
-        # ... (unchanged, so omitted for brevity) ...
-        # (Keep your existing _format_battle_state implementation)
-        active_pkmn = battle.active_pokemon
-        active_pkmn_type_str = " / ".join(t.name for t in active_pkmn.types)
-        active_pkmn_info = (
-            f"Your active Pokemon: {active_pkmn.species}\n"
-            f"Type: {active_pkmn_type_str}\n"
-            f"HP: {active_pkmn.current_hp_fraction * 100:.1f}% ({'Fainted' if active_pkmn.fainted else 'Active'})\n"
-            f"Status: {active_pkmn.status.name if active_pkmn.status else 'None'}\n"
-            f"Boosts: {active_pkmn.boosts}\n"
-        )
-
-        opponent_pkmn = battle.opponent_active_pokemon
-        opponent_type_str = " / ".join(t.name for t in opponent_pkmn.types)
-        opponent_pkmn_info = (
-            f"Opponent's active Pokemon: {opponent_pkmn.species}\n"
-            f"Type: {opponent_type_str}\n"
-            f"HP: {opponent_pkmn.current_hp_fraction * 100:.1f}% ({'Fainted' if opponent_pkmn.fainted else 'Active'})\n"
-            f"Status: {opponent_pkmn.status.name if opponent_pkmn.status else 'None'}\n"
-            f"Boosts: {opponent_pkmn.boosts}\n"
-        )
-
-        your_team_info = "Your full team status:\n"
-        for pkmn in battle.team.values():
-            hp_pct = pkmn.current_hp_fraction * 100
-            status = pkmn.status.name if pkmn.status else "None"
-            fainted_str = " (Fainted)" if pkmn.fainted else ""
-            active_str = " [ACTIVE]" if pkmn == battle.active_pokemon else ""
-            your_team_info += f"- {pkmn.species}: HP {hp_pct:.1f}%{fainted_str}, Status: {status}{active_str}\n"
-
-        opponent_team_info = "Opponent's known Pokémon:\n"
-        known_opponent_pokemon = set()
-        known_opponent_pokemon.add(battle.opponent_active_pokemon.species)
-        for pkmn in battle.opponent_team.values():
-            if pkmn.species not in known_opponent_pokemon:
-                known_opponent_pokemon.add(pkmn.species)
-        for species in sorted(known_opponent_pokemon):
-            opponent_team_info += f"- {species}\n"
-
-        opponent_type_list = []
-        opp = battle.opponent_active_pokemon
-        if opp.type_1:
-            opponent_type_list.append(opp.type_1.name)
-            if opp.type_2:
-                opponent_type_list.append(opp.type_2.name)
-
-        opponent_type_advantage_info = move_type_damage_wrapper(
-            battle.active_pokemon, self.gen.type_chart, opponent_type_list
-        ) or "No opponent type advantage."
-
-        available_moves_info = "Available moves:\n"
-        if battle.available_moves:
-            for move in battle.available_moves:
-                effectiveness = move_type_damage_wrapper(
-                    battle.opponent_active_pokemon, self.gen.type_chart, [move.type.name]
-                ) or "Neutral effectiveness"
-                available_moves_info += (
-                    f"- {move.id} (Type: {move.type.name}, BP: {move.base_power}, "
-                    f"Acc: {move.accuracy}, PP: {move.current_pp}/{move.max_pp}, "
-                    f"Cat: {move.category.name}) - {effectiveness}\n"
-                )
-        else:
-            available_moves_info += "- None (Must switch or Struggle)\n"
-
-        available_switches_info = "Available switches (non-fainted, not active):\n"
-        if battle.available_switches:
-            for pkmn in battle.available_switches:
-                available_switches_info += (
-                    f"- {pkmn.species} (HP: {pkmn.current_hp_fraction * 100:.1f}%, "
-                    f"Status: {pkmn.status.name if pkmn.status else 'None'})\n"
-                )
-        else:
-            available_switches_info += "- None\n"
-
-        state_parts = [
-            "📋 YOUR TEAM STATUS:\n" + your_team_info.strip(),
-            "⚡ YOUR ACTIVE POKÉMON:\n" + active_pkmn_info.strip(),
-            "🛡️ TYPE ADVANTAGE:\n" + opponent_type_advantage_info,
-            "💥 OPPONENT ACTIVE:\n" + opponent_pkmn_info.strip(),
-            "🌐 OPPONENT KNOWN TEAM:\n" + opponent_team_info.strip(),
-            "⚔️ AVAILABLE MOVES:\n" + available_moves_info.strip(),
-            "🔁 AVAILABLE SWITCHES:\n" + available_switches_info.strip()
-        ]
-
-        separator = "\n" + "-" * 40 + "\n"
-        return separator.join(state_parts)
+        """Render the battle state for the prompt, reusing sections unchanged since last turn."""
+        state = self.battle_store.state(battle)
+        renderer = state.renderer
+        if renderer is None:
+            renderer = state.renderer = BattleStateRenderer(
+                self.type_table, mode=self.state_format, matchups=self._battle_matchups(battle)
+            )
+        with self.instrumentation.span("state_format", battle.battle_tag):
+            return renderer.render(battle)
 
     # ----------------------------
     # LLM Decision with Memory
     # ----------------------------
 
-    async def _get_llm_decision(self, battle_state: str, battle: Battle) -> Optional[dict]:
-      
-        past_memories = self._get_battle_memories(battle, k=3)
-        print(f"\n🧠 RETRIEVED MEMORIES (k={len(past_memories.splitlines())}):")
-        if past_memories.startswith("No relevant") or past_memories.startswith("Failed"):
-            print(f"  🚫 {past_memories}")
-        else:
-            for line in past_memories.splitlines():
-                print(f"  ➤ {line}")
-
-        system_prompt = """
-You are an expert Pokémon battle strategist. Use both the current battle state and past experiences to make optimal decisions.
-Prioritize actions that succeeded in similar situations. Avoid strategies that failed (marked as 'fallback').
-""".strip()
-
-        user_prompt = f"""
---- PAST EXPERIENCES (most relevant first) ---
-{past_memories}
-
---- CURRENT BATTLE STATE ---
-{battle_state}
-
---- INSTRUCTIONS ---
-Respond with ONLY a valid JSON object. No extra text, markdown, or explanation.
-
-Valid formats:
-{{"thought":"<1-4 sentence reasoning>", "move":"<exact move name>"}}
-OR
-{{"thought":"<1-4 sentence reasoning>", "switch":"<exact pokemon species>"}}
-
-Begin your response now.
-""".strip()
-
+    def _invoke_llm_model(self, body: str, model_id: str, usage: Optional[dict] = None) -> str:
+        """``usage``, if given, is filled with the call's input tokens (`llm_prompt.input_token_usage`)."""
+        response = self.bedrock_runtime.invoke_model(
+            body=body,
+            modelId=model_id,
+            accept="application/json",
+            contentType="application/json"
+        )
+        raw_body = response["body"].read()
+        reported = json.loads(raw_body).get("usage", {})
+        tokens = input_token_usage(reported)
+        if usage is not None:
+            usage.update(tokens)
+        self._count_bedrock(
+            model_id, len(body), len(raw_body), tokens["input_tokens"], reported.get("output_tokens"),
+            tokens["cache_read_tokens"], tokens["cache_write_tokens"],
+        )
+        return raw_body.decode("utf-8")
+
+    def _stream_llm_model(self, body: str, model_id: str, emit, cancelled: threading.Event, usage: Optional[dict] = None):
+        """Read the response stream on a worker thread, passing each text delta to ``emit``.
+
+        Stops and closes the stream as soon as ``cancelled`` is set, so an early
+        decision doesn't keep the connection busy with the rest of the generation.
+        A stream closed early has no final usage event; its output tokens are counted
+        as the text deltas received. Input tokens come with ``message_start`` and go
+        into ``usage`` too, if given.
+        """
+        response = self.bedrock_runtime.invoke_model_with_response_stream(
+            body=body,
+            modelId=model_id,
+            accept="application/json",
+            contentType="application/json"
+        )
+        stream = response["body"]
+        received, deltas = 0, 0
+        tokens = input_token_usage(None)
+        output_tokens = None
         try:
-            prompt_config = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "system": system_prompt,
-                "messages": [{"role": "user", "content": [{"type": "text", "text": user_prompt}]}],
-            }
-
-            body = json.dumps(prompt_config)
-            modelId = "apac.anthropic.claude-sonnet-4-20250514-v1:0"
-
-            response = bedrock_runtime.invoke_model(
-                body=body,
-                modelId=modelId,
-                accept="application/json",
-                contentType="application/json"
+            for event in stream:
+                if cancelled.is_set():
+                    break
+                chunk = event.get("chunk")
+                if not chunk:
+                    continue
+                received += len(chunk["bytes"])
+                message = json.loads(chunk["bytes"])
+                if message.get("type") == "content_block_delta":
+                    deltas += 1
+                    emit(message["delta"].get("text", ""))
+                elif message.get("type") == "message_start":
+                    tokens = input_token_usage(message["message"].get("usage"))
+                    if usage is not None:
+                        usage.update(tokens)
+                elif message.get("type") == "message_delta":
+                    output_tokens = message.get("usage", {}).get("output_tokens")
+        finally:
+            stream.close()
+            self._count_bedrock(
+                model_id, len(body), received, tokens["input_tokens"], deltas if output_tokens is None else output_tokens,
+                tokens["cache_read_tokens"], tokens["cache_write_tokens"],
             )
 
-            raw_body = response["body"].read().decode("utf-8")
+    async def _stream_llm_decision(
+        self, body: str, model_id: str, deadline: Optional[float], battle_tag: Optional[str] = None,
+        usage: Optional[dict] = None,
+    ) -> Tuple[Optional[dict], str]:
+        """Stream the reply until a decision object completes, the stream ends or the deadline passes.
+
+        Returns the decision (possibly partial) and how reading ended: "early",
+        "complete" or "deadline". Time to the first text delta and the time spent
+        parsing are recorded as their own stages.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        emitted = threading.Event()
+        parser = IncrementalDecisionParser()
+
+        def emit(text: str):
+            emitted.set()
+            loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+        def finished(task: asyncio.Future):
+            if not task.cancelled():
+                task.exception()  # retrieved here; re-raised below if we're still reading
+            chunks.put_nowait(None)
+
+        # A stream that already produced text can't be retried without repeating it.
+        reader = asyncio.ensure_future(self.llm_gateway.call(
+            self.bedrock_executor, self._stream_llm_model, body, model_id, emit, cancelled, usage,
+            deadline=deadline, retry_if=lambda e: not emitted.is_set() and not cancelled.is_set(),
+        ))
+        reader.add_done_callback(finished)
+        started = loop.time()
+        first_text = True
+        parse_s = 0.0
+        try:
+            while True:
+                timeout = None if deadline is None else deadline - loop.time()
+                if timeout is not None and timeout <= 0:
+                    return parser.partial(), "deadline"
+                try:
+                    text = await asyncio.wait_for(chunks.get(), timeout)
+                except asyncio.TimeoutError:
+                    return parser.partial(), "deadline"
+                if text is None:
+                    reader.result()
+                    return parser.partial(), "complete"
+                if first_text:
+                    first_text = False
+                    self.instrumentation.observe("llm_first_token", loop.time() - started, battle_tag)
+                parse_started = time.perf_counter()
+                decision = parser.feed(text)
+                parse_s += time.perf_counter() - parse_started
+                if decision is not None:
+                    return decision, "early"
+        finally:
+            cancelled.set()
+            self.instrumentation.observe("llm_parse", parse_s, battle_tag, chars=len(parser.text))
+
+    async def _complete_llm_decision(
+        self, body: str, model_id: str, deadline: Optional[float], battle_tag: Optional[str] = None,
+        usage: Optional[dict] = None,
+    ) -> Tuple[Optional[dict], str]:
+        """Non-streaming path: wait for the whole reply, then pull out the JSON object."""
+        timeout = None if deadline is None else max(deadline - asyncio.get_running_loop().time(), 0.0)
+        try:
+            raw_body = await asyncio.wait_for(
+                self.llm_gateway.call(self.bedrock_executor, self._invoke_llm_model, body, model_id, usage, deadline=deadline),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            return None, "deadline"
+        with self.instrumentation.span("llm_parse", battle_tag, chars=len(raw_body)):
             response_body = json.loads(raw_body)
             raw_message = response_body["content"][0]["text"].strip()
 
             json_match = re.search(r"\{.*\}", raw_message, re.DOTALL)
             if not json_match:
-                print("❌ No JSON in LLM response")
-                return None
+                return None, "complete"
+            return json.loads(json_match.group(0)), "complete"
+
+    def _partial_fallback(self, decision: dict, reason: str) -> dict:
+        """An action read from an unfinished reply: played, but logged as a fallback and never cached."""
+        self.instrumentation.count("llm_fallbacks", reason=reason)
+        return {**decision, "fallback": reason}
+
+    def _heuristic_fallback(self, battle: Battle, reason: str) -> Optional[dict]:
+        """Best heuristic option, for turns Claude can't answer: past the deadline, breaker open or an error."""
+        self.instrumentation.count("llm_fallbacks", reason=reason)
+        if battle.opponent_active_pokemon is None:
+            return None
+        scored = self.decision_engine.score_options(battle, self._battle_matchups(battle))
+        if not scored:
+            return None
+        option, score = scored[0]
+        tiered = TierDecision("heuristic", option, score, 0.0, f"LLM unavailable ({reason}); best heuristic option.")
+        action_type, action_name = tiered.action
+        return {"thought": tiered.reason, action_type: action_name, "fallback": reason}
+
+    async def _get_llm_decision(
+        self, battle: Battle, battle_state: str, turn: TurnRecord, prefetched: Optional[List[dict]] = None
+    ) -> Optional[dict]:
+      
+        log_fields = {"battle": battle.battle_tag, "turn": battle.turn}
+        if not self.llm_gateway.available():
+            logger.warning("🔌 LLM circuit breaker open — using heuristic fallback", extra=log_fields)
+            return self._heuristic_fallback(battle, "breaker")
+        past_memories = await self._get_battle_memories(turn, prefetched=prefetched)
+        if logger.isEnabledFor(logging.DEBUG):
+            if past_memories.startswith("No relevant") or past_memories.startswith("Failed"):
+                logger.debug("🧠 RETRIEVED MEMORIES: 🚫 %s", past_memories, extra=log_fields)
+            else:
+                lines = past_memories.splitlines()
+                logger.debug(
+                    "🧠 RETRIEVED MEMORIES (k=%d):\n%s", len(lines), "\n".join(f"  ➤ {line}" for line in lines), extra=log_fields
+                )
 
-            json_str = json_match.group(0)
-            return json.loads(json_str)
+        try:
+            opponent_model = None
+            if self.opponent_stats.config.enabled:
+                opponent_model = self.opponent_stats.summary(turn.opponent_active)
+            request = llm_request(
+                self.llm_system,
+                self._team_brief(battle),
+                turn_prompt(past_memories, battle_state, opponent_model),
+                self.llm_prompt,
+            )
+            body = json.dumps(request)
+            modelId = self.llm_prompt.model_id
 
+            # Input tokens of this call (uncached, cache read, cache write) go on its span.
+            with self.instrumentation.span("llm_call", battle.battle_tag, streaming=self.llm_streaming) as span:
+                if self.llm_streaming:
+                    decision, ended = await self._stream_llm_decision(body, modelId, turn.deadline, battle.battle_tag, span)
+                else:
+                    decision, ended = await self._complete_llm_decision(body, modelId, turn.deadline, battle.battle_tag, span)
+                span["ended"] = ended
+
+            if ended == "deadline":
+                if decision is not None:
+                    logger.warning("⏰ LLM deadline (%ss) passed — using partial answer", self.llm_deadline_s, extra=log_fields)
+                    return self._partial_fallback(decision, "deadline")
+                logger.warning("⏰ LLM deadline (%ss) passed — using heuristic fallback", self.llm_deadline_s, extra=log_fields)
+                return self._heuristic_fallback(battle, "deadline")
+            if decision is None:
+                logger.warning("❌ No JSON in LLM response", extra=log_fields)
+            elif decision.get("partial"):
+                logger.warning("✂️ LLM reply ended inside the JSON — using partial answer", extra=log_fields)
+                return self._partial_fallback(decision, "truncated")
+            return decision
+
+        except BedrockUnavailable as e:
+            logger.warning("🔌 %s — using heuristic fallback", e, extra=log_fields)
+            return self._heuristic_fallback(battle, "breaker")
         except Exception as e:
-            print(f"💥 LLM error: {e}")
-            return None
+            logger.error("💥 LLM error: %s — using heuristic fallback", e, extra=log_fields)
+            return self._heuristic_fallback(battle, "error")
 
     # ----------------------------
     # Main Action Loop
     # ----------------------------
 
     async def choose_move(self, battle: Battle) -> str:
+        started = time.perf_counter()
+        prefetched = self.prefetcher.take(battle)
+        cache_key = canonical_state_key(battle)
+        tiered = self.decision_engine.decide(battle, self._battle_matchups(battle)) or self._cached_decision(battle, cache_key)
+        if tiered is not None:
+            self.prefetcher.drop(prefetched)
+            order = self._play_tiered_decision(battle, tiered)
+        else:
+            order = await self._choose_llm_move(battle, cache_key, prefetched)
+        elapsed = time.perf_counter() - started
+        tier = tiered.tier if tiered else "llm"
+        self.decision_engine.record(tier, elapsed)
+        self.instrumentation.observe("turn", elapsed, battle.battle_tag, tier=tier, turn=battle.turn)
+        # Predicted from this turn's state, before new messages update the battle; the
+        # prefetches themselves only run once the order has gone out.
+        self.prefetcher.schedule(battle, getattr(order, "order", None))
+        return order
+
+    def _resolve_decision(self, battle: Battle, decision: dict) -> Optional[Move | Pokemon]:
+        """The legal move or switch a decision names, if any."""
+        if "move" in decision:
+            chosen_move = self._find_move_by_name(battle, decision["move"])
+            if chosen_move and chosen_move in battle.available_moves:
+                return chosen_move
+        elif "switch" in decision:
+            chosen_switch = self._find_pokemon_by_name(battle, decision["switch"])
+            if chosen_switch and chosen_switch in battle.available_switches and not chosen_switch.fainted:
+                return chosen_switch
+        return None
+
+    def _cached_decision(self, battle: Battle, cache_key: str) -> Optional[TierDecision]:
+        decision = self.decision_cache.get(cache_key)
+        if decision is None:
+            return None
+        option = self._resolve_decision(battle, decision)
+        if option is None:
+            return None
+        return TierDecision("cache", option, 0.0, 1.0, decision.get("thought", "Cached decision."))
+
+    def _play_tiered_decision(self, battle: Battle, tiered: TierDecision):
+        """Return the local decision's order now; embedding and logging happen in the background."""
+        action_type, action_name = tiered.action
+        logger.info(
+            "⚡ %s ACTION: %s '%s' — %s", tiered.tier.upper(), action_type, action_name, tiered.reason,
+            extra={"battle": battle.battle_tag, "turn": battle.turn},
+        )
+        order = self.create_order(tiered.option) if tiered.option is not None else self.choose_default_move()
+
+        turn = TurnRecord.from_battle(battle, self._get_battle_context(battle))
+        decision = {"thought": tiered.reason, action_type: action_name, "tier": tiered.tier, "margin": tiered.margin}
+        log_entry = self._build_log_entry(
+            turn, self._format_battle_state(battle), decision, action_type, action_name, False, tiered.tier
+        )
+        self._observe_opponent(log_entry)
+        task = asyncio.get_running_loop().create_task(self._log_tiered_decision(log_entry, turn.context))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        battle_logs = self._log_tasks.setdefault(battle.battle_tag, set())
+        battle_logs.add(task)
+        task.add_done_callback(battle_logs.discard)
+        return order
+
+    def _remember_decision(self, battle: Battle, cache_key: str, decision: dict):
+        cached = {k: decision[k] for k in ("thought", "move", "switch") if k in decision}
+        self.decision_cache.record(battle.battle_tag, cache_key, cached, fallback_used=False)
+
+    async def _choose_llm_move(self, battle: Battle, cache_key: str, prefetched: Optional[Prefetch] = None):
+        deadline = None
+        if self.llm_deadline_s is not None:
+            deadline = asyncio.get_running_loop().time() + self.llm_deadline_s
         battle_state_str = self._format_battle_state(battle)
-        
-        print(f"\n" + "="*60)
-        print(f"🔥 TURN {battle.turn} | BATTLE ID: {battle.battle_tag}")
-        print("="*60)
-        print("📊 OBSERVATION:")
-        print(battle_state_str)
+        log_fields = {"battle": battle.battle_tag, "turn": battle.turn}
 
-        decision = await self._get_llm_decision(battle_state_str, battle)
+        logger.info("🔥 TURN %d | BATTLE ID: %s", battle.turn, battle.battle_tag, extra=log_fields)
+        logger.debug("📊 OBSERVATION:\n%s", battle_state_str, extra=log_fields)
+
+        candidates = await self.prefetcher.resolve(prefetched, deadline)
+        if candidates is None:
+            turn = await self._build_turn_context(battle, deadline)
+            decision = await self._get_llm_decision(battle, battle_state_str, turn)
+        else:
+            # Memories were searched for this state ahead of time; the turn's own context
+            # is only needed for the log, so it's embedded alongside the LLM call.
+            turn = TurnRecord.from_battle(battle, self._get_battle_context(battle), None, deadline)
+            embedding = asyncio.ensure_future(self._get_embedding(turn.context, deadline))
+            try:
+                decision = await self._get_llm_decision(battle, battle_state_str, turn, candidates)
+            finally:
+                turn.embedding = await embedding
 
         if decision:
+            # A heuristic pick made because Claude couldn't answer, or an action read from an
+            # unfinished reply, counts as a fallback: logged as one and never cached.
+            fallback_used = bool(decision.get("fallback") or decision.get("partial"))
             thought = decision.get("thought", "No reasoning provided.")
-            print(f"\n🧠 LLM THOUGHT:\n{thought}")
+            logger.info("🧠 LLM THOUGHT: %s", thought, extra=log_fields)
 
             if "move" in decision:
                 move_name = decision["move"]
                 chosen_move = self._find_move_by_name(battle, move_name)
                 if chosen_move and chosen_move in battle.available_moves:
-                    print(f"\n✅ LLM ACTION: Using move '{chosen_move.id}'")
+                    logger.info("✅ LLM ACTION: Using move '%s'", chosen_move.id, extra=log_fields)
                     order = self.create_order(chosen_move)
-                    self._log_action_to_mongodb(battle, battle_state_str, decision, "move", chosen_move.id, False)
+                    await self._log_action_to_mongodb(turn, battle_state_str, decision, "move", chosen_move.id, fallback_used)
+                    if not fallback_used:
+                        self._remember_decision(battle, cache_key, decision)
                     return order
                 else:
-                    print(f"⚠️ Invalid move: '{move_name}' — falling back.")
+                    logger.warning("⚠️ Invalid move: '%s' — falling back.", move_name, extra=log_fields)
 
             elif "switch" in decision:
                 pokemon_name = decision["switch"]
                 chosen_switch = self._find_pokemon_by_name(battle, pokemon_name)
                 if chosen_switch and chosen_switch in battle.available_switches and not chosen_switch.fainted:
-                    print(f"\n✅ LLM ACTION: Switching to '{chosen_switch.species}'")
+                    logger.info("✅ LLM ACTION: Switching to '%s'", chosen_switch.species, extra=log_fields)
                     order = self.create_order(chosen_switch)
-                    self._log_action_to_mongodb(battle, battle_state_str, decision, "switch", chosen_switch.species, False)
+                    await self._log_action_to_mongodb(turn, battle_state_str, decision, "switch", chosen_switch.species, fallback_used)
+                    if not fallback_used:
+                        self._remember_decision(battle, cache_key, decision)
                     return order
                 else:
-                    print(f"⚠️ Invalid switch: '{pokemon_name}' — falling back.")
+                    logger.warning("⚠️ Invalid switch: '%s' — falling back.", pokemon_name, extra=log_fields)
 
         # Fallback
-        print(f"\n🔄 FALLBACK: Choosing random move/switch...")
+        logger.warning("🔄 FALLBACK: Choosing random move/switch...", extra=log_fields)
         available_options = battle.available_moves + battle.available_switches
         if available_options:
             order = self.choose_random_move(battle)
@@ -410,6 +952,6 @@ Begin your response now.
         else:
             action_type, action_name = "default", "struggle"
 
-        self._log_action_to_mongodb(battle, battle_state_str, decision, action_type, action_name, True)
-        print(f"✅ Fallback action logged: {action_type} '{action_name}'")
+        await self._log_action_to_mongodb(turn, battle_state_str, decision, action_type, action_name, True)
+        logger.info("✅ Fallback action logged: %s '%s'", action_type, action_name, extra=log_fields)
         return order
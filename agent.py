@@ -6,6 +6,7 @@ from poke_env import AccountConfiguration, LocalhostServerConfiguration
 from poke_env.teambuilder import Teambuilder
 
 from ClaudePlayer import ClaudePlayer
+from instrumentation import configure_logging
 
 team_1 = """
 Squirtle  
@@ -54,6 +55,7 @@ class LLMTeam(Teambuilder):
 
 
 async def main():
+    configure_logging()
     mongo_uri = os.getenv("MONGO_URI")
     if mongo_uri is None:
         raise ValueError("MONGO_URI environment variable is not set.")
@@ -69,6 +71,7 @@ async def main():
 
     await player.send_challenges("human_player1", n_challenges=1)
     # await player.accept_challenges('caveman_h00man', 1)
+    await player.shutdown()
 
 
 if __name__ == "__main__":
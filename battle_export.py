@@ -0,0 +1,491 @@
+"""Export finished battles from ``battle_logs`` and ``wins`` to partitioned Parquet files.
+
+    python battle_export.py --out exports/                      # battles finished since the last export
+    python battle_export.py --out exports/ --since 2026-01-01   # and not before this date
+    python battle_export.py --out exports/ --full               # ignore the watermark
+    python battle_export.py --out exports/ --lag-minutes 30     # leave the last 30 minutes for the next run
+
+Needs pyarrow (``pip install "pokemon-showdown-ai-agent[export]"``).
+
+The export pages through ``wins`` in ``_id`` order and fetches the turns of each page's
+battles from ``battle_logs``. A battle is exported once it has ended and its outcome is
+stamped, with all its turns. Files are hive-partitioned by the day the battle ended and
+its format:
+
+    exports/battle_logs/date=2026-10-17/format=gen1ou/part-<first wins _id>.parquet
+    exports/wins/date=2026-10-17/format=gen1ou/part-<first wins _id>.parquet
+
+Turn features become typed columns:
+- species names, plus their gen 1 dex numbers as ``*_species_id``
+- HP fractions and the available moves and switches, from the stored ``context``
+- ``action_type``, ``decision_tier`` and ``outcome`` as dictionary-encoded enums, with
+  the same codes in every file
+- ``embedding`` as a fixed-size float32 list of ``--dimensions`` values
+
+Quantized embeddings are exported from their ``embedding_full`` copy when there is one.
+Otherwise an int8 vector is kept as its codes and a binary vector as ±1, and
+``embedding_quantization`` says which. Vectors of another size are left null.
+
+Files are written under a dot name (which readers skip) and renamed when complete: a
+partition's files are closed once a page no longer touches its day. The last exported
+``wins`` ``_id`` is kept in ``<out>/_watermark.json``, and each run picks up after it.
+
+``wins`` ids are ObjectIds made by the bot processes, so they are only roughly in
+insert order: a win can be inserted after one with a later ``_id``, and a watermark
+past it would skip it for good. Each run therefore only exports wins whose ``_id`` is
+older than ``--lag-minutes`` (10 by default), which has to cover how late an insert can
+land and the clock skew between bot hosts. The rest wait for the next run.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import json_util
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from poke_env.data.gen_data import GenData
+
+from decision_tiers import TIERS
+from embedding_storage import from_bson_vector
+from instrumentation import configure_logging, get_logger
+from outcomes import OUTCOMES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only the export needs it
+    pa = pq = None
+
+logger = get_logger(__name__)
+
+# Bump when a column changes; it's written into every file's metadata.
+EXPORT_VERSION = 1
+ACTION_TYPES = ("move", "switch", "default")
+# Columns stored as int8 codes into a fixed list of values.
+ENUMS = {"action_type": ACTION_TYPES, "decision_tier": TIERS, "outcome": OUTCOMES}
+
+# battle_logs fields read by the export (embedding_full only exists with an exact rerank).
+LOG_PROJECTION = {
+    "battle_id": 1, "turn": 1, "timestamp": 1, "player_username": 1, "opponent_username": 1,
+    "active_pokemon": 1, "opponent_active": 1, "context": 1, "observation": 1, "llm_decision_raw": 1,
+    "action_type": 1, "action_name": 1, "decision_tier": 1, "fallback_used": 1, "memories_used": 1,
+    "opponent_moves": 1, "opponent_fainted": 1, "outcome": 1, "won": 1, "battle_turns": 1,
+    "embedding": 1, "embedding_full": 1, "embedding_model": 1,
+}
+
+# `battle_context` (context_version 1): HPs and the available moves and switches.
+_CONTEXT = re.compile(r"MyHP: ([\d.]+), OpponentHP: ([\d.]+), AvailableMoves: \[(.*?)\], AvailableSwitches: \[(.*?)\]")
+_QUOTED = re.compile(r"'([^']*)'")
+
+_dex_numbers: Dict[str, int] = {}
+
+
+def species_id(species: Optional[str]) -> Optional[int]:
+    """Gen 1 dex number of a species id, or None."""
+    if not _dex_numbers:
+        _dex_numbers.update({sid: entry["num"] for sid, entry in GenData.from_gen(1).pokedex.items() if entry["num"] > 0})
+    return _dex_numbers.get(species) if species else None
+
+
+def battle_format(battle_id: str) -> str:
+    """``gen1ou`` from ``battle-gen1ou-12345``."""
+    parts = battle_id.split("-")
+    return parts[1] if len(parts) >= 3 else "unknown"
+
+
+def context_fields(context: Optional[str]) -> Tuple[Optional[float], Optional[float], Optional[List[str]], Optional[List[str]]]:
+    match = _CONTEXT.search(context) if context else None
+    if match is None:
+        return None, None, None, None
+    my_hp, opponent_hp, moves, switches = match.groups()
+    return float(my_hp), float(opponent_hp), _QUOTED.findall(moves), _QUOTED.findall(switches)
+
+
+def embedding_vector(doc: dict, dimensions: int) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """The turn's embedding as float32 values and their quantization, or None if it has none of this size."""
+    stored = doc.get("embedding_full") or doc.get("embedding")
+    if not stored:
+        return None, None
+    if isinstance(stored, (bytes, Binary)):
+        vector = from_bson_vector(stored)
+        quantization = {np.dtype("<f4"): "float", np.dtype("<i1"): "int8"}.get(vector.dtype, "binary")
+        if quantization == "binary":  # unpacked sign bits
+            vector = vector.astype(np.float32) * 2 - 1
+    else:
+        vector, quantization = np.asarray(stored), "float"
+    if vector.shape != (dimensions,):
+        return None, None
+    return vector.astype(np.float32, copy=False), quantization
+
+
+def _enum_type():
+    return pa.dictionary(pa.int8(), pa.string())
+
+
+def _enum_array(items: List[Optional[str]], values: Tuple[str, ...]):
+    """Dictionary array over the fixed ``values``, so every file uses the same codes."""
+    codes = {value: i for i, value in enumerate(values)}
+    return pa.DictionaryArray.from_arrays(pa.array([codes.get(item) for item in items], pa.int8()), pa.array(values))
+
+
+def log_schema(dimensions: int):
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("_id", pa.string()),
+        ("battle_id", pa.string()),
+        ("turn", pa.int16()),
+        ("timestamp", pa.timestamp("ms")),
+        ("player_username", labels),
+        ("opponent_username", labels),
+        ("active_species", labels),
+        ("active_species_id", pa.int16()),
+        ("opponent_species", labels),
+        ("opponent_species_id", pa.int16()),
+        ("active_hp", pa.float32()),
+        ("opponent_hp", pa.float32()),
+        ("available_moves", pa.list_(pa.string())),
+        ("available_switches", pa.list_(pa.string())),
+        ("opponent_moves", pa.list_(pa.string())),
+        ("opponent_fainted", pa.list_(pa.string())),
+        ("action_type", _enum_type()),
+        ("action_name", labels),
+        ("decision_tier", _enum_type()),
+        ("fallback_used", pa.bool_()),
+        ("memories_used", pa.int16()),
+        ("thought", pa.string()),
+        ("outcome", _enum_type()),
+        ("won", pa.bool_()),
+        ("battle_turns", pa.int16()),
+        ("embedding_model", labels),
+        ("embedding_quantization", labels),
+        ("embedding", pa.list_(pa.float32(), dimensions)),
+        ("observation", pa.string()),
+    ], metadata={"export_version": str(EXPORT_VERSION)})
+
+
+def wins_schema():
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("_id", pa.string()),
+        ("battle_id", pa.string()),
+        ("timestamp", pa.timestamp("ms")),
+        ("player_username", labels),
+        ("opponent_username", labels),
+        ("outcome", _enum_type()),
+        ("won", pa.bool_()),
+        ("turns", pa.int16()),
+    ], metadata={"export_version": str(EXPORT_VERSION)})
+
+
+def log_table(docs: List[dict], dimensions: int):
+    """One Arrow table of turn logs."""
+    columns: Dict[str, list] = {name: [] for name in log_schema(dimensions).names if name != "embedding"}
+    vectors = np.zeros((len(docs), dimensions), dtype=np.float32)
+    missing = np.ones(len(docs), dtype=bool)
+    for row, doc in enumerate(docs):
+        active_hp, opponent_hp, moves, switches = context_fields(doc.get("context"))
+        decision = doc.get("llm_decision_raw") or {}
+        vector, quantization = embedding_vector(doc, dimensions)
+        if vector is not None:
+            vectors[row] = vector
+            missing[row] = False
+        values = {
+            "_id": str(doc.get("_id")),
+            "battle_id": doc.get("battle_id"),
+            "turn": doc.get("turn"),
+            "timestamp": doc.get("timestamp"),
+            "player_username": doc.get("player_username"),
+            "opponent_username": doc.get("opponent_username"),
+            "active_species": doc.get("active_pokemon"),
+            "active_species_id": species_id(doc.get("active_pokemon")),
+            "opponent_species": doc.get("opponent_active"),
+            "opponent_species_id": species_id(doc.get("opponent_active")),
+            "active_hp": active_hp,
+            "opponent_hp": opponent_hp,
+            "available_moves": moves,
+            "available_switches": switches,
+            "opponent_moves": doc.get("opponent_moves"),
+            "opponent_fainted": doc.get("opponent_fainted"),
+            "action_type": doc.get("action_type"),
+            "action_name": doc.get("action_name"),
+            "decision_tier": doc.get("decision_tier"),
+            "fallback_used": doc.get("fallback_used"),
+            "memories_used": doc.get("memories_used"),
+            "thought": decision.get("thought") if isinstance(decision, dict) else None,
+            "outcome": doc.get("outcome"),
+            "won": doc.get("won"),
+            "battle_turns": doc.get("battle_turns"),
+            "embedding_model": doc.get("embedding_model"),
+            "embedding_quantization": quantization,
+            "observation": doc.get("observation"),
+        }
+        for name, value in values.items():
+            columns[name].append(value)
+
+    schema = log_schema(dimensions)
+    arrays = []
+    for field in schema:
+        if field.name == "embedding":
+            arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), dimensions, mask=pa.array(missing)))
+        elif field.name in ENUMS:
+            arrays.append(_enum_array(columns[field.name], ENUMS[field.name]))
+        else:
+            arrays.append(pa.array(columns[field.name], field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def wins_table(docs: List[dict]):
+    schema = wins_schema()
+    columns = {
+        "_id": [str(doc["_id"]) for doc in docs],
+        "battle_id": [doc.get("battle_id") for doc in docs],
+        "timestamp": [doc.get("timestamp") for doc in docs],
+        "player_username": [doc.get("player_username") for doc in docs],
+        "opponent_username": [doc.get("opponent_username") for doc in docs],
+        "won": [doc.get("won") for doc in docs],
+        "turns": [doc.get("turns") for doc in docs],
+    }
+    arrays = [
+        _enum_array([doc.get("outcome") for doc in docs], OUTCOMES) if field.name == "outcome"
+        else pa.array(columns[field.name], field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def partition_of(win: dict) -> str:
+    """``date=YYYY-MM-DD/format=<format>`` of a finished battle."""
+    ended = win.get("timestamp")
+    if not isinstance(ended, datetime):
+        ended = win["_id"].generation_time if isinstance(win.get("_id"), ObjectId) else datetime.now(timezone.utc)
+    return f"date={ended:%Y-%m-%d}/format={battle_format(win.get('battle_id') or '')}"
+
+
+class BattleExport:
+    """Streams finished battles from Mongo into partitioned Parquet files under ``out_dir``.
+
+    Pages of ``page_size`` battles are read one at a time. Each page becomes a row
+    group in the file of every partition it touches, so memory stays at about one page.
+    Pages come in ``_id`` order, so once one doesn't touch a day, that day's files are
+    complete and are closed. Only wins older than ``lag_s`` are exported (None exports
+    up to now).
+    """
+
+    def __init__(
+        self,
+        wins_collection,
+        logs_collection,
+        out_dir: str,
+        dimensions: int = 1024,
+        page_size: int = 500,
+        compression: str = "zstd",
+        include_observation: bool = True,
+        lag_s: Optional[float] = 600.0,
+    ):
+        if pa is None:
+            raise ImportError('battle_export needs pyarrow: pip install "pokemon-showdown-ai-agent[export]"')
+        self.wins = wins_collection
+        self.logs = logs_collection
+        self.out_dir = out_dir
+        self.dimensions = dimensions
+        self.page_size = page_size
+        self.compression = compression
+        self.include_observation = include_observation
+        self.lag_s = lag_s
+        self.watermark_path = os.path.join(out_dir, "_watermark.json")
+        self._writers: Dict[Tuple[str, str], Tuple[str, str, "pq.ParquetWriter"]] = {}
+
+        self.pages = 0
+        self.battles = 0
+        self.turns = 0
+        self.embeddings = 0
+        self.files = 0
+        self.bytes_written = 0
+        self.elapsed_s = 0.0
+
+    # ----------------------------
+    # Watermark
+    # ----------------------------
+
+    def load_watermark(self):
+        """The last ``wins`` ``_id`` exported, if any."""
+        if not os.path.exists(self.watermark_path):
+            return None
+        with open(self.watermark_path, encoding="utf-8") as f:
+            watermark = json_util.loads(f.read())
+        if watermark.get("version") != EXPORT_VERSION or watermark.get("dimensions") != self.dimensions:
+            logger.warning("⚠️ Ignoring export watermark written with other settings: %s", self.watermark_path)
+            return None
+        return watermark.get("after")
+
+    def save_watermark(self, after):
+        watermark = {"after": after, "version": EXPORT_VERSION, "dimensions": self.dimensions, "saved_at": datetime.now(timezone.utc)}
+        tmp_path = self.watermark_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps(watermark))
+        os.replace(tmp_path, self.watermark_path)
+
+    # ----------------------------
+    # Paging
+    # ----------------------------
+
+    def _wins_page(self, after, since: Optional[datetime], before: Optional[ObjectId]) -> List[dict]:
+        query = {"outcome": {"$in": list(OUTCOMES)}}
+        ids = {}
+        if after is not None:
+            ids["$gt"] = after
+        if before is not None:
+            ids["$lt"] = before
+        if ids:
+            query["_id"] = ids
+        if since is not None:
+            query["timestamp"] = {"$gte": since}
+        return list(self.wins.find(query).sort("_id", 1).limit(self.page_size))
+
+    def _turns(self, battle_ids: List[str]) -> Dict[str, List[dict]]:
+        projection = dict(LOG_PROJECTION)
+        if not self.include_observation:
+            del projection["observation"]
+        turns: Dict[str, List[dict]] = {battle_id: [] for battle_id in battle_ids}
+        for doc in self.logs.find({"battle_id": {"$in": battle_ids}}, projection):
+            turns[doc["battle_id"]].append(doc)
+        for docs in turns.values():
+            docs.sort(key=lambda doc: doc.get("turn") or 0)
+        return turns
+
+    def export_page(self, wins: List[dict], turns: Dict[str, List[dict]], part: str):
+        """Append one page of battles to the files of their partitions, and close the
+        files of days it doesn't touch."""
+        by_partition: Dict[str, Tuple[List[dict], List[dict]]] = {}
+        for win in wins:
+            partition = by_partition.setdefault(partition_of(win), ([], []))
+            partition[0].append(win)
+            partition[1].extend(turns.get(win["battle_id"], ()))
+        for partition, (page_wins, page_turns) in by_partition.items():
+            self._write("wins", partition, part, wins_table(page_wins))
+            if page_turns:
+                table = log_table(page_turns, self.dimensions)
+                self.embeddings += len(page_turns) - table.column("embedding").null_count
+                self._write("battle_logs", partition, part, table)
+            self.turns += len(page_turns)
+        self.battles += len(wins)
+        self.pages += 1
+        self._close_files(keep_dates={partition.split("/", 1)[0] for partition in by_partition})
+
+    def _write(self, table_name: str, partition: str, part: str, table):
+        key = (table_name, partition)
+        entry = self._writers.get(key)
+        if entry is None:
+            directory = os.path.join(self.out_dir, table_name, partition)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{part}.parquet")
+            tmp_path = os.path.join(directory, f".part-{part}.parquet.tmp")
+            writer = pq.ParquetWriter(tmp_path, table.schema, compression=self.compression)
+            entry = self._writers[key] = (path, tmp_path, writer)
+        entry[2].write_table(table)
+
+    def _close_files(self, keep_dates=frozenset()):
+        """Finish the open files, except those of the ``date=...`` partitions in ``keep_dates``."""
+        for key in [key for key in self._writers if key[1].split("/", 1)[0] not in keep_dates]:
+            path, tmp_path, writer = self._writers.pop(key)
+            writer.close()
+            os.replace(tmp_path, path)
+            self.files += 1
+            self.bytes_written += os.path.getsize(path)
+
+    def _abort_files(self):
+        """Drop the unfinished files of a failed run."""
+        for path, tmp_path, writer in self._writers.values():
+            try:
+                writer.close()
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self._writers.clear()
+
+    def run(self, since: Optional[datetime] = None, full: bool = False, limit: Optional[int] = None) -> dict:
+        """Export every battle finished past the watermark (or ``limit`` of them), then move it."""
+        after = None if full else self.load_watermark()
+        if after is not None:
+            logger.info("⏩ Exporting battles finished after wins _id %s", after)
+        before = None
+        if self.lag_s is not None:
+            before = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=self.lag_s))
+        part = None
+        started = time.perf_counter()
+        try:
+            while limit is None or self.battles < limit:
+                wins = self._wins_page(after, since, before)
+                if limit is not None:
+                    wins = wins[:limit - self.battles]
+                if not wins:
+                    break
+                # Files are named after the first battle of the page that opens them: a rerun
+                # of a failed export pages the same way and rewrites the same files.
+                part = str(wins[0]["_id"])
+                self.export_page(wins, self._turns([win["battle_id"] for win in wins]), part)
+                after = wins[-1]["_id"]
+                logger.info("📦 Export page %d: %d battles, %d turns so far", self.pages, self.battles, self.turns)
+            self._close_files()
+        finally:
+            self._abort_files()
+            self.elapsed_s += time.perf_counter() - started
+        if part is not None:
+            self.save_watermark(after)
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {
+            "pages": self.pages,
+            "battles": self.battles,
+            "turns": self.turns,
+            "embeddings": self.embeddings,
+            "files": self.files,
+            "bytes_written": self.bytes_written,
+            "elapsed_s": self.elapsed_s,
+            "turns_per_s": self.turns / self.elapsed_s if self.elapsed_s else 0.0,
+        }
+
+
+def main():
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="exports", help="export directory")
+    parser.add_argument("--db", default="pokemon_ai")
+    parser.add_argument("--collection", default="battle_logs")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only battles finished from this date")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark (use an empty --out)")
+    parser.add_argument("--limit", type=int, help="stop after this many battles")
+    parser.add_argument("--lag-minutes", type=float, default=10.0, help="leave battles newer than this for the next run")
+    parser.add_argument("--page-size", type=int, default=500, help="battles per page")
+    parser.add_argument("--dimensions", type=int, default=1024, help="embedding size to export")
+    parser.add_argument("--no-observation", action="store_true", help="leave out the rendered observation text")
+    args = parser.parse_args()
+    configure_logging()
+
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri is None:
+        raise ValueError("MONGO_URI environment variable is not set.")
+    db = MongoClient(mongo_uri)[args.db]
+    export = BattleExport(
+        db["wins"],
+        db[args.collection],
+        args.out,
+        dimensions=args.dimensions,
+        page_size=args.page_size,
+        include_observation=not args.no_observation,
+        lag_s=args.lag_minutes * 60,
+    )
+    print(json.dumps(export.run(args.since, args.full, args.limit), indent=2))
+
+
+if __name__ == "__main__":
+    main()
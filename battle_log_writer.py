@@ -0,0 +1,211 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from executors import BoundedExecutor
+from instrumentation import Instrumentation, get_logger
+
+logger = get_logger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class BattleLogWriter:
+    """Write-behind logger for ``battle_logs``.
+
+    Turn records are queued (bounded, so producers wait when Mongo falls behind) and a
+    background task flushes them with ``insert_many`` once ``batch_size`` records are
+    buffered or ``flush_interval_s`` has passed. Batches that fail to insert are
+    appended to a local JSONL spill file. It is replayed when the writer starts, after
+    the next successful write, and on any flush while nothing else is pending.
+    """
+
+    def __init__(
+        self,
+        collection,
+        executor: BoundedExecutor,
+        max_queue: int = 1000,
+        batch_size: int = 50,
+        flush_interval_s: float = 2.0,
+        spill_path: str = "battle_logs_spill.jsonl",
+        instrumentation: Optional[Instrumentation] = None,
+    ):
+        self.collection = collection
+        self.executor = executor
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.spill_path = spill_path
+        self.replay_path = spill_path + ".replay"
+        self.instrumentation = instrumentation
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._buffer: List[dict] = []
+
+        self.flushed = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.flushes = 0
+        self.queue_high_water = 0
+        self.last_flush_s = 0.0
+        self.max_flush_s = 0.0
+        self.total_flush_s = 0.0
+
+    def _ensure_started(self):
+        if self._task is None:
+            self.loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._lock = asyncio.Lock()
+            self._task = self.loop.create_task(self._run())
+
+    def start(self):
+        """Start the background task, which first replays logs spilled by an earlier run."""
+        self._ensure_started()
+
+    def _has_spill(self) -> bool:
+        return os.path.exists(self.spill_path) or os.path.exists(self.replay_path)
+
+    @property
+    def queue_depth(self) -> int:
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + len(self._buffer)
+
+    async def put(self, doc: dict):
+        """Queue a record; waits if the queue is full."""
+        self._ensure_started()
+        await self._queue.put(doc)
+        self.queue_high_water = max(self.queue_high_water, self.queue_depth)
+
+    async def _run(self):
+        if self._has_spill():
+            async with self._lock:
+                await self._replay_spill()
+        while True:
+            self._buffer.append(await self._queue.get())
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(self._buffer) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._buffer.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self.flush()
+
+    async def flush(self):
+        """Write everything buffered or queued right now."""
+        if self._queue is None:
+            return
+        async with self._lock:
+            while not self._queue.empty():
+                self._buffer.append(self._queue.get_nowait())
+            batch, self._buffer = self._buffer, []
+            for start in range(0, len(batch), self.batch_size):
+                await self._write(batch[start:start + self.batch_size])
+            if not batch and self._has_spill():
+                # Nothing new to write: the replay doubles as the reconnect check.
+                await self._replay_spill()
+
+    async def _write(self, docs: List[dict]):
+        started = time.perf_counter()
+        ok = False
+        try:
+            await self.executor.run(self._insert_many, docs)
+            ok = True
+        except Exception as e:
+            logger.warning("⚠️ MongoDB unreachable, spilling %d log(s) to %s: %s", len(docs), self.spill_path, e)
+            self._spill(docs)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.instrumentation is not None:
+                self.instrumentation.observe("mongo_insert", elapsed, docs=len(docs), ok=ok)
+            self.flushes += 1
+            self.last_flush_s = elapsed
+            self.max_flush_s = max(self.max_flush_s, elapsed)
+            self.total_flush_s += elapsed
+        self.flushed += len(docs)
+        if self._has_spill():
+            await self._replay_spill()
+
+    def _insert_many(self, docs: List[dict]):
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Replayed records that already made it in before a failure are fine.
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+                raise
+
+    def _spill(self, docs: List[dict]):
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json_util.dumps(doc) + "\n")
+        self.spilled += len(docs)
+
+    async def _replay_spill(self):
+        """Insert the spilled logs; called with the lock held."""
+        # A replay file left over from an interrupted run goes first; new spills wait for the next replay.
+        if not os.path.exists(self.replay_path):
+            os.replace(self.spill_path, self.replay_path)
+        with open(self.replay_path, encoding="utf-8") as f:
+            docs = [json_util.loads(line) for line in f if line.strip()]
+        try:
+            for start in range(0, len(docs), self.batch_size):
+                await self.executor.run(self._insert_many, docs[start:start + self.batch_size])
+        except Exception as e:
+            self._restore_spill()
+            logger.warning("⚠️ Spill replay failed, keeping %s: %s", self.spill_path, e)
+            return
+        os.remove(self.replay_path)
+        self.replayed += len(docs)
+        logger.info("💾 Replayed %d spilled log(s) into MongoDB", len(docs))
+
+    def _restore_spill(self):
+        """Move the replay file back to the spill path, ahead of anything spilled since."""
+        if os.path.exists(self.spill_path):
+            with open(self.spill_path, encoding="utf-8") as newer, open(self.replay_path, "a", encoding="utf-8") as f:
+                f.write(newer.read())
+        os.replace(self.replay_path, self.spill_path)
+
+    async def close(self):
+        """Flush and stop the background task. Safe to call from any event loop."""
+        if self._task is None:
+            if self._queue is not None or not self._has_spill():
+                return
+            # Never started (no turn logged): still replay what an earlier run spilled.
+            self._ensure_started()
+        if self.loop is not asyncio.get_running_loop():
+            future = asyncio.run_coroutine_threadsafe(self.close(), self.loop)
+            await asyncio.wrap_future(future)
+            return
+        async with self._lock:
+            # Holding the lock means the task isn't mid-write; buffered docs survive.
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_high_water": self.queue_high_water,
+            "flushed": self.flushed,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "last_flush_s": self.last_flush_s,
+            "max_flush_s": self.max_flush_s,
+            "mean_flush_s": self.total_flush_s / self.flushes if self.flushes else 0.0,
+        }
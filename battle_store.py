@@ -0,0 +1,147 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from poke_env.environment.battle import Battle
+
+from matchups import MatchupTable
+from state_renderer import BattleStateRenderer
+
+
+class TurnRecord:
+    """What one turn needs for retrieval, logging and caching.
+
+    Copies the few battle fields the log entry uses instead of holding the ``Battle``,
+    so a turn still queued for logging doesn't keep a finished battle alive.
+    """
+
+    __slots__ = (
+        "battle_tag",
+        "turn",
+        "player_username",
+        "opponent_username",
+        "active",
+        "opponent_active",
+        "context",
+        "embedding",
+        "deadline",
+        "memories_used",
+        "opponent_moves",
+        "opponent_fainted",
+    )
+
+    def __init__(
+        self,
+        battle_tag: str,
+        turn: int,
+        player_username: Optional[str],
+        opponent_username: Optional[str],
+        active: Optional[str],
+        opponent_active: Optional[str],
+        context: str,
+        embedding: Optional[List[float]] = None,
+        deadline: Optional[float] = None,  # event-loop time by which the LLM must have answered
+        memories_used: int = 0,
+        opponent_moves: Tuple[str, ...] = (),
+        opponent_fainted: Tuple[str, ...] = (),
+    ):
+        self.battle_tag = battle_tag
+        self.turn = turn
+        self.player_username = player_username
+        self.opponent_username = opponent_username
+        self.active = active
+        self.opponent_active = opponent_active
+        self.context = context
+        self.embedding = embedding
+        self.deadline = deadline
+        self.memories_used = memories_used
+        # For the opponent-stats index: moves the opponent's active has revealed so far,
+        # and which of its Pokémon have fainted (to tell switches from faints).
+        self.opponent_moves = opponent_moves
+        self.opponent_fainted = opponent_fainted
+
+    @classmethod
+    def from_battle(
+        cls, battle: Battle, context: str, embedding: Optional[List[float]] = None, deadline: Optional[float] = None
+    ) -> "TurnRecord":
+        active, opponent = battle.active_pokemon, battle.opponent_active_pokemon
+        return cls(
+            battle.battle_tag,
+            battle.turn,
+            battle.player_username,
+            battle.opponent_username,
+            active.species if active else None,
+            opponent.species if opponent else None,
+            context,
+            embedding,
+            deadline,
+            opponent_moves=tuple(opponent.moves) if opponent else (),
+            opponent_fainted=tuple(p.species for p in battle.opponent_team.values() if p.fainted),
+        )
+
+
+class BattleState:
+    """Everything the player caches for one running battle."""
+
+    __slots__ = ("renderer", "matchups", "team_brief")
+
+    def __init__(self):
+        self.renderer: Optional[BattleStateRenderer] = None
+        self.matchups: Optional[MatchupTable] = None
+        self.team_brief: Optional[str] = None
+
+
+class BattleStore:
+    """Per-battle player state, released when the battle ends, plus a cap on finished battles.
+
+    poke-env keeps every ``Battle`` in ``Player.battles`` for the life of the player.
+    `finish` drops the battle's cached renders and matchups, and once more than
+    ``max_retained`` finished battles are kept it removes the oldest from
+    ``battles``. Their results stay counted in ``evicted_*``. ``max_retained=None``
+    keeps every battle. Late server messages for a battle arrive right after it ends,
+    so keep the cap at least at the number of concurrent battles.
+    """
+
+    def __init__(self, max_retained: Optional[int] = 100):
+        self.max_retained = max_retained
+        self.states: Dict[str, BattleState] = {}
+        self._finished = deque()
+        self.evicted = 0
+        self.evicted_won = 0
+        self.evicted_lost = 0
+        self.evicted_turns = 0
+
+    def state(self, battle: Battle) -> BattleState:
+        """The battle's state, created on first use. A finished battle (say, one an LLM call
+        outlived) gets a throwaway state so it isn't tracked again."""
+        state = self.states.get(battle.battle_tag)
+        if state is None:
+            state = BattleState()
+            if not battle.finished:
+                self.states[battle.battle_tag] = state
+        return state
+
+    def finish(self, battles: Dict[str, Battle], battle_tag: str):
+        self.states.pop(battle_tag, None)
+        if self.max_retained is None or battle_tag not in battles:
+            return
+        self._finished.append(battle_tag)
+        while len(self._finished) > max(self.max_retained, 1):
+            battle = battles.pop(self._finished.popleft(), None)
+            if battle is None:
+                continue
+            self.evicted += 1
+            self.evicted_won += bool(battle.won)
+            self.evicted_lost += bool(battle.lost)
+            self.evicted_turns += battle.turn
+
+    def reset(self):
+        """Forget finished battles and the evicted tallies, as ``Player.reset_battles`` does."""
+        self._finished.clear()
+        self.evicted = self.evicted_won = self.evicted_lost = self.evicted_turns = 0
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self.states),
+            "retained_finished": len(self._finished),
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,291 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+from executors import BoundedExecutor
+from instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# Bedrock error codes worth backing off and retrying; anything else fails the call.
+RETRYABLE_ERRORS = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+THROTTLING_ERRORS = {"ThrottlingException", "TooManyRequestsException"}
+_TRANSIENT = (ReadTimeoutError, ConnectTimeoutError, EndpointConnectionError, ConnectionClosedError)
+
+BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN = "closed", "half_open", "open"
+BREAKER_STATE_CODES = {BREAKER_CLOSED: 0, BREAKER_HALF_OPEN: 1, BREAKER_OPEN: 2}
+
+
+def make_bedrock_client(max_pool_connections: int = 10, read_timeout_s: float = 60, connect_timeout_s: float = 5):
+    """AWS Bedrock runtime client with a connection pool sized to the calls kept in flight.
+
+    botocore's own retries are off: `BedrockGateway` retries within the turn deadline.
+    """
+    return boto3.client(
+        service_name="bedrock-runtime",
+        region_name="ap-southeast-2",  # adjust as needed
+        config=Config(
+            max_pool_connections=max_pool_connections,
+            read_timeout=read_timeout_s,
+            connect_timeout=connect_timeout_s,
+            retries={"max_attempts": 1, "mode": "standard"},
+        ),
+    )
+
+
+def error_code(error: Exception) -> Optional[str]:
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code")
+    return None
+
+
+def is_throttle(error: Exception) -> bool:
+    return error_code(error) in THROTTLING_ERRORS
+
+
+def retryable(error: Exception) -> bool:
+    """Throttling, unavailable models and network timeouts; not bad requests."""
+    if isinstance(error, ClientError):
+        return error_code(error) in RETRYABLE_ERRORS
+    return isinstance(error, _TRANSIENT)
+
+
+class BedrockUnavailable(Exception):
+    """The call wasn't made: the breaker is open or no request slot was free before the deadline."""
+
+
+@dataclass
+class BedrockPolicy:
+    """Rate limit, retries and circuit breaker for one Bedrock model.
+
+    ``requests_per_minute`` is the account quota for the model (None leaves calls
+    unlimited). Requests draw from a token bucket of ``burst`` tokens refilled at that
+    rate. A throttle cuts the refill rate by ``throttle_backoff``, down to
+    ``min_rate_fraction`` of the quota; each success wins back ``recovery_fraction``.
+    Throttles, timeouts and 5xx errors are retried up to ``max_retries`` times with
+    full-jitter exponential backoff from ``base_delay_s`` to ``max_delay_s``, but never
+    past the caller's deadline. ``breaker_failures`` consecutive failed calls open the
+    breaker for ``breaker_reset_s``, then one probe call decides whether it closes.
+    """
+    requests_per_minute: Optional[float] = None
+    burst: int = 5
+    throttle_backoff: float = 0.5
+    min_rate_fraction: float = 0.1
+    recovery_fraction: float = 0.05
+    max_retries: int = 3
+    base_delay_s: float = 0.25
+    max_delay_s: float = 4.0
+    breaker_failures: int = 5
+    breaker_reset_s: float = 30.0
+
+
+class TokenBucket:
+    """Async token bucket whose refill rate backs off on throttles and recovers on successes."""
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        burst: int,
+        throttle_backoff: float = 0.5,
+        min_rate_fraction: float = 0.1,
+        recovery_fraction: float = 0.05,
+    ):
+        self.max_rate = self.rate = rate_per_s
+        self.burst = burst
+        self.throttle_backoff = throttle_backoff
+        self.min_rate = rate_per_s * min_rate_fraction
+        self.recovery = rate_per_s * recovery_fraction
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take a token, waiting for one if needed. False if none frees up before ``deadline``
+        (event-loop time)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            wait = (1 - self.tokens) / self.rate
+            if deadline is not None and loop.time() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def throttled(self):
+        self.rate = max(self.rate * self.throttle_backoff, self.min_rate)
+
+    def succeeded(self):
+        self.rate = min(self.rate + self.recovery, self.max_rate)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; after ``reset_s`` one probe is let through."""
+
+    def __init__(self, failure_threshold: int = 5, reset_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def available(self) -> bool:
+        """Whether a call could go through now (without claiming the half-open probe)."""
+        if self.state == BREAKER_OPEN:
+            return time.monotonic() - self._opened_at >= self.reset_s
+        return not (self.state == BREAKER_HALF_OPEN and self._probing)
+
+    def allow(self) -> bool:
+        if self.state == BREAKER_OPEN:
+            if time.monotonic() - self._opened_at < self.reset_s:
+                return False
+            self.state = BREAKER_HALF_OPEN
+        if self.state == BREAKER_HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def success(self):
+        if self.state != BREAKER_CLOSED:
+            logger.info("✅ Circuit breaker closed")
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == BREAKER_HALF_OPEN or (self.state == BREAKER_CLOSED and self.failures >= self.failure_threshold):
+            self.state = BREAKER_OPEN
+            self._opened_at = time.monotonic()
+            self.opens += 1
+
+    def release(self):
+        """The call was given up before it reached Bedrock; free the half-open probe."""
+        self._probing = False
+
+
+class BedrockGateway:
+    """Rate limiting, retries and a circuit breaker around the Bedrock calls of one model.
+
+    Calls still run on the caller's `BoundedExecutor`, which bounds concurrency to the
+    client's connection pool. Pass the same gateway to several players of one process
+    so they share the quota and the breaker.
+    """
+
+    def __init__(self, name: str, policy: Optional[BedrockPolicy] = None):
+        self.name = name
+        self.policy = BedrockPolicy() if policy is None else policy
+        p = self.policy
+        self.bucket = (
+            TokenBucket(p.requests_per_minute / 60, p.burst, p.throttle_backoff, p.min_rate_fraction, p.recovery_fraction)
+            if p.requests_per_minute
+            else None
+        )
+        self.breaker = CircuitBreaker(p.breaker_failures, p.breaker_reset_s)
+        self.calls = 0
+        self.throttles = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.rate_limited = 0
+
+    def available(self) -> bool:
+        return self.breaker.available()
+
+    async def call(
+        self,
+        executor: BoundedExecutor,
+        fn: Callable[..., Any],
+        *args,
+        deadline: Optional[float] = None,
+        retry_if: Optional[Callable[[Exception], bool]] = None,
+    ) -> Any:
+        """Run ``fn(*args)`` on ``executor``, retrying transient errors while ``deadline``
+        (event-loop time) allows. ``retry_if`` can veto a retry, e.g. once a stream has
+        produced output. Raises `BedrockUnavailable` when the call isn't attempted."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise BedrockUnavailable(f"{self.name}: circuit breaker open")
+        loop = asyncio.get_running_loop()
+        settled = False
+        try:
+            for attempt in range(self.policy.max_retries + 1):
+                if self.bucket is not None and not await self.bucket.acquire(deadline):
+                    self.rate_limited += 1
+                    raise BedrockUnavailable(f"{self.name}: no request slot before the deadline")
+                self.calls += 1
+                try:
+                    result = await executor.run(fn, *args)
+                except Exception as e:
+                    transient = retryable(e)
+                    if is_throttle(e):
+                        self.throttles += 1
+                        if self.bucket is not None:
+                            self.bucket.throttled()
+                    delay = random.uniform(0, min(self.policy.max_delay_s, self.policy.base_delay_s * 2 ** attempt))
+                    if (
+                        not transient
+                        or attempt == self.policy.max_retries
+                        or (retry_if is not None and not retry_if(e))
+                        or (deadline is not None and loop.time() + delay >= deadline)
+                    ):
+                        if transient:
+                            # Bad requests say nothing about Bedrock's health; only transient errors trip the breaker.
+                            self.failures += 1
+                            self.breaker.failure()
+                            settled = True
+                            if self.breaker.state == BREAKER_OPEN:
+                                logger.warning("🔌 %s circuit breaker open after: %s", self.name, e)
+                        raise
+                    self.retries += 1
+                    logger.debug("🔁 %s retry %d in %.2fs after: %s", self.name, attempt + 1, delay, e)
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker.success()
+                settled = True
+                if self.bucket is not None:
+                    self.bucket.succeeded()
+                return result
+        finally:
+            if not settled:
+                self.breaker.release()
+
+    def stats(self) -> dict:
+        return {
+            "breaker_state": BREAKER_STATE_CODES[self.breaker.state],
+            "breaker_opens": self.breaker.opens,
+            "consecutive_failures": self.breaker.failures,
+            "calls": self.calls,
+            "throttles": self.throttles,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "rate_per_s": self.bucket.rate if self.bucket is not None else 0.0,
+        }
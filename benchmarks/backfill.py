@@ -0,0 +1,66 @@
+"""Throughput of the embedding backfill against the stubs, by Titan concurrency.
+
+    python -m benchmarks.backfill --battles 20 --turns 30 --concurrency 1 8 32 --throttle 0.05
+
+Builds a ``battle_logs`` collection from the scripted stub battles with no stored
+context and, for a third of it, no embedding. Scripted battles repeat positions, so
+many documents share a context and the dedupe shows up as fewer Titan calls.
+``--throttle`` makes that share of Titan calls fail with ``ThrottlingException``.
+"""
+import argparse
+import asyncio
+
+from benchmarks.replay import recorded_observations
+from benchmarks.stubs import StubBedrockClient, StubCollection, stub_embedding
+from embedding_backfill import EmbeddingBackfill
+
+
+def make_collection(args) -> StubCollection:
+    collection = StubCollection(latency_s=args.mongo_latency)
+    for i, doc in enumerate(recorded_observations(args.battles, args.turns, args.state_format)):
+        # Legacy documents: an embedding from before model/version tagging, or none at all.
+        doc["_id"] = i
+        doc["embedding"] = None if i % 3 == 0 else stub_embedding(doc["observation"], 8)
+        collection.docs.append(doc)
+    return collection
+
+
+def run(args, concurrency: int) -> dict:
+    collection = make_collection(args)
+    client = StubBedrockClient(latency_s=args.latency, throttle_rate=args.throttle)
+    backfill = EmbeddingBackfill(
+        collection,
+        client,
+        concurrency=concurrency,
+        page_size=args.page_size,
+        checkpoint_path=None,
+        base_delay_s=0.01,
+    )
+    stats = asyncio.run(backfill.run())
+    stats["left"] = sum(1 for doc in collection.docs if doc.get("embedding_model") != backfill.model_id)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Titan latency (s)")
+    parser.add_argument("--mongo-latency", type=float, default=0.01, help="stub Mongo latency (s)")
+    parser.add_argument("--throttle", type=float, default=0.05, help="share of Titan calls throttled")
+    parser.add_argument("--state-format", choices=("text", "json"), default="text")
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>12} {'docs':>6} {'contexts':>9} {'titan':>6} {'retries':>8} {'left':>5} {'docs/s':>8}")
+    for concurrency in args.concurrency:
+        s = run(args, concurrency)
+        print(
+            f"{concurrency:>12} {s['scanned']:>6} {s['contexts']:>9} {s['embedded']:>6} "
+            f"{s['retries']:>8} {s['left']:>5} {s['docs_per_s']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Turns played against a throttling Bedrock: retries, the circuit breaker and heuristic fallbacks."""
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.replay import replay
+from benchmarks.stubs import StubBedrockClient, make_player, recorded_battle
+from bedrock_client import BedrockGateway, BedrockPolicy
+from decision_tiers import HeuristicConfig
+
+TURNS = 30
+POLICY = BedrockPolicy(
+    requests_per_minute=60000, base_delay_s=0.001, max_delay_s=0.005, breaker_failures=3, breaker_reset_s=60
+)
+
+
+@pytest.mark.parametrize("throttle_rate", [0.3, 1.0], ids=["throttled", "outage"])
+def bench_throttled_turns(benchmark, throttle_rate):
+    def setup():
+        player = make_player(
+            bedrock_latency_s=0.0,
+            mongo_latency_s=0.0,
+            heuristic_config=HeuristicConfig(enabled=False),
+            llm_gateway=BedrockGateway("llm", POLICY),
+            embedding_gateway=BedrockGateway("embeddings", POLICY),
+        )
+        player.bedrock_runtime = player.bedrock_embeddings = StubBedrockClient(latency_s=0.0, throttle_rate=throttle_rate)
+        return (player,), {}
+
+    def play(player):
+        async def main():
+            try:
+                await replay(player, recorded_battle(TURNS))
+            finally:
+                await player.shutdown()
+            return player
+
+        return asyncio.run(main())
+
+    player = benchmark.pedantic(play, setup=setup, rounds=3, iterations=1)
+    llm_turns = [doc for doc in player.collection.docs if doc["decision_tier"] == "llm"]
+    fallbacks = [doc for doc in llm_turns if doc["fallback_used"]]
+    stats = player.llm_gateway.stats()
+    benchmark.extra_info.update(llm_turns=len(llm_turns), fallbacks=len(fallbacks), **stats)
+
+    assert llm_turns and stats["throttles"] > 0
+    # Throttles slow the token bucket below the quota.
+    assert 0 < stats["rate_per_s"] < POLICY.requests_per_minute / 60
+    # Nothing is played at random: every fallback is the heuristic's pick.
+    assert all(doc["llm_decision_raw"] and doc["llm_decision_raw"].get("fallback") for doc in fallbacks)
+    if throttle_rate < 1:
+        assert stats["retries"] > 0 and len(fallbacks) < len(llm_turns) / 2
+    else:
+        assert stats["breaker_opens"] == 1 and stats["rejected"] == 0
+        assert stats["calls"] == POLICY.breaker_failures * (POLICY.max_retries + 1)
+
+
+class TruncatedReplyClient(StubBedrockClient):
+    """Claude replies that stop before the decision's closing brace."""
+
+    def _reply(self, request: dict) -> str:
+        return json.dumps(self.decide(request))[:-1] + self.trailing_text
+
+
+@pytest.mark.parametrize("ended", ["deadline", "truncated"])
+def bench_partial_answers(benchmark, ended):
+    def setup():
+        player = make_player(
+            bedrock_latency_s=0.0,
+            mongo_latency_s=0.0,
+            heuristic_config=HeuristicConfig(enabled=False),
+            llm_streaming=True,
+            llm_deadline_s=0.2 if ended == "deadline" else None,
+        )
+        # Past the deadline the reply is still streaming commentary after the unclosed object.
+        trailing = " lorem" * 200 if ended == "deadline" else ""
+        player.bedrock_runtime = player.bedrock_embeddings = TruncatedReplyClient(
+            latency_s=0.0, token_latency_s=0.002, trailing_text=trailing
+        )
+        return (player,), {}
+
+    def play(player):
+        async def main():
+            try:
+                await replay(player, recorded_battle(5))
+            finally:
+                await player.shutdown()
+            return player
+
+        return asyncio.run(main())
+
+    player = benchmark.pedantic(play, setup=setup, rounds=1, iterations=1)
+    llm_turns = [doc for doc in player.collection.docs if doc["decision_tier"] == "llm"]
+    assert llm_turns
+    # The partial action is played, but logged as a fallback and kept out of the decision cache.
+    for doc in llm_turns:
+        assert doc["action_type"] == "move" and doc["fallback_used"]
+        assert doc["llm_decision_raw"]["partial"] and doc["llm_decision_raw"]["fallback"] == ended
+    assert player.decision_cache.stats()["pending"] == 0
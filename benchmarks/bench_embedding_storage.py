@@ -0,0 +1,95 @@
+"""Recall and search time of quantized embedding storage, and what a logged turn stores."""
+import asyncio
+
+import pytest
+
+from benchmarks.embedding_storage import SETTINGS, corpus, ground_truth, recall_at_k
+from benchmarks.replay import recorded_observations, replay
+from benchmarks.stubs import StubBedrockClient, StubCollection, _matches, make_player, recorded_battle, stub_embedding
+from embedding_backfill import EmbeddingBackfill
+from embedding_storage import BSON_VECTOR_SUBTYPE, EmbeddingStorage, from_bson_vector, stored_bytes
+from memory_backends import LocalVectorIndex
+
+ROWS, QUERIES, K = 5000, 32, 10
+# Minimum recall@k against exact float search without a rerank.
+MIN_RECALL = {"float": 1.0, "int8": 0.95, "binary": 0.5}
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    vectors, queries = corpus(ROWS, QUERIES)
+    return vectors, queries, ground_truth(vectors, queries, K)
+
+
+@pytest.mark.parametrize("quantization,rerank", SETTINGS, ids=[q + ("+rerank" if r else "") for q, r in SETTINGS])
+def bench_quantized_search(benchmark, tmp_path, dataset, quantization, rerank):
+    vectors, queries, truth = dataset
+    storage = EmbeddingStorage(1024, quantization, rerank)
+    index = LocalVectorIndex(str(tmp_path / "index"), storage=storage, initial_capacity=ROWS)
+    index.add_many(vectors, [{"row": i} for i in range(ROWS)])
+    results = benchmark(index.search_many, queries, K, True)
+    index.close()
+
+    recall = recall_at_k(results, truth, K)
+    doc_bytes = stored_bytes(storage, vectors[0].tolist())
+    benchmark.extra_info.update(recall=recall, doc_bytes=doc_bytes)
+    assert recall >= (0.95 if storage.reranks else MIN_RECALL[quantization])
+    # A float array costs ~13 bytes a dimension in BSON; int8 and packed bits 1 and 1/8.
+    assert doc_bytes <= {"float": 14, "int8": 1.1, "binary": 0.15}[quantization] * 1024 + (4 * 1024 + 32 if rerank else 0)
+
+
+def bench_logged_turn_storage(benchmark):
+    storage = EmbeddingStorage(256, "binary", rerank=True)
+
+    def setup():
+        player = make_player(bedrock_latency_s=0.0, mongo_latency_s=0.0, embedding_storage=storage)
+        return (player,), {}
+
+    def play(player):
+        async def main():
+            try:
+                await replay(player, recorded_battle(10))
+            finally:
+                await player.shutdown()
+            return player
+
+        return asyncio.run(main())
+
+    player = benchmark.pedantic(play, setup=setup, rounds=3, iterations=1)
+    docs = [doc for doc in player.collection.docs if doc.get("embedding") is not None]
+    assert docs
+    for doc in docs:
+        assert doc["embedding"].subtype == BSON_VECTOR_SUBTYPE and len(from_bson_vector(doc["embedding"])) == 256
+        assert len(from_bson_vector(doc["embedding_full"])) == 256
+        assert doc["embedding_dim"] == 256 and doc["embedding_quantization"] == "binary"
+    pipeline = player.memory_backend._pipeline([0.1] * 256, 3)
+    assert pipeline[0]["$vectorSearch"]["limit"] == storage.rerank_candidates
+    assert pipeline[1]["$project"]["embedding_full"] == 1
+
+
+def bench_backfill_then_compatible_search(benchmark):
+    """A default backfill stamps every document, so memory_compatible_only still finds the whole corpus."""
+    player = make_player(bedrock_latency_s=0.0, mongo_latency_s=0.0, memory_compatible_only=True)
+    backend_filter = player.memory_backend.filter
+    asyncio.run(player.shutdown())
+
+    def setup():
+        collection = StubCollection(latency_s=0.0)
+        for i, doc in enumerate(recorded_observations(2, 15, "text")):
+            # Legacy turns: unstamped vectors from before model tagging, or none at all.
+            doc["_id"] = i
+            doc["embedding"] = None if i % 3 == 0 else stub_embedding(doc["observation"], 1024)
+            collection.docs.append(doc)
+        backfill = EmbeddingBackfill(collection, StubBedrockClient(latency_s=0.0), page_size=10, checkpoint_path=None)
+        return (backfill, collection), {}
+
+    def run(backfill, collection):
+        asyncio.run(backfill.run())
+        return collection
+
+    collection = benchmark.pedantic(run, setup=setup, rounds=1, iterations=1)
+    assert collection.docs and all(_matches(doc, backend_filter) for doc in collection.docs)
+    assert all(doc["embedding_dim"] == 1024 and len(doc["embedding"]) == 1024 for doc in collection.docs)
+    # Nothing is left stale: a second run finds no documents to embed.
+    again = EmbeddingBackfill(collection, StubBedrockClient(latency_s=0.0), checkpoint_path=None)
+    assert asyncio.run(again.run())["scanned"] == 0
@@ -0,0 +1,22 @@
+"""Titan requests per turn with concurrent battles, by embedding service mode."""
+import asyncio
+
+import pytest
+
+from benchmarks.embeddings import MODES, embedding_player, play
+
+BATTLES, TURNS, LATENCY_S = 8, 10, 0.005
+
+
+@pytest.mark.parametrize("mode", MODES)
+def bench_concurrent_embeddings(benchmark, mode):
+    def setup():
+        return (embedding_player(mode, LATENCY_S, max_concurrent_battles=BATTLES),), {}
+
+    report = benchmark.pedantic(lambda player: asyncio.run(play(player, BATTLES, TURNS)), setup=setup, rounds=3, iterations=1)
+    benchmark.extra_info.update(report)
+    if mode == "direct":
+        assert report["coalesced"] == 0
+    else:
+        # Battles against the same opponent reach the same positions together.
+        assert report["coalesced"] > 0 and report["requests_per_turn"] < 0.9
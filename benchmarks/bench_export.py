@@ -0,0 +1,98 @@
+"""Battle export: Parquet throughput, incremental runs from the watermark, and the columnar scan."""
+import os
+from datetime import timedelta
+
+import bson
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import pyarrow.dataset as ds  # noqa: E402
+
+from battle_export import BattleExport  # noqa: E402
+from benchmarks.export import (  # noqa: E402
+    DIMENSIONS, TurnsByBattle, collections, export, scan_bson, scan_parquet, synthetic_battles,
+)
+from outcomes import utc_now  # noqa: E402
+
+WINS, LOGS = synthetic_battles(100, 30)
+
+
+def bench_export(benchmark, tmp_path):
+    runs = iter(range(1000))
+
+    def run():
+        return export(WINS, LOGS, os.path.join(tmp_path, str(next(runs))), page_size=40)
+
+    stats = benchmark(run)
+    assert stats["battles"] == len(WINS) and stats["turns"] == len(LOGS) and stats["embeddings"] == len(LOGS)
+    table = ds.dataset(os.path.join(tmp_path, "0", "battle_logs"), partitioning="hive").to_table()
+    assert table.num_rows == len(LOGS)
+    assert table.schema.field("embedding").type.list_size == DIMENSIONS
+    assert set(table.column("format").to_pylist()) == {"gen1ou"}
+    assert 0 <= min(table.column("active_hp").to_pylist()) and table.column("active_species_id").null_count == 0
+
+
+def bench_incremental_export(benchmark, tmp_path):
+    out_dir = os.path.join(tmp_path, "incremental")
+    first = export(WINS[:60], LOGS[:60 * 30], out_dir)
+    assert first["battles"] == 60
+
+    # Later battles arrive; the next run exports only those.
+    stats = benchmark.pedantic(export, args=(WINS, LOGS, out_dir), rounds=1, iterations=1)
+    assert stats["battles"] == 40 and stats["turns"] == 40 * 30
+    assert export(WINS, LOGS, out_dir)["battles"] == 0
+    wins = ds.dataset(os.path.join(out_dir, "wins"), partitioning="hive").to_table()
+    assert sorted(wins.column("battle_id").to_pylist()) == sorted(w["battle_id"] for w in WINS)
+
+
+
+def bench_late_wins(benchmark, tmp_path):
+    # Battles ended 6 h ago, 3 h ago and now; the 3 h one is inserted after the first run.
+    wins, logs = synthetic_battles(3, 5, start=utc_now() - timedelta(hours=6))
+    out_dir = str(tmp_path)
+    first = export([wins[0], wins[2]], logs, out_dir, lag_s=4 * 3600)
+    # Without the lag the watermark would pass the late battle's _id.
+    assert first["battles"] == 1
+
+    stats = benchmark.pedantic(export, args=(wins, logs, out_dir), rounds=1, iterations=1)
+    assert stats["battles"] == 2
+    exported = ds.dataset(os.path.join(out_dir, "wins"), partitioning="hive").to_table()
+    assert sorted(exported.column("battle_id").to_pylist()) == sorted(w["battle_id"] for w in wins)
+
+
+class FailingTurns(TurnsByBattle):
+    def __init__(self, docs, pages: int):
+        super().__init__(docs)
+        self.pages = pages
+
+    def find(self, filter=None, projection=None):
+        self.pages -= 1
+        if self.pages < 0:
+            raise ConnectionError("battle_logs went away")
+        return super().find(filter, projection)
+
+
+def bench_failed_export(benchmark, tmp_path):
+    out_dir = str(tmp_path)
+    wins, _ = collections(WINS, LOGS)
+
+    def run():
+        # 8 battles a day, 4 a page: each day's files are complete two pages later.
+        exporter = BattleExport(wins, FailingTurns(LOGS, pages=6), out_dir, dimensions=DIMENSIONS, page_size=4, lag_s=None)
+        with pytest.raises(ConnectionError):
+            exporter.run()
+        return exporter
+
+    exporter = benchmark.pedantic(run, rounds=1, iterations=1)
+    # Six pages got through: the first two days were closed along the way, the third is dropped.
+    assert exporter.files == 2 * 2 and not exporter._writers
+    names = [name for _, _, files in os.walk(out_dir) for name in files]
+    assert len(names) == exporter.files and not [name for name in names if name.endswith(".tmp")]
+    assert not os.path.exists(exporter.watermark_path)
+
+
+def bench_scan(benchmark, tmp_path):
+    export(WINS, LOGS, str(tmp_path))
+    groups = benchmark(scan_parquet, str(tmp_path))
+    assert groups == scan_bson(b"".join(bson.encode(doc) for doc in LOGS))
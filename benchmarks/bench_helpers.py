@@ -0,0 +1,27 @@
+from benchmarks.stubs import OPPONENT_TEAM, OUR_TEAM, _make_pokemon
+from benchmarks.type_chart import unordered
+from helpers import TYPE_LIST, legacy_move_type_damage_wrapper, move_type_damage_wrapper
+
+POKEMON = [_make_pokemon(species) for species in list(OUR_TEAM) + OPPONENT_TEAM]
+CONSTRAINTS = [None, ["ELECTRIC"], ["WATER", "PSYCHIC"], ["GROUND", "ROCK"]]
+
+
+def _describe_all(wrapper, type_chart):
+    return [wrapper(p, type_chart, c) for p in POKEMON for c in CONSTRAINTS]
+
+
+def bench_move_type_damage_wrapper(benchmark, type_chart):
+    result = benchmark(_describe_all, move_type_damage_wrapper, type_chart)
+    # Same sentences as the legacy wrapper; only the type order within one may differ.
+    legacy = _describe_all(legacy_move_type_damage_wrapper, type_chart)
+    assert [unordered(r) for r in result] == [unordered(r) for r in legacy]
+
+
+def bench_legacy_move_type_damage_wrapper(benchmark, type_chart):
+    benchmark(_describe_all, legacy_move_type_damage_wrapper, type_chart)
+
+
+def bench_type_table_score(benchmark, type_table):
+    defenders = [type_table.defender_types(p) for p in POKEMON]
+    scores = benchmark(type_table.score, list(TYPE_LIST), defenders)
+    assert scores.shape == (len(TYPE_LIST), len(POKEMON))
@@ -0,0 +1,32 @@
+import copy
+
+import pytest
+
+from benchmarks.stubs import OUR_TEAM, recorded_battle
+from decision_tiers import TieredDecisionEngine
+from matchups import MatchupTable, matchup_table
+
+
+def bench_build_matchup_table(benchmark, type_table):
+    table = benchmark(MatchupTable, type_table, OUR_TEAM)
+    assert table.offense.shape == (len(OUR_TEAM), len(table.species)) == table.defense.shape
+    assert table.switch_ins.shape == (len(table.species), len(OUR_TEAM))
+
+
+@pytest.mark.parametrize("precomputed", [False, True], ids=["computed", "lookups"])
+def bench_score_options(benchmark, type_table, precomputed):
+    engine = TieredDecisionEngine(type_table)
+    table = matchup_table(type_table, OUR_TEAM)
+    # recorded_battle mutates one Battle, so keep a snapshot of every turn.
+    battles = [copy.deepcopy(battle) for battle in recorded_battle(30)]
+    expected = [_names(engine.score_options(battle)) for battle in battles]
+
+    def score_all():
+        return [engine.score_options(battle, table if precomputed else None) for battle in battles]
+
+    # Lookups give exactly the scores the type table computes.
+    assert [_names(scored) for scored in benchmark(score_all)] == expected
+
+
+def _names(scored):
+    return [(getattr(option, "id", None) or option.species, score) for option, score in scored]
@@ -0,0 +1,42 @@
+"""Opponent-stats index: per-turn updates and lookups, checkpoints and the bulk rebuild."""
+import os
+
+from benchmarks.opponent_stats import battle_documents, incremental, synthetic_logs
+from opponent_stats import OpponentStats, OpponentStatsConfig
+
+DOCS = synthetic_logs(200, 30)
+CONFIG = OpponentStatsConfig(path=None)
+
+
+def bench_observe_turns(benchmark):
+    report = benchmark(incremental, DOCS, CONFIG)
+    index = report["index"]
+    assert index.stats()["running_battles"] == 0 and index.observed == len(DOCS)
+    assert any(stats.switches for stats in index.species.values())
+
+
+def bench_turn_lookups(benchmark):
+    index = incremental(DOCS, CONFIG)["index"]
+    species = [doc["opponent_active"] for doc in DOCS]
+
+    def lookups():
+        return [(index.summary(s), index.threat_types(s, 0.3)) for s in species]
+
+    results = benchmark(lookups)
+    seen = next(text for text, _ in results if text is not None)
+    assert "moves revealed" in seen and "our actions" in seen
+
+
+def bench_rebuild_and_checkpoint(benchmark, tmp_path):
+    battles = battle_documents(DOCS)
+    path = os.path.join(tmp_path, "opponent_stats.json.gz")
+
+    def rebuild():
+        index = OpponentStats.rebuild(battles, OpponentStatsConfig(path=path))
+        index.save()
+        return index
+
+    index = benchmark(rebuild)
+    assert index.to_dict()["species"] == incremental(DOCS, CONFIG)["index"].to_dict()["species"]
+    reloaded = OpponentStats(OpponentStatsConfig(path=path))
+    assert reloaded.load() and reloaded.to_dict()["species"] == index.to_dict()["species"]
@@ -0,0 +1,47 @@
+"""LLM turns with speculative prefetch off and on, with time between turns for it to run."""
+import asyncio
+
+import pytest
+
+from benchmarks.prefetch import MODES, play, prefetch_player, scripted_battles
+
+BATTLES, TURNS, GAP_S = 4, 10, 0.03
+
+
+@pytest.mark.parametrize("mode", MODES)
+def bench_prefetched_turns(benchmark, mode):
+    def setup():
+        return (prefetch_player(mode, 0.01, 0.01, 0.01, max_concurrent_battles=BATTLES),), {}
+
+    report = benchmark.pedantic(
+        lambda player: asyncio.run(play(player, scripted_battles(BATTLES, TURNS), GAP_S)), setup=setup, rounds=3, iterations=1
+    )
+    benchmark.extra_info.update(report)
+    assert report["turns"] == BATTLES * TURNS
+    if mode == "off":
+        assert report["hit_rate"] == 0 and report["embeddings_per_turn"] <= 1
+    else:
+        # Scripted battles keep their actives for several turns; switches are predicted too.
+        assert report["hit_rate"] > 0.5 and report["saved_ms_per_turn"] > 0
+
+
+def bench_stalled_prefetch(benchmark):
+    # Prefetch searches stall far past the turn deadline; the turns' own searches don't.
+    def setup():
+        player = prefetch_player("on", 0.01, 0.01, 0.01, max_concurrent_battles=1, llm_deadline_s=0.2)
+        search = player.prefetcher.search
+
+        async def stalled_search(embedding):
+            await asyncio.sleep(2.0)
+            return await search(embedding)
+
+        player.prefetcher.search = stalled_search
+        return (player,), {}
+
+    report = benchmark.pedantic(
+        lambda player: asyncio.run(play(player, scripted_battles(1, TURNS), GAP_S)), setup=setup, rounds=1, iterations=1
+    )
+    benchmark.extra_info.update(report)
+    assert report["turns"] == TURNS and report["timeouts"] > 0 and report["hit_rate"] == 0
+    # A stalled prefetch is given up on at the deadline and the turn searches for itself.
+    assert report["p99_ms"] < 1000
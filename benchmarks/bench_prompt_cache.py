@@ -0,0 +1,19 @@
+"""LLM turns with Bedrock prompt caching off and on: time to first token and input cost."""
+import pytest
+
+from benchmarks.prompt_cache import MODES, run
+
+BATTLES, TURNS = 2, 10
+
+
+@pytest.mark.parametrize("mode", MODES)
+def bench_prompt_cache(benchmark, mode):
+    report = benchmark.pedantic(lambda: run(mode, BATTLES, TURNS, 0.005, 0.00002), rounds=3, iterations=1)
+    benchmark.extra_info.update(report)
+    assert report["calls"] == BATTLES * TURNS
+    if mode == "off":
+        assert report["cache_read_tokens_per_call"] == 0 and report["cache_write_tokens_per_call"] == 0
+    else:
+        # System text and team brief are written once and read by every later turn.
+        assert report["cached_share"] > 0.5
+        assert report["input_tokens_per_call"] < report["prompt_tokens_per_call"] / 2
@@ -0,0 +1,72 @@
+"""End-to-end replays through ``choose_move`` with zero-latency stubs.
+
+Each round replays the states on a fresh player; player construction is setup.
+"""
+import asyncio
+
+from benchmarks.replay import battle_from_observation, battles_from_logs, battles_from_showdown_log, replay
+from benchmarks.stubs import StubBedrockClient, make_player, recorded_battle
+from decision_tiers import HeuristicConfig
+
+
+def _replay_rounds(benchmark, source, expected_turns: int):
+    def setup():
+        return (make_player(bedrock_latency_s=0.0, mongo_latency_s=0.0),), {}
+
+    def play(player):
+        async def main():
+            try:
+                return await replay(player, source())
+            finally:
+                await player.shutdown()
+
+        return asyncio.run(main())
+
+    report = benchmark.pedantic(play, setup=setup, rounds=5, iterations=1)
+    assert report.turns == expected_turns
+    benchmark.extra_info["turns_per_s"] = report.turns_per_s
+    benchmark.extra_info["tiers"] = {tier: s["turns"] for tier, s in report.tiers.items()}
+
+
+def bench_replay_battle_logs(benchmark, observation_docs):
+    _replay_rounds(benchmark, lambda: battles_from_logs(observation_docs), len(observation_docs))
+
+
+def bench_replay_showdown_log(benchmark, showdown_log):
+    _replay_rounds(benchmark, lambda: battles_from_showdown_log(showdown_log, "caveman_llm_bot1"), 10)
+
+
+def bench_parse_observation(benchmark, observation_docs):
+    doc = observation_docs[-1]
+    battle = benchmark(battle_from_observation, doc["observation"], doc["battle_id"], doc["turn"])
+    assert battle.available_moves
+
+
+def bench_outcome_after_background_logs(benchmark):
+    """Heuristic turns are logged in the background; the outcome must still reach all of them."""
+
+    def setup():
+        # Every turn is the heuristic's, and Titan is slow: when the battle ends, its turns are still embedding.
+        player = make_player(bedrock_latency_s=0.0, mongo_latency_s=0.0, heuristic_config=HeuristicConfig(margin_threshold=0.0))
+        player.bedrock_embeddings = StubBedrockClient(latency_s=0.0, embedding_latency_s=0.1)
+        return (player,), {}
+
+    def play(player):
+        async def main():
+            try:
+                battle = None
+                for battle in recorded_battle(20):
+                    await player.choose_move(battle)
+                battle._won = True
+                player._battle_finished_callback(battle)
+                await player._drain_background_tasks()
+            finally:
+                await player.shutdown()
+            return player
+
+        return asyncio.run(main())
+
+    player = benchmark.pedantic(play, setup=setup, rounds=1, iterations=1)
+    docs = player.collection.docs
+    assert all(doc["decision_tier"] == "heuristic" for doc in docs)
+    assert len(docs) == 20 and all(doc.get("outcome") == "win" for doc in docs)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.stubs import make_battle, make_player
+from benchmarks.vector_index import synthetic_corpus
+from battle_store import TurnRecord
+from memory_backends import LocalVectorIndex
+from memory_prompt import MemoryPromptConfig, memory_line, summarize_memories
+from outcomes import MemoryRanking
+
+ROWS, DIM, QUERIES = 5000, 256, 32
+MOVES = ("surf", "bodyslam", "blizzard", "seismictoss")
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    corpus = synthetic_corpus(ROWS + QUERIES, DIM, clusters=64)
+    memories = [
+        {"battle_id": f"battle-{i // 40}", "turn": i % 40, "thought": f"{MOVES[i % 4].title()} is neutral.",
+         "action_type": "move", "action_name": MOVES[i % 4], "fallback_used": False}
+        for i in range(ROWS)
+    ]
+    index = LocalVectorIndex(str(tmp_path_factory.mktemp("index") / "index"), dim=DIM, n_partitions=16, ivf_min_rows=ROWS)
+    index.add_many(corpus[:ROWS], memories)
+    index.train_partitions()
+    yield index, corpus[ROWS:]
+    index.close()
+
+
+@pytest.mark.parametrize("exact", [True, False], ids=["exact", "ivf"])
+def bench_local_index_search(benchmark, index, exact):
+    index, queries = index
+    results = benchmark(index.search_many, queries, 3, exact)
+    assert len(results) == QUERIES and all(len(hits) == 3 for hits in results)
+
+
+def bench_get_battle_memories(benchmark, index):
+    index, queries = index
+    player = make_player(bedrock_latency_s=0.0, mongo_latency_s=0.0, memory_backend=index, mongo_concurrency=0)
+    battle = make_battle()
+
+    turn = TurnRecord.from_battle(battle, player._get_battle_context(battle), queries[0].tolist())
+
+    memories = benchmark(lambda: asyncio.run(player._get_battle_memories(turn, k=3)))
+    # One line per action among the candidates, at most k of them.
+    assert 0 < memories.count("Similarity") <= 3 and len(memories.splitlines()) == memories.count("Similarity")
+    asyncio.run(player.shutdown())
+
+
+def bench_rerank_memories(benchmark):
+    now = datetime(2026, 1, 1)
+    candidates = [
+        {"score": 0.9 - i * 0.001, "outcome": ("loss", "win", None)[i % 3], "timestamp": now - timedelta(days=i)}
+        for i in range(MemoryRanking().candidates)
+    ]
+    ranked = benchmark(MemoryRanking().rerank, candidates, now)
+    assert 0 < len(ranked) <= 3
+    assert ranked[0]["outcome"] == "win"
+
+
+def bench_summarize_memories(benchmark):
+    candidates = [
+        {"score": 0.95 - i * 0.01, "battle_id": f"battle-{i // 3}", "outcome": ("win", "loss")[i % 2],
+         "thought": f"{MOVES[i % 2].title()} hits hard and the opponent can't switch in safely.",
+         "action_type": "move", "action_name": MOVES[i % 2], "fallback_used": False}
+        for i in range(12)
+    ]
+    config = MemoryPromptConfig()
+    summary = benchmark(summarize_memories, candidates, config, 3)
+    assert summary.lines == 2 and summary.memories == 12
+    assert summary.tokens <= config.token_budget < sum(config.tokens(memory_line(m)) for m in candidates)
+    assert summary.tokens_saved > 0
@@ -0,0 +1,33 @@
+"""Memory soak: RSS stays flat while one player plays many stubbed battles."""
+import asyncio
+
+import pytest
+
+from benchmarks.soak import rss_bytes, soak, soak_player
+
+WARMUP, BATTLES, TURNS, RETAIN = 100, 300, 10, 20
+# Without the cap the player grows ~10 KiB per battle (~3 MiB over the run).
+MAX_GROWTH = 1 << 20
+
+
+@pytest.mark.skipif(rss_bytes() is None, reason="needs /proc/self/statm")
+def bench_soak_rss(benchmark):
+    # The log writer is bound to the loop it first ran on, so every step shares one.
+    loop = asyncio.new_event_loop()
+    player = soak_player(RETAIN)
+    try:
+        loop.run_until_complete(soak(player, WARMUP, TURNS, samples=1))
+        baseline = rss_bytes()
+        rss = benchmark.pedantic(
+            lambda: loop.run_until_complete(soak(player, BATTLES, TURNS, start=WARMUP)), rounds=1, iterations=1
+        )
+        loop.run_until_complete(player.shutdown())
+    finally:
+        loop.close()
+
+    benchmark.extra_info["rss_mib"] = [round(r / 2**20, 2) for r in [baseline, *rss]]
+    assert max(rss) - baseline < MAX_GROWTH
+    assert len(player.battles) == RETAIN
+    assert player.n_finished_battles == WARMUP + BATTLES
+    assert player.n_won_battles == (WARMUP + BATTLES) // 2
+    assert not player.battle_store.states and not player.instrumentation.battles
@@ -0,0 +1,24 @@
+import pytest
+
+from benchmarks.stubs import recorded_battle
+from state_renderer import BattleStateRenderer
+
+
+@pytest.mark.parametrize("mode", ["text", "json"])
+def bench_render_full(benchmark, type_table, battle, mode):
+    def render():
+        return BattleStateRenderer(type_table, mode).render(battle)
+
+    assert benchmark(render)
+
+
+@pytest.mark.parametrize("mode", ["text", "json"])
+def bench_render_battle_incremental(benchmark, type_table, mode):
+    def render_battle():
+        renderer = BattleStateRenderer(type_table, mode)
+        for battle in recorded_battle(30):
+            renderer.render(battle)
+        return renderer
+
+    renderer = benchmark(render_battle)
+    assert renderer.reuses > 0
@@ -0,0 +1,37 @@
+"""Battles per hour against worker count, on a local Showdown server with stubbed
+Bedrock/Titan/Mongo backends.
+
+    python -m benchmarks.bot_pool --workers 2 4 8 --games 24
+
+Needs a Showdown server on localhost:8000 (see README). Workers ladder gen1ou,
+so they get matched against each other.
+"""
+import argparse
+
+from bot_pool import BotPool, load_accounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--games", type=int, default=24, help="ladder games per run")
+    parser.add_argument("--battles-per-worker", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Bedrock latency (s)")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'battles':>8} {'turns':>7} {'battles/h':>10}")
+    for workers in args.workers:
+        # Use even worker counts so every ladder search finds a partner from the pool.
+        pool = BotPool(
+            load_accounts(None, workers, prefix=f"bench{workers}w"),
+            factory_path="benchmarks.stubs:make_pool_player",
+            player_kwargs={"max_concurrent_battles": args.battles_per_worker, "stub_latency_s": args.latency},
+        )
+        for start in range(0, args.games, args.battles_per_worker):
+            pool.submit({"kind": "ladder", "games": min(args.battles_per_worker, args.games - start)})
+        summary = pool.run()
+        print(f"{workers:>8} {summary['battles']:>8} {summary['turns']:>7} {summary['battles_per_hour']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Turns per second against stubbed Bedrock/Mongo as concurrent battles go up.
+
+    python -m benchmarks.concurrency --turns 5 --battles 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from benchmarks.stubs import make_battle, make_player
+
+
+async def play(player, n_battles: int, n_turns: int) -> float:
+    battles = [make_battle(f"battle-gen1ou-{i}", opponent_index=i) for i in range(n_battles)]
+
+    async def run_battle(battle):
+        for turn in range(1, n_turns + 1):
+            battle._turn = turn
+            await player.choose_move(battle)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_battle(b) for b in battles))
+    rate = n_battles * n_turns / (time.perf_counter() - start)
+    await player.shutdown()
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--battles", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Bedrock latency (s)")
+    args = parser.parse_args()
+
+    print(f"{'battles':>8} {'inline t/s':>12} {'async t/s':>12}")
+    for n_battles in args.battles:
+        rates = []
+        for concurrency in (0, 16):
+            player = make_player(
+                bedrock_latency_s=args.latency,
+                bedrock_concurrency=concurrency,
+                embedding_concurrency=concurrency,
+                mongo_concurrency=concurrency,
+                max_concurrent_battles=n_battles,
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                rates.append(asyncio.run(play(player, n_battles, args.turns)))
+        print(f"{n_battles:>8} {rates[0]:>12.1f} {rates[1]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
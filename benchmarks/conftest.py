@@ -0,0 +1,36 @@
+"""Shared fixtures for the pytest-benchmark suites (``pytest benchmarks``)."""
+from pathlib import Path
+
+import pytest
+from poke_env.data.gen_data import GenData
+
+from benchmarks.replay import recorded_observations
+from benchmarks.stubs import make_battle
+from helpers import compile_type_chart
+
+DATA = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="session")
+def type_chart():
+    return GenData.from_format("gen1ou").type_chart
+
+
+@pytest.fixture(scope="session")
+def type_table(type_chart):
+    return compile_type_chart(type_chart)
+
+
+@pytest.fixture
+def battle():
+    return make_battle()
+
+
+@pytest.fixture(scope="session")
+def showdown_log() -> str:
+    return (DATA / "gen1ou-replay.log").read_text(encoding="utf-8")
+
+
+@pytest.fixture(scope="session", params=["text", "json"])
+def observation_docs(request):
+    return recorded_observations(n_battles=2, turns=30, mode=request.param)
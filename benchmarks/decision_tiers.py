@@ -0,0 +1,47 @@
+"""Share of turns served by each decision tier and their p50/p99 latency.
+
+    python -m benchmarks.decision_tiers --battles 20 --turns 30 --margin 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+
+from benchmarks.stubs import make_player, recorded_battle
+from decision_tiers import HeuristicConfig
+
+
+async def play(player, n_battles: int, n_turns: int):
+    for b in range(n_battles):
+        for battle in recorded_battle(n_turns, tag=f"battle-gen1ou-{b}"):
+            moves, switches = battle._available_moves, battle._available_switches
+            if battle.turn % 10 == 0:
+                # Recharge / forced-switch style turn with a single legal option.
+                battle._available_moves, battle._available_switches = moves[:1], []
+            await player.choose_move(battle)
+            battle._available_moves, battle._available_switches = moves, switches
+    await player.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--battles", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--margin", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Bedrock latency (s)")
+    args = parser.parse_args()
+
+    player = make_player(
+        bedrock_latency_s=args.latency,
+        heuristic_config=HeuristicConfig(margin_threshold=args.margin),
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(play(player, args.battles, args.turns))
+
+    print(f"{'tier':>10} {'turns':>6} {'share':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for tier, stats in player.decision_engine.stats().items():
+        print(f"{tier:>10} {stats['turns']:>6} {stats['fraction']:>7.1%} {stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
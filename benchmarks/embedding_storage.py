@@ -0,0 +1,104 @@
+"""Recall@k, bytes per document and query latency of each embedding storage setting.
+
+    python -m benchmarks.embedding_storage --rows 50000 --k 10 --dims 256 512 1024
+
+The corpus is `vector_index.synthetic_corpus` clusters embedded in 1024 dimensions; the
+256 and 512 dimension outputs are stood in for by a fixed random projection of it. Recall
+is against exact float search over the 1024-d vectors, so it counts what both the smaller
+output and the quantization lose. Bytes per document is the BSON size of the embedding fields one
+`battle_logs` document stores. Latency is a `LocalVectorIndex` search (no IVF).
+"""
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.vector_index import synthetic_corpus, timed_search
+from embedding_storage import TITAN_V2_DIMENSIONS, EmbeddingStorage, stored_bytes
+from memory_backends import LocalVectorIndex
+
+# (quantization, rerank) pairs compared at each dimension.
+SETTINGS = (("float", False), ("int8", False), ("int8", True), ("binary", False), ("binary", True))
+
+
+def corpus(rows: int, queries: int, clusters: int = 256, latent_dim: int = 64, seed: int = 0):
+    """1024-d vectors spanning a ``latent_dim`` subspace plus a little noise: embeddings
+    have a much lower intrinsic dimension than their size."""
+    rng = np.random.default_rng(seed)
+    latent = synthetic_corpus(rows + queries, latent_dim, clusters, seed)
+    mixing = rng.standard_normal((latent_dim, 1024)).astype(np.float32)
+    vectors = latent @ mixing
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors += 0.005 * rng.standard_normal(vectors.shape).astype(np.float32)
+    return vectors[:rows], vectors[rows:]
+
+
+def project(vectors: np.ndarray, dimensions: int, seed: int = 1) -> np.ndarray:
+    if dimensions == vectors.shape[1]:
+        return vectors
+    rng = np.random.default_rng(seed)
+    return vectors @ (rng.standard_normal((vectors.shape[1], dimensions)) / np.sqrt(dimensions)).astype(np.float32)
+
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray, k: int):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = queries @ vectors.T
+    return [set(np.argpartition(-row, k)[:k].tolist()) for row in scores]
+
+
+def recall_at_k(results, truth, k: int) -> float:
+    return float(np.mean([len({hit["row"] for hit in hits} & expected) / k for hits, expected in zip(results, truth)]))
+
+
+def evaluate(storage: EmbeddingStorage, vectors: np.ndarray, queries: np.ndarray, truth, k: int, path: str) -> dict:
+    vectors, queries = project(vectors, storage.dimensions), project(queries, storage.dimensions)
+    index = LocalVectorIndex(path, storage=storage, initial_capacity=len(vectors))
+    try:
+        index.add_many(vectors, [{"row": i} for i in range(len(vectors))])
+        results, (p50, p99) = timed_search(index, queries, k, exact=True)
+    finally:
+        index.close()
+    return {
+        "dimensions": storage.dimensions,
+        "quantization": storage.quantization,
+        "rerank": storage.reranks,
+        "recall": recall_at_k(results, truth, k),
+        "doc_bytes": stored_bytes(storage, vectors[0].tolist()),
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+    }
+
+
+def run(rows: int, n_queries: int, k: int, dims=TITAN_V2_DIMENSIONS, settings=SETTINGS, rerank_candidates: int = 50):
+    vectors, queries = corpus(rows, n_queries)
+    truth = ground_truth(vectors, queries, k)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for dimensions in dims:
+            for quantization, rerank in settings:
+                storage = EmbeddingStorage(dimensions, quantization, rerank, rerank_candidates)
+                path = f"{tmp}/index-{dimensions}-{quantization}-{int(rerank)}"
+                results.append(evaluate(storage, vectors, queries, truth, k, path))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", type=int, nargs="+", choices=TITAN_V2_DIMENSIONS, default=list(TITAN_V2_DIMENSIONS))
+    parser.add_argument("--rerank-candidates", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'dims':>5} {'storage':>14} {'recall@k':>9} {'bytes/doc':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in run(args.rows, args.queries, args.k, args.dims, rerank_candidates=args.rerank_candidates):
+        setting = r["quantization"] + ("+rerank" if r["rerank"] else "")
+        print(
+            f"{r['dimensions']:>5} {setting:>14} {r['recall']:>9.3f} {r['doc_bytes']:>10} "
+            f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Embedding requests per turn and embedding latency as concurrent battles go up.
+
+    python -m benchmarks.embeddings --battles 1 8 32 --turns 20 --latency 0.02
+
+Each battle is a scripted stub battle against one of six opponents, so concurrent
+battles share positions the way common ladder leads do. Modes:
+
+- ``direct``: one Titan request per uncached text, as soon as it's asked for;
+- ``coalesced``: single-flight and a short batching window (Titan takes one text per request);
+- ``batched``: the same, with a multi-text model, so each batch is one request.
+"""
+import argparse
+import asyncio
+
+from benchmarks.stubs import StubBedrockClient, make_player, recorded_battle
+from embedding_service import EmbeddingService
+from prefetch import PrefetchConfig
+
+MODES = ("direct", "coalesced", "batched")
+
+
+def embedding_player(mode: str, latency_s: float, **kwargs):
+    if mode == "batched":
+        kwargs.setdefault("embedding_model_id", "cohere.embed-english-v3")
+    # Only the turn's own embeddings are measured here (see benchmarks.prefetch).
+    kwargs.setdefault("prefetch", PrefetchConfig(enabled=False))
+    player = make_player(bedrock_latency_s=0.0, mongo_latency_s=0.0, **kwargs)
+    player.bedrock_embeddings = StubBedrockClient(latency_s=0.0, embedding_latency_s=latency_s)
+    if mode == "direct":
+        player.embedding_service = EmbeddingService(
+            player._invoke_embedding_model,
+            player.embedding_executor,
+            player.embedding_gateway,
+            player.embedding_cache,
+            window_s=None,
+            single_flight=False,
+        )
+    return player
+
+
+async def play(player, n_battles: int, n_turns: int) -> dict:
+    async def run_battle(i: int):
+        tag = f"battle-gen1ou-{i}"
+        for battle in recorded_battle(n_turns, tag=tag, opponent_index=i):
+            await player.choose_move(battle)
+
+    try:
+        await asyncio.gather(*(run_battle(i) for i in range(n_battles)))
+        await player._drain_background_tasks()
+    finally:
+        await player.shutdown()
+    service = player.embedding_service.stats()
+    latency = player.instrumentation.stats().get("embedding", {})
+    turns = n_battles * n_turns
+    return {
+        "turns": turns,
+        "requests_per_turn": service["invocations"] / turns,
+        "coalesced": service["coalesced"],
+        "mean_batch": service["mean_batch"],
+        "p50_ms": latency.get("p50_ms", 0.0),
+        "p99_ms": latency.get("p99_ms", 0.0),
+    }
+
+
+def run(mode: str, n_battles: int, n_turns: int, latency_s: float, **kwargs) -> dict:
+    player = embedding_player(mode, latency_s, max_concurrent_battles=n_battles, **kwargs)
+    return asyncio.run(play(player, n_battles, n_turns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub embedding latency (s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="embedding calls in flight")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'battles':>8} {'mode':>10} {'req/turn':>9} {'coalesced':>10} {'batch':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for n_battles in args.battles:
+        for mode in args.modes:
+            r = run(mode, n_battles, args.turns, args.latency, embedding_concurrency=args.concurrency)
+            print(
+                f"{n_battles:>8} {mode:>10} {r['requests_per_turn']:>9.2f} {r['coalesced']:>10} "
+                f"{r['mean_batch']:>6.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Battle export: throughput into Parquet, and scanning the export versus the Mongo aggregation.
+
+    python -m benchmarks.export --battles 2000 --turns 30
+    python -m benchmarks.export --mongo-uri "$MONGO_URI" --db pokemon_ai   # against a real battle_logs
+
+Turn logs are the synthetic battles of `benchmarks.opponent_stats`, filled out like
+real ones: a context string, rendered observation text, and a 256-d embedding stored
+as an int8 vector with its float32 rerank copy. `BattleExport` reads them from
+in-memory collections, so the export figure is encoding and writing only.
+
+The scan is one analysis query: win rate by opponent species and our action. On the
+export it reads three columns of the hive-partitioned dataset. Without a server, the
+Mongo side is what a collection scan costs the client: decoding the BSON of every
+turn, then grouping. With ``--mongo-uri`` it runs `win_rate_pipeline` on the server.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import bson
+import numpy as np
+from bson.objectid import ObjectId
+
+from battle_export import BattleExport
+from benchmarks.opponent_stats import synthetic_logs
+from benchmarks.stubs import StubCollection, StubCursor
+from embedding_storage import EmbeddingStorage
+
+DIMENSIONS = 256
+OBSERVATION = (
+    "Turn {turn}. Your active Pokémon: {active} (HP {hp:.0%}). Opponent: {opponent} (HP {opp_hp:.0%}).\n"
+    "Known opponent moves: {moves}. Fainted opponents: {fainted}.\n"
+    "Available moves: {available}. Available switches: {switches}."
+)
+
+
+class TurnsByBattle:
+    """`battle_logs` stand-in that answers the export's ``battle_id $in`` query from a dict."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.by_battle = defaultdict(list)
+        for doc in docs:
+            self.by_battle[doc["battle_id"]].append(doc)
+
+    def find(self, filter=None, projection=None):
+        return StubCursor([doc for battle_id in filter["battle_id"]["$in"] for doc in self.by_battle[battle_id]])
+
+
+def synthetic_battles(n_battles: int, n_turns: int, seed: int = 0, start: datetime = datetime(2026, 10, 1)):
+    """``wins`` and ``battle_logs`` documents for finished battles, about 3 hours apart."""
+    storage = EmbeddingStorage(dimensions=DIMENSIONS, quantization="int8", rerank=True)
+    rng = np.random.default_rng(seed)
+    shuffle = random.Random(seed)
+    logs = synthetic_logs(n_battles, n_turns, seed)
+    wins = []
+    for b in range(n_battles):
+        ended = start + timedelta(hours=3 * b)
+        turns = logs[b * n_turns:(b + 1) * n_turns]
+        for doc in turns:
+            hp, opp_hp = shuffle.random(), shuffle.random()
+            available = ["bodyslam", "hyperbeam", "earthquake", "rest"]
+            switches = ["tauros", "snorlax", "chansey"]
+            doc.update({
+                "_id": ObjectId(),
+                "timestamp": ended - timedelta(seconds=20 * (n_turns - doc["turn"])),
+                "player_username": "caveman_llm_bot1",
+                "opponent_username": f"human_player{b % 7}",
+                "context": (
+                    f"Active: {doc['active_pokemon']}, Opponent: {doc['opponent_active']}, MyHP: {hp:.2f}, "
+                    f"OpponentHP: {opp_hp:.2f}, AvailableMoves: {available}, AvailableSwitches: {switches}"
+                ),
+                "context_version": 1,
+                "observation": OBSERVATION.format(
+                    turn=doc["turn"], active=doc["active_pokemon"], hp=hp, opponent=doc["opponent_active"],
+                    opp_hp=opp_hp, moves=doc["opponent_moves"], fainted=doc["opponent_fainted"],
+                    available=available, switches=switches,
+                ),
+                "llm_decision_raw": {"thought": "Hit it with the strongest neutral move.", "move": doc["action_name"]},
+                "decision_tier": shuffle.choice(("heuristic", "cache", "llm")),
+                "fallback_used": False,
+                "memories_used": shuffle.randint(0, 3),
+                "won": doc["outcome"] == "win",
+                "battle_turns": n_turns,
+                "embedding_model": "amazon.titan-embed-text-v2:0",
+                **storage.encode(rng.standard_normal(DIMENSIONS).astype(np.float32)),
+            })
+        wins.append({
+            "_id": ObjectId.from_datetime(ended),
+            "battle_id": turns[0]["battle_id"],
+            "timestamp": ended,
+            "player_username": "caveman_llm_bot1",
+            "opponent_username": f"human_player{b % 7}",
+            "outcome": turns[0]["outcome"],
+            "won": turns[0]["outcome"] == "win",
+            "turns": n_turns,
+        })
+    return wins, logs
+
+
+def collections(wins, logs):
+    wins_collection = StubCollection(latency_s=0.0)
+    wins_collection.docs = list(wins)
+    return wins_collection, TurnsByBattle(logs)
+
+
+def export(wins, logs, out_dir: str, page_size: int = 500, **kwargs) -> dict:
+    # The synthetic battles run into the future; export them all.
+    kwargs.setdefault("lag_s", None)
+    exporter = BattleExport(*collections(wins, logs), out_dir, dimensions=DIMENSIONS, page_size=page_size, **kwargs)
+    return exporter.run()
+
+
+def win_rate_pipeline() -> list:
+    """The scan query as a `battle_logs` aggregation: win rate by opponent species and our action."""
+    return [
+        {"$match": {"won": {"$in": [True, False]}}},
+        {"$group": {
+            "_id": {"opponent": "$opponent_active", "action": "$action_name"},
+            "turns": {"$sum": 1},
+            "wins": {"$sum": {"$cond": ["$won", 1, 0]}},
+        }},
+        {"$set": {"win_rate": {"$divide": ["$wins", "$turns"]}}},
+    ]
+
+
+def scan_parquet(out_dir: str) -> dict:
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(out_dir, "battle_logs"), format="parquet", partitioning="hive")
+    table = dataset.to_table(columns=["opponent_species", "action_name", "won"], filter=pc.field("won").is_valid())
+    table = table.unify_dictionaries().set_column(2, "won", pc.cast(table.column("won"), "int8"))
+    grouped = table.group_by(["opponent_species", "action_name"]).aggregate([("won", "count"), ("won", "sum")])
+    return {
+        (str(opponent), str(action)): (turns, wins)
+        for opponent, action, turns, wins in zip(
+            grouped.column("opponent_species").to_pylist(), grouped.column("action_name").to_pylist(),
+            grouped.column("won_count").to_pylist(), grouped.column("won_sum").to_pylist(),
+        )
+    }
+
+
+def scan_bson(encoded: bytes) -> dict:
+    """The same grouping over the decoded turn documents."""
+    groups = {}
+    for doc in bson.decode_all(encoded):
+        if doc.get("won") is None:
+            continue
+        key = (doc["opponent_active"], doc["action_name"])
+        turns, wins = groups.get(key, (0, 0))
+        groups[key] = (turns + 1, wins + doc["won"])
+    return groups
+
+
+def scan_mongo(collection) -> dict:
+    return {
+        (row["_id"]["opponent"], row["_id"]["action"]): (row["turns"], row["wins"])
+        for row in collection.aggregate(win_rate_pipeline(), allowDiskUse=True)
+    }
+
+
+def timed(fn, *args, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(n_battles: int, n_turns: int, page_size: int = 500, mongo_collection=None, seed: int = 0) -> dict:
+    wins, logs = synthetic_battles(n_battles, n_turns, seed)
+    encoded = b"".join(bson.encode(doc) for doc in logs)
+    with tempfile.TemporaryDirectory() as out_dir:
+        stats = export(wins, logs, out_dir, page_size)
+        parquet_s, parquet_groups = timed(scan_parquet, out_dir)
+        bson_s, bson_groups = timed(scan_bson, encoded)
+        report = {
+            **stats,
+            "bson_bytes": len(encoded),
+            "parquet_scan_ms": parquet_s * 1000,
+            "bson_scan_ms": bson_s * 1000,
+            "scans_match": parquet_groups == bson_groups,
+        }
+    if mongo_collection is not None:
+        mongo_s, _ = timed(scan_mongo, mongo_collection, repeat=1)
+        report["mongo_scan_ms"] = mongo_s * 1000
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=30, help="turns per battle")
+    parser.add_argument("--page-size", type=int, default=500, help="battles per export page")
+    parser.add_argument("--mongo-uri", help="also time the aggregation on this server's battle_logs")
+    parser.add_argument("--db", default="pokemon_ai")
+    args = parser.parse_args()
+
+    collection = None
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        collection = MongoClient(args.mongo_uri)[args.db]["battle_logs"]
+    r = run(args.battles, args.turns, args.page_size, collection)
+    print(f"battles / turns      {r['battles']:>8} / {r['turns']}")
+    print(f"export               {r['turns_per_s']:>12,.0f} turns/s ({r['elapsed_s']:.2f} s, {r['files']} files)")
+    print(f"size                 {r['bytes_written'] / 2**20:>10.1f} MB parquet, {r['bson_bytes'] / 2**20:.1f} MB bson")
+    print(f"scan parquet         {r['parquet_scan_ms']:>10.1f} ms")
+    print(f"scan bson (client)   {r['bson_scan_ms']:>10.1f} ms (same groups: {r['scans_match']})")
+    if "mongo_scan_ms" in r:
+        print(f"scan mongo aggregate {r['mongo_scan_ms']:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
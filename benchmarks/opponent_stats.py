@@ -0,0 +1,180 @@
+"""Opponent-stats index: incremental updates, per-turn lookups, checkpoints and a full rebuild.
+
+    python -m benchmarks.opponent_stats --battles 5000 --turns 30
+
+Turn logs are synthetic. Each battle faces six gen 1 species, each with a fixed set of
+four moves that it reveals as the battle goes. The opponent switches or loses its
+active now and then. Updates are `OpponentStats.observe` per logged turn. Lookups are
+what a turn reads: the prompt summary and the switch-scoring threat types. The rebuild
+feeds the battles, grouped the way `battle_turns_pipeline` returns them, into a new
+index.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from poke_env.data.gen_data import GenData
+
+from benchmarks.stubs import OUR_TEAM
+from opponent_stats import PROJECTION, OpponentStats, OpponentStatsConfig
+
+
+def _gen1_pools(seed: int = 0):
+    data = GenData.from_gen(1)
+    species = sorted(sid for sid, entry in data.pokedex.items() if 0 < entry["num"] <= 151 and "forme" not in entry)
+    moves = sorted(mid for mid, entry in data.moves.items() if 0 < entry.get("num", 0) <= 165)
+    rng = random.Random(seed)
+    return species, {sid: rng.sample(moves, 4) for sid in species}
+
+
+def synthetic_logs(n_battles: int, n_turns: int, seed: int = 0):
+    """Turn log documents, battle after battle, turns in order."""
+    species, movesets = _gen1_pools(seed)
+    rng = random.Random(seed)
+    ours = list(OUR_TEAM)
+    docs = []
+    for b in range(n_battles):
+        battle_id = f"battle-gen1ou-{b}"
+        team = rng.sample(species, 6)
+        outcome = rng.choice(("win", "loss"))
+        opponent, revealed, fainted = team[0], {}, []
+        active = ours[0]
+        for turn in range(1, n_turns + 1):
+            roll = rng.random()
+            if roll < 0.1:
+                opponent = rng.choice([s for s in team if s != opponent and s not in fainted] or [opponent])
+            elif roll < 0.15 and len(fainted) < 5:
+                fainted.append(opponent)
+                opponent = rng.choice([s for s in team if s not in fainted])
+            if rng.random() < 0.5:
+                known = revealed.setdefault(opponent, [])
+                if len(known) < 4:
+                    known.append(movesets[opponent][len(known)])
+            if rng.random() < 0.15:
+                active = rng.choice(ours)
+                action_type, action_name = "switch", active
+            else:
+                action_type, action_name = "move", rng.choice(OUR_TEAM[active])
+            docs.append({
+                "battle_id": battle_id,
+                "turn": turn,
+                "active_pokemon": active,
+                "opponent_active": opponent,
+                "opponent_moves": list(revealed.get(opponent, ())),
+                "opponent_fainted": list(fainted),
+                "action_type": action_type,
+                "action_name": action_name,
+                "outcome": outcome,
+            })
+    return docs
+
+
+def battle_documents(docs):
+    """What `battle_turns_pipeline` yields for these turn logs."""
+    battles = {}
+    for doc in sorted(docs, key=lambda d: (d["battle_id"], d["turn"])):
+        battle = battles.setdefault(doc["battle_id"], {"_id": doc["battle_id"], "outcome": doc.get("outcome"), "turns": []})
+        battle["turns"].append({field: doc.get(field) for field in PROJECTION if field != "_id"})
+    return list(battles.values())
+
+
+def incremental(docs, config: OpponentStatsConfig) -> dict:
+    index = OpponentStats(config)
+    started = time.perf_counter()
+    last = None
+    for doc in docs:
+        if last is not None and doc["battle_id"] != last["battle_id"]:
+            index.battle_finished(last["battle_id"], last["outcome"])
+        index.observe(doc)
+        last = doc
+    if last is not None:
+        index.battle_finished(last["battle_id"], last["outcome"])
+    elapsed = time.perf_counter() - started
+    return {"index": index, "observe_us": elapsed / len(docs) * 1e6}
+
+
+def lookups(index: OpponentStats, docs, share: float = 0.3) -> dict:
+    """Per-turn reads, warm, and the first read of each species after its counters changed."""
+    species = [doc["opponent_active"] for doc in docs]
+    distinct = set(species)
+    index._summaries.clear()
+    index._threats.clear()
+    started = time.perf_counter()
+    for s in distinct:
+        index.summary(s)
+        index.threat_types(s, share)
+    cold_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for s in species:
+        index.summary(s)
+        index.threat_types(s, share)
+    warm_s = time.perf_counter() - started
+    return {
+        "species": sum(1 for s in distinct if index.summary(s) is not None),
+        "lookup_cold_us": cold_s / len(distinct) * 1e6,
+        "lookup_us": warm_s / len(species) * 1e6,
+    }
+
+
+def checkpoint(index: OpponentStats, path: str) -> dict:
+    started = time.perf_counter()
+    index.save(path)
+    save_s = time.perf_counter() - started
+    reloaded = OpponentStats(OpponentStatsConfig(path=path))
+    started = time.perf_counter()
+    reloaded.load()
+    load_s = time.perf_counter() - started
+    return {
+        "checkpoint_bytes": os.path.getsize(path),
+        "save_ms": save_s * 1000,
+        "load_ms": load_s * 1000,
+        "roundtrip": {s: v.to_list() for s, v in reloaded.species.items()} == {s: v.to_list() for s, v in index.species.items()},
+    }
+
+
+def rebuild(docs, config: OpponentStatsConfig) -> dict:
+    battles = battle_documents(docs)
+    started = time.perf_counter()
+    index = OpponentStats.rebuild(battles, config)
+    elapsed = time.perf_counter() - started
+    return {"index": index, "rebuild_turns_per_s": len(docs) / elapsed if elapsed else 0.0}
+
+
+def run(n_battles: int, n_turns: int, seed: int = 0) -> dict:
+    docs = synthetic_logs(n_battles, n_turns, seed)
+    config = OpponentStatsConfig(path=None)
+    live = incremental(docs, config)
+    rebuilt = rebuild(docs, config)
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = checkpoint(live["index"], os.path.join(tmp, "opponent_stats.json.gz"))
+    return {
+        "turns": len(docs),
+        "observe_us": live["observe_us"],
+        **lookups(live["index"], docs),
+        **saved,
+        "rebuild_turns_per_s": rebuilt["rebuild_turns_per_s"],
+        # The rebuild and the live updates go through the same code, so they agree.
+        "rebuild_matches": rebuilt["index"].to_dict()["species"] == live["index"].to_dict()["species"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=30, help="turns per battle")
+    args = parser.parse_args()
+
+    r = run(args.battles, args.turns)
+    print(f"turns logged         {r['turns']:>12}")
+    print(f"species              {r['species']:>12}")
+    print(f"observe              {r['observe_us']:>10.2f}µs/turn")
+    print(f"lookup (re-render)   {r['lookup_cold_us']:>10.2f}µs/species")
+    print(f"lookup               {r['lookup_us']:>10.2f}µs/turn")
+    print(f"checkpoint           {r['checkpoint_bytes']:>12} bytes, save {r['save_ms']:.1f} ms, load {r['load_ms']:.1f} ms")
+    print(f"rebuild              {r['rebuild_turns_per_s']:>12,.0f} turns/s (matches live: {r['rebuild_matches']})")
+
+
+if __name__ == "__main__":
+    main()
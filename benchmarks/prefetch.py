@@ -0,0 +1,105 @@
+"""Prefetch hit rate and LLM-turn latency with speculative prefetch off and on.
+
+    python -m benchmarks.prefetch --battles 8 --turns 30 --gap 0.2
+    python -m benchmarks.prefetch --showdown-log benchmarks/data/gen1ou-replay.log
+
+Every turn goes to the stub LLM. After each order a battle waits ``--gap`` seconds
+before its next turn, which stands in for the opponent's move and the server round
+trip. That wait is when prefetches run. Turn latency is timed around ``choose_move``.
+Embedding requests per turn show what the prefetches cost.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.replay import battles_from_showdown_log
+from benchmarks.stubs import StubBedrockClient, make_player, recorded_battle
+from decision_tiers import HeuristicConfig
+from prefetch import PrefetchConfig
+
+MODES = ("off", "on")
+
+
+def prefetch_player(mode: str, embedding_latency_s: float, search_latency_s: float, llm_latency_s: float, **kwargs):
+    kwargs.setdefault("heuristic_config", HeuristicConfig(enabled=False))
+    kwargs.setdefault("prefetch", PrefetchConfig(enabled=mode == "on"))
+    player = make_player(bedrock_latency_s=llm_latency_s, mongo_latency_s=search_latency_s, **kwargs)
+    player.bedrock_embeddings = StubBedrockClient(latency_s=0.0, embedding_latency_s=embedding_latency_s)
+    return player
+
+
+def scripted_battles(n_battles: int, n_turns: int):
+    return [recorded_battle(n_turns, tag=f"battle-gen1ou-{i}", opponent_index=i) for i in range(n_battles)]
+
+
+async def play(player, battles, gap_s: float) -> dict:
+    latencies = []
+
+    async def run_battle(states):
+        previous = None
+        for battle in states:
+            started = time.perf_counter()
+            await player.choose_move(battle)
+            latencies.append(time.perf_counter() - started)
+            previous = battle
+            await asyncio.sleep(gap_s)
+        if previous is not None:
+            player._battle_finished_callback(previous)
+
+    try:
+        await asyncio.gather(*(run_battle(states) for states in battles))
+        await player._drain_background_tasks()
+    finally:
+        await player.shutdown()
+    prefetch = player.prefetcher.stats()
+    turns = len(latencies)
+    return {
+        "turns": turns,
+        "hit_rate": prefetch["hit_rate"],
+        "partial_hits": prefetch["partial_hits"],
+        "timeouts": prefetch["timeouts"],
+        "cancelled": prefetch["cancelled"],
+        "saved_ms_per_turn": prefetch["saved_ms"] / turns if turns else 0.0,
+        "embeddings_per_turn": player.embedding_service.stats()["invocations"] / turns if turns else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000) if turns else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99) * 1000) if turns else 0.0,
+    }
+
+
+def run(mode: str, battles, gap_s: float, embedding_latency_s: float, search_latency_s: float, llm_latency_s: float, **kwargs):
+    player = prefetch_player(mode, embedding_latency_s, search_latency_s, llm_latency_s, **kwargs)
+    return asyncio.run(play(player, battles, gap_s))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=8, help="scripted stub battles")
+    parser.add_argument("--turns", type=int, default=30, help="turns per scripted stub battle")
+    parser.add_argument("--showdown-log", help="replay this Showdown log instead of scripted battles")
+    parser.add_argument("--username", default="caveman_llm_bot1", help="our side in --showdown-log")
+    parser.add_argument("--gap", type=float, default=0.2, help="time between a battle's turns (s)")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="stub Titan latency (s)")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="stub Mongo latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub Claude latency (s)")
+    args = parser.parse_args()
+
+    if args.showdown_log:
+        with open(args.showdown_log, encoding="utf-8") as f:
+            log = f.read()
+        battles = lambda: [battles_from_showdown_log(log, args.username)]
+    else:
+        battles = lambda: scripted_battles(args.battles, args.turns)
+
+    print(f"{'prefetch':>8} {'turns':>6} {'hit rate':>9} {'saved/turn':>11} {'emb/turn':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in MODES:
+        r = run(mode, battles(), args.gap, args.embedding_latency, args.search_latency, args.llm_latency)
+        print(
+            f"{mode:>8} {r['turns']:>6} {r['hit_rate']:>9.1%} {r['saved_ms_per_turn']:>9.1f}ms "
+            f"{r['embeddings_per_turn']:>9.2f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
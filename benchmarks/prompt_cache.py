@@ -0,0 +1,106 @@
+"""Time to first token and input-token cost of LLM turns with prompt caching off and on.
+
+    python -m benchmarks.prompt_cache --battles 4 --turns 30 --prefill 0.00005
+
+Every turn goes to the stub Claude, which bills input like the Bedrock prompt cache
+(`StubBedrockClient`). Each input token it has to process adds ``--prefill`` seconds
+before the first token. Cache reads add nothing. Cost is in uncached-token
+equivalents: reads count a tenth of a token and writes 1.25 tokens
+(`llm_prompt.input_cost`). Prefixes under ``--min-cache-tokens`` aren't cached.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+
+from benchmarks.stubs import StubBedrockClient, make_player, recorded_battle
+from decision_tiers import HeuristicConfig
+from llm_prompt import LLMPromptConfig, input_cost
+from prefetch import PrefetchConfig
+
+MODES = ("off", "on")
+TOKEN_COUNTERS = {
+    "bedrock_input_tokens": "input_tokens",
+    "bedrock_cache_read_tokens": "cache_read_tokens",
+    "bedrock_cache_write_tokens": "cache_write_tokens",
+}
+
+
+def prompt_cache_player(mode: str, first_token_s: float, prefill_s: float, min_cache_tokens: int = 1024, **kwargs):
+    kwargs.setdefault("heuristic_config", HeuristicConfig(enabled=False))
+    kwargs.setdefault("prefetch", PrefetchConfig(enabled=False))
+    player = make_player(decision_cache_size=0, llm_prompt=LLMPromptConfig(cache=mode == "on"), **kwargs)
+    player.bedrock_runtime = StubBedrockClient(
+        latency_s=first_token_s, input_token_latency_s=prefill_s, min_cache_tokens=min_cache_tokens
+    )
+    player.bedrock_embeddings = StubBedrockClient(latency_s=0.0)
+    return player
+
+
+def input_tokens(instrumentation, model_id: str) -> dict:
+    """Input tokens of a model's calls so far, by kind."""
+    tokens = dict.fromkeys(TOKEN_COUNTERS.values(), 0)
+    for (name, labels), value in instrumentation.counters.items():
+        if name in TOKEN_COUNTERS and ("model", model_id) in labels:
+            tokens[TOKEN_COUNTERS[name]] += value
+    return tokens
+
+
+async def play(player, n_battles: int, n_turns: int):
+    async def run_battle(i):
+        battle = None
+        for battle in recorded_battle(n_turns, tag=f"battle-gen1ou-{i}", opponent_index=i):
+            await player.choose_move(battle)
+        if battle is not None:
+            player._battle_finished_callback(battle)
+
+    try:
+        await asyncio.gather(*(run_battle(i) for i in range(n_battles)))
+        await player._drain_background_tasks()
+    finally:
+        await player.shutdown()
+
+
+def run(mode: str, n_battles: int, n_turns: int, first_token_s: float, prefill_s: float, **kwargs) -> dict:
+    player = prompt_cache_player(mode, first_token_s, prefill_s, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(play(player, n_battles, n_turns))
+    ttft = player.instrumentation.stats()["llm_first_token"]
+    tokens = input_tokens(player.instrumentation, player.llm_prompt.model_id)
+    calls = ttft["count"]
+    total = sum(tokens.values())
+    return {
+        "calls": calls,
+        "ttft_p50_ms": ttft["p50_ms"],
+        "ttft_p99_ms": ttft["p99_ms"],
+        "prompt_tokens_per_call": total / calls if calls else 0.0,
+        "cached_share": tokens["cache_read_tokens"] / total if total else 0.0,
+        **{f"{kind}_per_call": value / calls if calls else 0.0 for kind, value in tokens.items()},
+        "cost_per_call": input_cost(tokens) / calls if calls else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=4, help="concurrent scripted stub battles")
+    parser.add_argument("--turns", type=int, default=30, help="turns per battle")
+    parser.add_argument("--first-token", type=float, default=0.05, help="stub time to first token before prefill (s)")
+    parser.add_argument("--prefill", type=float, default=0.00005, help="stub time per uncached input token (s)")
+    parser.add_argument("--min-cache-tokens", type=int, default=1024, help="shortest cacheable prefix")
+    args = parser.parse_args()
+
+    print(
+        f"{'cache':>6} {'calls':>6} {'ttft p50':>9} {'ttft p99':>9} {'in tok/call':>12} "
+        f"{'uncached':>9} {'read':>7} {'write':>7} {'cost/call':>10}"
+    )
+    for mode in MODES:
+        r = run(mode, args.battles, args.turns, args.first_token, args.prefill, min_cache_tokens=args.min_cache_tokens)
+        print(
+            f"{mode:>6} {r['calls']:>6} {r['ttft_p50_ms']:>7.1f}ms {r['ttft_p99_ms']:>7.1f}ms "
+            f"{r['prompt_tokens_per_call']:>12.0f} {r['input_tokens_per_call']:>9.0f} {r['cache_read_tokens_per_call']:>7.0f} "
+            f"{r['cache_write_tokens_per_call']:>7.0f} {r['cost_per_call']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Replay recorded battle states through ``choose_move`` against the stubs.
+
+    python -m benchmarks.replay --stub-battles 4 --turns 30
+    python -m benchmarks.replay --observations battle_logs.json --latency 0.2
+    python -m benchmarks.replay --showdown-log benchmarks/data/gen1ou-replay.log --username caveman_llm_bot1
+
+States come from ``battle_logs`` documents (their ``observation`` text or JSON, as
+exported with ``mongoexport``), from a Showdown replay log, or from the scripted stub
+battles. Bedrock, Titan and Mongo are the deterministic stubs with the given latency.
+Reports throughput, the per-stage latency from the player's instrumentation, the
+decision tier mix and, with ``--allocations``, tracemalloc figures per turn.
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from bson import json_util
+from poke_env.data.gen_data import GenData
+from poke_env.environment.battle import Battle
+from poke_env.environment.move import Move
+
+from benchmarks.stubs import OUR_TEAM, _make_pokemon, make_player, recorded_battle
+from observations import battle_from_observation
+from state_renderer import BattleStateRenderer
+
+StateSource = Callable[[], Iterable[Battle]]
+
+
+# ----------------------------
+# battle_logs -> battles
+# ----------------------------
+
+def battles_from_logs(docs: Iterable[dict]) -> Iterator[Battle]:
+    """One ``Battle`` per ``battle_logs`` document, in battle and turn order."""
+    docs = sorted(docs, key=lambda d: (d["battle_id"], d["turn"]))
+    for battle_id, turns in groupby(docs, key=lambda d: d["battle_id"]):
+        for doc in turns:
+            yield battle_from_observation(doc["observation"], battle_id, doc["turn"])
+
+
+def load_battle_logs(path: str) -> List[dict]:
+    """``battle_logs`` documents from a ``mongoexport`` JSON-lines file."""
+    with open(path, encoding="utf-8") as f:
+        return [json_util.loads(line) for line in f if line.strip()]
+
+
+def recorded_observations(n_battles: int = 2, turns: int = 30, mode: str = "text") -> List[dict]:
+    """``battle_logs``-shaped documents rendered from the scripted stub battles."""
+    from helpers import compile_type_chart
+
+    type_table = compile_type_chart(GenData.from_format("gen1ou").type_chart)
+    docs = []
+    for b in range(n_battles):
+        renderer = BattleStateRenderer(type_table, mode)
+        tag = f"battle-gen1ou-{b}"
+        for battle in recorded_battle(turns, tag=tag):
+            docs.append({"battle_id": tag, "turn": battle.turn, "observation": renderer.render(battle)})
+    return docs
+
+
+# ----------------------------
+# Showdown replay logs -> battles
+# ----------------------------
+
+def battles_from_showdown_log(log: str, username: str, team: Optional[Dict[str, List[str]]] = None) -> Iterator[Battle]:
+    """Yield the battle as ``username`` saw it at each ``|turn|`` of a Showdown replay log.
+
+    Replays don't carry the player's requests, so the available moves and switches
+    are rebuilt from ``team`` (species -> move ids) and the HP seen so far.
+    """
+    team = OUR_TEAM if team is None else team
+    tag = next((line[1:].strip() for line in log.splitlines() if line.startswith(">battle-")), "battle-gen1ou-replay")
+    battle = Battle(tag, username, logging.getLogger("replay"), gen=1)
+    for line in log.splitlines():
+        if not line.startswith("|"):
+            continue
+        split_message = line.split("|")
+        if len(split_message) < 2 or split_message[1] in ("", "t:", "j", "l", "c", "raw", "inactive", "inactiveoff", "win", "tie"):
+            continue
+        battle.parse_message(split_message)
+        if split_message[1] == "turn" and battle.player_role:
+            _fill_options(battle, team)
+            yield battle
+
+
+def _fill_options(battle: Battle, team: Dict[str, List[str]]):
+    role = battle.player_role
+    for species, moves in team.items():
+        pokemon = next((p for p in battle._team.values() if p.species == species), None)
+        if pokemon is None:
+            # Keyed like poke-env's own identifiers, so a later |switch| finds this entry.
+            pokemon = _make_pokemon(species)
+            battle._team[f"{role}: {GenData.from_gen(1).pokedex[species]['name']}"] = pokemon
+        for move_id in moves:
+            if move_id not in pokemon._moves:
+                pokemon._moves[move_id] = Move(move_id, gen=1)
+    active = battle.active_pokemon
+    battle._available_moves = [m for m in active.moves.values() if m.current_pp > 0] if active else []
+    battle._available_switches = [p for p in battle.team.values() if not p.active and not p.fainted]
+
+
+# ----------------------------
+# Harness
+# ----------------------------
+
+@dataclass
+class ReplayReport:
+    turns: int
+    battles: int
+    elapsed_s: float
+    stages: dict = field(default_factory=dict)
+    tiers: dict = field(default_factory=dict)
+    peak_kb: Optional[float] = None
+    retained_kb_per_turn: Optional[float] = None
+
+    @property
+    def turns_per_s(self) -> float:
+        return self.turns / self.elapsed_s if self.elapsed_s else 0.0
+
+
+async def replay(player, states: Iterable[Battle], allocations: bool = False) -> ReplayReport:
+    """Feed each state to ``player.choose_move`` in order; a new tag ends the previous battle."""
+    if allocations:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+    turns, tags, previous = 0, set(), None
+    started = time.perf_counter()
+    for battle in states:
+        if previous is not None and previous.battle_tag != battle.battle_tag:
+            player._battle_finished_callback(previous)
+        await player.choose_move(battle)
+        turns += 1
+        tags.add(battle.battle_tag)
+        previous = battle
+    if previous is not None:
+        player._battle_finished_callback(previous)
+    await player.log_writer.flush()
+    elapsed = time.perf_counter() - started
+
+    report = ReplayReport(turns, len(tags), elapsed, player.instrumentation.stats(), player.decision_engine.stats())
+    if allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report.peak_kb = (peak - baseline) / 1024
+        report.retained_kb_per_turn = (current - baseline) / 1024 / turns if turns else 0.0
+    return report
+
+
+def run(source: StateSource, allocations: bool = False, **player_kwargs) -> ReplayReport:
+    """Replay ``source()`` on a fresh stubbed player and shut it down afterwards."""
+    async def main():
+        player = make_player(**player_kwargs)
+        try:
+            return await replay(player, source(), allocations)
+        finally:
+            await player.shutdown()
+
+    return asyncio.run(main())
+
+
+def print_report(report: ReplayReport):
+    print(f"{report.turns} turns over {report.battles} battles in {report.elapsed_s:.2f}s → {report.turns_per_s:.1f} turns/s")
+    if report.peak_kb is not None:
+        print(f"allocations: peak {report.peak_kb:.0f} KiB, retained {report.retained_kb_per_turn:.1f} KiB/turn")
+    print(f"\n{'stage':>16} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage, s in sorted(report.stages.items()):
+        print(f"{stage:>16} {s['count']:>6} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}")
+    print(f"\n{'tier':>16} {'turns':>6} {'share':>8}")
+    for tier, s in report.tiers.items():
+        print(f"{tier:>16} {s['turns']:>6} {s['fraction']:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--observations", help="mongoexport of battle_logs (JSON lines)")
+    source.add_argument("--showdown-log", help="Showdown replay log")
+    source.add_argument("--stub-battles", type=int, default=4, help="scripted stub battles")
+    parser.add_argument("--username", default="caveman_llm_bot1", help="our side in --showdown-log")
+    parser.add_argument("--turns", type=int, default=30, help="turns per scripted stub battle")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Bedrock latency (s)")
+    parser.add_argument("--mongo-latency", type=float, default=0.01, help="stub Mongo latency (s)")
+    parser.add_argument("--state-format", choices=("text", "json"), default="text")
+    parser.add_argument("--allocations", action="store_true", help="trace allocations (slower)")
+    args = parser.parse_args()
+
+    if args.observations:
+        docs = load_battle_logs(args.observations)
+        states = lambda: battles_from_logs(docs)
+    elif args.showdown_log:
+        with open(args.showdown_log, encoding="utf-8") as f:
+            log = f.read()
+        states = lambda: battles_from_showdown_log(log, args.username)
+    else:
+        states = lambda: (
+            battle for b in range(args.stub_battles) for battle in recorded_battle(args.turns, tag=f"battle-gen1ou-{b}")
+        )
+
+    report = run(
+        states,
+        allocations=args.allocations,
+        bedrock_latency_s=args.latency,
+        mongo_latency_s=args.mongo_latency,
+        state_format=args.state_format,
+    )
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
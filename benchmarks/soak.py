@@ -0,0 +1,101 @@
+"""Memory soak: play many stubbed battles through one player and watch its RSS.
+
+    python -m benchmarks.soak --battles 500 --turns 20 --retain 100 none
+
+Every battle is a scripted stub battle registered with the player the way poke-env
+does it, played turn by turn through ``choose_move`` and finished through
+``_battle_finished_callback``. Logged turns are dropped from the stub collections as
+each battle ends, so what grows is the player itself. ``--retain none`` keeps every
+finished battle, as poke-env does on its own.
+"""
+import argparse
+import asyncio
+import gc
+import os
+from typing import List, Optional
+
+from benchmarks.stubs import make_player, recorded_battle
+from instrumentation import Instrumentation
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def soak_player(max_retained_battles: Optional[int] = 100, **kwargs):
+    """A zero-latency stub player; small histogram windows so they fill up early in the run."""
+    kwargs.setdefault("instrumentation", Instrumentation(window=256))
+    kwargs.setdefault("embedding_cache_size", 256)
+    kwargs.setdefault("decision_cache_size", 256)
+    return make_player(
+        bedrock_latency_s=0.0,
+        mongo_latency_s=0.0,
+        bedrock_concurrency=0,
+        embedding_concurrency=0,
+        mongo_concurrency=0,
+        llm_deadline_s=None,
+        max_retained_battles=max_retained_battles,
+        **kwargs,
+    )
+
+
+async def play_battles(player, battles: int, turns: int, start: int = 0):
+    for i in range(start, start + battles):
+        tag = f"battle-gen1ou-soak{i}"
+        battle = None
+        for battle in recorded_battle(turns, tag=tag):
+            player._battles[tag] = battle
+            await player.choose_move(battle)
+        battle._finished = True
+        battle._won = i % 2 == 0
+        player._battle_finished_callback(battle)
+        await player._drain_background_tasks()
+        player.collection.docs.clear()
+        player.wins_collection.docs.clear()
+
+
+async def soak(player, battles: int, turns: int, samples: int = 5, start: int = 0) -> List[int]:
+    """RSS after each of ``samples`` equal slices of the run."""
+    step = max(battles // samples, 1)
+    rss = []
+    for offset in range(0, battles, step):
+        await play_battles(player, min(step, battles - offset), turns, start + offset)
+        gc.collect()
+        rss.append(rss_bytes() or 0)
+    return rss
+
+
+async def run(max_retained_battles: Optional[int], args):
+    player = soak_player(max_retained_battles)
+    rss = await soak(player, args.battles, args.turns, args.samples)
+    kept = len(player.battles)
+    await player.shutdown()
+    return rss, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--retain", nargs="+", default=["100", "none"], help="max_retained_battles values")
+    args = parser.parse_args()
+
+    print(f"{'retain':>7} {'battles':>8} {'kept':>5} {'rss MiB by slice':<40} {'growth KiB/battle':>18}")
+    for retain in args.retain:
+        cap = None if retain == "none" else int(retain)
+        rss, kept = asyncio.run(run(cap, args))
+        growth = (rss[-1] - rss[0]) / 1024 / max(args.battles - args.battles // args.samples, 1)
+        slices = " ".join(f"{r / 2**20:.1f}" for r in rss)
+        print(f"{retain:>7} {args.battles:>8} {kept:>5} {slices:<40} {growth:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
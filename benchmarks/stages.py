@@ -0,0 +1,49 @@
+"""Per-stage latency breakdown of the decision pipeline, from the player's instrumentation.
+
+    python -m benchmarks.stages --battles 4 --turns 30 --trace stages_trace.jsonl
+
+Plays recorded battles against the stubs and prints p50/p95/p99 for every span
+(state formatting, embedding, memory search, LLM call and parse, log queue, Mongo
+insert, whole turn), then the Prometheus text for the Bedrock counters.
+"""
+import argparse
+import asyncio
+
+from benchmarks.stubs import make_player, recorded_battle
+from instrumentation import Instrumentation
+
+
+async def play(player, n_battles: int, n_turns: int):
+    async def one(b: int):
+        battle = None
+        for battle in recorded_battle(n_turns, tag=f"battle-gen1ou-{b}"):
+            await player.choose_move(battle)
+        battle._finished = True
+        player._battle_finished_callback(battle)
+
+    await asyncio.gather(*(one(b) for b in range(n_battles)))
+    await player.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--battles", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub Bedrock latency (s)")
+    parser.add_argument("--trace", help="also write the JSONL trace here")
+    args = parser.parse_args()
+
+    instrumentation = Instrumentation(trace_path=args.trace)
+    player = make_player(bedrock_latency_s=args.latency, instrumentation=instrumentation)
+    asyncio.run(play(player, args.battles, args.turns))
+
+    print(f"{'stage':>16} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage, s in sorted(instrumentation.stats().items()):
+        print(f"{stage:>16} {s['count']:>6} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}")
+    print()
+    print("\n".join(line for line in instrumentation.prometheus_text().splitlines() if "bedrock" in line))
+    instrumentation.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Render time and prompt size of _format_battle_state over a scripted battle.
+
+    python -m benchmarks.state_render --turns 40
+
+"full" builds every section each turn (the old behaviour); "incremental" reuses
+sections whose inputs didn't change. Token counts are a word/punctuation estimate,
+close enough to compare the text and JSON renderings.
+"""
+import argparse
+import re
+import time
+
+from poke_env.data.gen_data import GenData
+
+from benchmarks.stubs import recorded_battle
+from helpers import compile_type_chart
+from state_renderer import BattleStateRenderer
+
+
+def approx_tokens(text: str) -> int:
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def run(mode: str, incremental: bool, turns: int, repeat: int):
+    table = compile_type_chart(GenData.from_format("gen1ou").type_chart)
+    elapsed, tokens, reuse = 0.0, 0, 0.0
+    for _ in range(repeat):
+        renderer = BattleStateRenderer(table, mode)
+        for battle in recorded_battle(turns):
+            if not incremental:
+                renderer.clear()
+            start = time.perf_counter()
+            prompt = renderer.render(battle)
+            elapsed += time.perf_counter() - start
+            tokens += approx_tokens(prompt)
+        reuse += renderer.reuses / (renderer.reuses + renderer.renders)
+    n = turns * repeat
+    return elapsed / n * 1e6, tokens / n, reuse / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'render':>12} {'us/turn':>9} {'tokens/turn':>12} {'sections reused':>16}")
+    for mode in ("text", "json"):
+        for incremental in (False, True):
+            us, tokens, reuse = run(mode, incremental, args.turns, args.repeat)
+            label = "incremental" if incremental else "full"
+            print(f"{mode:>6} {label:>12} {us:>9.1f} {tokens:>12.0f} {reuse:>15.0%}")
+
+
+if __name__ == "__main__":
+    main()
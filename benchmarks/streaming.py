@@ -0,0 +1,73 @@
+"""Time-to-decision for LLM turns: buffered invoke_model vs streaming with early stop.
+
+    python -m benchmarks.streaming --turns 40 --token-latency 0.01 --trailing-tokens 150
+
+The stub Claude replies with the decision JSON followed by ``--trailing-tokens`` of
+commentary, each token costing ``--token-latency`` seconds. Buffered reads wait for
+all of it; streaming stops at the closing brace. The last run adds a per-turn deadline
+shorter than the decision itself, so turns go out on the heuristic fallback.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+
+from benchmarks.stubs import StubBedrockClient, make_player, recorded_battle
+from decision_tiers import HeuristicConfig
+
+
+async def play(player, n_turns: int):
+    for battle in recorded_battle(n_turns):
+        await player.choose_move(battle)
+    await player.shutdown()
+
+
+def run(args, streaming: bool, deadline_s):
+    player = make_player(
+        heuristic_config=HeuristicConfig(enabled=False),
+        decision_cache_size=0,
+        llm_streaming=streaming,
+        llm_deadline_s=deadline_s,
+    )
+    client = StubBedrockClient(
+        latency_s=args.first_token,
+        embedding_latency_s=0.005,
+        token_latency_s=args.token_latency,
+        trailing_text=" " + "lorem " * args.trailing_tokens,
+    )
+    player.bedrock_runtime = client
+    player.bedrock_embeddings = client
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(play(player, args.turns))
+
+    stats = player.decision_engine.stats()["llm"]
+    fallbacks = sum(1 for doc in player.collection.docs if doc["fallback_used"])
+    tokens = sum(stream.sent for stream in client.streams)
+    return stats, fallbacks, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--first-token", type=float, default=0.05, help="stub time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="stub time per output token (s)")
+    parser.add_argument("--trailing-tokens", type=int, default=150, help="tokens generated after the JSON")
+    parser.add_argument("--deadline", type=float, default=0.1, help="per-turn deadline for the last run (s)")
+    args = parser.parse_args()
+
+    print(f"{'mode':>20} {'turns':>6} {'p50 ms':>8} {'p99 ms':>8} {'fallbacks':>10} {'tokens read':>12}")
+    for name, streaming, deadline_s in (
+        ("buffered", False, None),
+        ("streaming", True, None),
+        ("streaming+deadline", True, args.deadline),
+    ):
+        stats, fallbacks, tokens = run(args, streaming, deadline_s)
+        tokens_read = str(tokens) if streaming else "-"
+        print(
+            f"{name:>20} {stats['turns']:>6} {stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+            f"{fallbacks:>10} {tokens_read:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
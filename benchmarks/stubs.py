@@ -0,0 +1,395 @@
+"""Deterministic local stand-ins for Bedrock, Titan and MongoDB used by the benchmarks."""
+import hashlib
+import io
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from poke_env.environment.battle import Battle
+from poke_env.environment.move import Move
+from poke_env.environment.pokemon import Pokemon
+
+from opponent_stats import OpponentStatsConfig
+
+OUR_TEAM = {
+    "squirtle": ["surf", "bodyslam", "blizzard", "seismictoss"],
+    "charmander": ["bodyslam", "fireblast", "megakick", "slash"],
+    "nidoking": ["earthquake", "bodyslam", "thunderbolt", "icebeam"],
+    "fearow": ["drillpeck", "agility", "doubleedge", "mirrormove"],
+}
+OPPONENT_TEAM = ["pikachu", "bulbasaur", "starmie", "snorlax", "gengar", "tauros"]
+
+
+def stub_embedding(text: str, dim: int = 1024) -> list:
+    """Unit vector seeded from the text, so equal texts embed equally."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vec /= np.linalg.norm(vec)
+    return vec.tolist()
+
+
+class StubEventStream:
+    """Iterable of Bedrock stream events, one ``content_block_delta`` per token.
+
+    Generation sleeps ``token_latency_s`` per token and stops once ``close`` is called,
+    like a botocore ``EventStream`` whose connection was dropped.
+    """
+
+    def __init__(self, text: str, first_token_s: float, token_latency_s: float, chars_per_token: int = 4, usage: dict = None):
+        self.usage = usage or {"input_tokens": 0}
+        self.tokens = [text[i:i + chars_per_token] for i in range(0, len(text), chars_per_token)]
+        self.first_token_s = first_token_s
+        self.token_latency_s = token_latency_s
+        self.sent = 0
+        self.closed = False
+
+    @staticmethod
+    def _event(payload: dict) -> dict:
+        return {"chunk": {"bytes": json.dumps(payload).encode("utf-8")}}
+
+    def __iter__(self):
+        time.sleep(self.first_token_s)
+        yield self._event({"type": "message_start", "message": {"usage": {**self.usage, "output_tokens": 1}}})
+        for token in self.tokens:
+            if self.closed:
+                return
+            time.sleep(self.token_latency_s)
+            self.sent += 1
+            yield self._event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}})
+        yield self._event({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(self.tokens)}})
+        yield self._event({"type": "message_stop"})
+
+    def close(self):
+        self.closed = True
+
+
+class StubBedrockClient:
+    """Mimics ``boto3.client("bedrock-runtime")`` with a fixed blocking latency.
+
+    Embedding requests (``inputText``, or ``texts`` for several) get deterministic
+    vectors; Claude requests get a JSON decision that picks the first available move,
+    or the first switch. With
+    ``token_latency_s`` set, Claude replies also cost time per generated token (and
+    ``trailing_text`` after the JSON), both for ``invoke_model`` and the streaming API.
+    ``throttle_rate`` makes that share of calls fail with ``ThrottlingException``.
+
+    Claude requests are billed like the Anthropic prompt cache: the prefix up to each
+    ``cache_control`` block of at least ``min_cache_tokens`` is written to a cache for
+    ``cache_ttl_s`` and read back by later requests starting with it, and ``usage``
+    reports the three kinds of input tokens. Every input token not read from the cache
+    adds ``input_token_latency_s`` before the first output token. Tokens are 4 characters.
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.05,
+        embedding_latency_s: float | None = None,
+        token_latency_s: float = 0.0,
+        trailing_text: str = "",
+        throttle_rate: float = 0.0,
+        input_token_latency_s: float = 0.0,
+        min_cache_tokens: int = 1024,
+        cache_ttl_s: float = 300.0,
+    ):
+        self.latency_s = latency_s
+        self.embedding_latency_s = latency_s if embedding_latency_s is None else embedding_latency_s
+        self.token_latency_s = token_latency_s
+        self.trailing_text = trailing_text
+        self.throttle_rate = throttle_rate
+        self.input_token_latency_s = input_token_latency_s
+        self.min_cache_tokens = min_cache_tokens
+        self.cache_ttl_s = cache_ttl_s
+        self.calls = 0
+        self.throttled = 0
+        self.streams = []
+        self._rng = random.Random(0)
+        self._prompt_cache = {}
+        self._cache_lock = threading.Lock()
+
+    def _throttle(self, operation: str):
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            self.throttled += 1
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, operation)
+
+    def _reply(self, request: dict) -> str:
+        return json.dumps(self.decide(request)) + self.trailing_text
+
+    def _input_usage(self, request: dict, body: str) -> dict:
+        """Input tokens read from, written to and not served by the stub prompt cache."""
+        system = request.get("system", [])
+        blocks = [{"type": "text", "text": system}] if isinstance(system, str) else list(system)
+        blocks += [block for message in request["messages"] for block in message["content"]]
+        prefix, tokens, breakpoints = hashlib.sha256(), 0, []
+        for block in blocks:
+            prefix.update(json.dumps(block, sort_keys=True).encode("utf-8"))
+            tokens += len(block.get("text", "")) // 4
+            if "cache_control" in block and tokens >= self.min_cache_tokens:
+                breakpoints.append((prefix.hexdigest(), tokens))
+        read = written = 0
+        now = time.monotonic()
+        with self._cache_lock:
+            for key, prefix_tokens in breakpoints:
+                if self._prompt_cache.get(key, 0) > now:
+                    read = prefix_tokens
+                self._prompt_cache[key] = now + self.cache_ttl_s
+            if breakpoints:
+                written = breakpoints[-1][1] - read
+        return {
+            "input_tokens": max(len(body) // 4 - read - written, 0),
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": written,
+        }
+
+    def _first_token_s(self, usage: dict) -> float:
+        return self.latency_s + (usage["input_tokens"] + usage["cache_creation_input_tokens"]) * self.input_token_latency_s
+
+    def invoke_model(self, body, modelId, accept=None, contentType=None):
+        self.calls += 1
+        self._throttle("InvokeModel")
+        request = json.loads(body)
+        if "inputText" in request:
+            time.sleep(self.embedding_latency_s)
+            dim = request.get("dimensions", 1024)
+            payload = {"embedding": stub_embedding(request["inputText"], dim)}
+        elif "texts" in request:  # multi-text embedding models (Cohere)
+            time.sleep(self.embedding_latency_s)
+            payload = {"embeddings": [stub_embedding(text) for text in request["texts"]]}
+        else:
+            text = self._reply(request)
+            output_tokens = len(StubEventStream(text, 0.0, 0.0).tokens)
+            usage = self._input_usage(request, body)
+            time.sleep(self._first_token_s(usage) + output_tokens * self.token_latency_s)
+            payload = {
+                "content": [{"type": "text", "text": text}],
+                "usage": {**usage, "output_tokens": output_tokens},
+            }
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, body, modelId, accept=None, contentType=None):
+        self.calls += 1
+        self._throttle("InvokeModelWithResponseStream")
+        request = json.loads(body)
+        usage = self._input_usage(request, body)
+        stream = StubEventStream(self._reply(request), self._first_token_s(usage), self.token_latency_s, usage=usage)
+        self.streams.append(stream)
+        return {"body": stream}
+
+    @staticmethod
+    def decide(request: dict) -> dict:
+        prompt = "".join(
+            block["text"]
+            for message in request["messages"]
+            for block in message["content"]
+            if block.get("type") == "text"
+        )
+        moves = re.search(r"Available moves:\n- (\w+)", prompt) or re.search(r'"moves":\[\{"id":"(\w+)"', prompt)
+        if moves:
+            return {"thought": "Stub picks the first move.", "move": moves.group(1)}
+        switch = re.search(r"Available switches[^\n]*\n- (\w+)", prompt) or re.search(r'"switches":\[\{"species":"(\w+)"', prompt)
+        if switch:
+            return {"thought": "Stub picks the first switch.", "switch": switch.group(1)}
+        return {"thought": "Stub has nothing to pick."}
+
+
+class StubCollection:
+    """In-memory subset of a pymongo ``Collection`` with a fixed blocking latency."""
+
+    def __init__(self, latency_s: float = 0.01):
+        self.latency_s = latency_s
+        self.docs = []
+
+    def insert_one(self, doc):
+        time.sleep(self.latency_s)
+        self.docs.append(doc)
+
+    def insert_many(self, docs, ordered=True):
+        time.sleep(self.latency_s)
+        self.docs.extend(docs)
+
+    def aggregate(self, pipeline):
+        time.sleep(self.latency_s)
+        return iter([])
+
+    def update_many(self, filter, update):
+        time.sleep(self.latency_s)
+        return self._update(filter, update)
+
+    def bulk_write(self, requests, ordered=True):
+        time.sleep(self.latency_s)
+        # pymongo's UpdateOne/UpdateMany keep their arguments in _filter and _doc.
+        modified = sum(self._update(r._filter, r._doc).modified_count for r in requests)
+        return StubWriteResult(modified, modified)
+
+    def find(self, filter=None, projection=None):
+        time.sleep(self.latency_s)
+        return StubCursor([doc for doc in self.docs if _matches(doc, filter or {})])
+
+    def _update(self, filter, update):
+        modified = 0
+        for doc in self.docs:
+            if _matches(doc, filter):
+                doc.update(update.get("$set", {}))
+                modified += 1
+        return StubWriteResult(modified, modified)
+
+
+class StubWriteResult:
+    def __init__(self, matched_count: int, modified_count: int):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+
+
+class StubCursor:
+    """The ``sort``/``limit`` chain of a pymongo cursor over a list of documents."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    """Enough of the Mongo query language for the benchmarks: $and/$or, $eq/$ne/$gt/$gte/$lt/$in."""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$gt" and (value is None or not value > operand):
+                    return False
+                if op == "$gte" and (value is None or not value >= operand):
+                    return False
+                if op == "$lt" and (value is None or not value < operand):
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+def _make_pokemon(species: str, moves=(), active: bool = False, hp: float = 1.0) -> Pokemon:
+    pokemon = Pokemon(gen=1, species=species)
+    pokemon._max_hp = 100
+    pokemon._current_hp = int(100 * hp)
+    pokemon._active = active
+    for move_id in moves:
+        pokemon._moves[move_id] = Move(move_id, gen=1)
+    return pokemon
+
+
+def make_battle(tag: str = "battle-gen1ou-1", turn: int = 1, opponent_index: int = 0) -> Battle:
+    """A mid-battle gen1ou ``Battle`` with our ``team_1`` against a rotating opponent."""
+    battle = Battle(tag, "caveman_llm_bot1", logging.getLogger("stub"), gen=1)
+    battle._player_role = "p1"
+    battle._opponent_username = "human_player1"
+    battle._turn = turn
+
+    for index, (species, moves) in enumerate(OUR_TEAM.items()):
+        battle._team[f"p1: {species}"] = _make_pokemon(species, moves, active=index == 0)
+    opponent = OPPONENT_TEAM[opponent_index % len(OPPONENT_TEAM)]
+    battle._opponent_team[f"p2: {opponent}"] = _make_pokemon(opponent, active=True, hp=0.75)
+
+    active = battle.active_pokemon
+    battle._available_moves = list(active.moves.values())
+    battle._available_switches = [p for p in battle.team.values() if not p.active]
+    return battle
+
+
+def recorded_battle(turns: int = 30, tag: str = "battle-gen1ou-replay", opponent_index: int = 0):
+    """Yield one ``Battle`` through a scripted game: HP drains, PP drops, the opponent
+    switches every few turns and we switch after a faint."""
+    battle = make_battle(tag, opponent_index=opponent_index)
+    opponents = list(OPPONENT_TEAM)
+    for turn in range(1, turns + 1):
+        battle._turn = turn
+        opponent = battle.opponent_active_pokemon
+        opponent._current_hp = max(0, opponent._current_hp - 7)
+        if turn % 6 == 0:
+            opponent._active = False
+            species = opponents[(turn // 6 + opponent_index) % len(opponents)]
+            key = f"p2: {species}"
+            if key not in battle._opponent_team:
+                battle._opponent_team[key] = _make_pokemon(species, hp=1.0)
+            battle._opponent_team[key]._active = True
+        active = battle.active_pokemon
+        active._current_hp = max(0, active._current_hp - 5)
+        for move in battle.available_moves[:1]:
+            move._current_pp = max(0, move.current_pp - 1)
+        if active._current_hp == 0 and battle.available_switches:
+            active._active = False
+            nxt = battle.available_switches[0]
+            nxt._active = True
+            battle._available_moves = list(nxt.moves.values())
+            battle._available_switches = [p for p in battle.team.values() if not p.active and p._current_hp]
+        yield battle
+
+
+def make_player(player_cls=None, bedrock_latency_s: float = 0.05, mongo_latency_s: float = 0.01, **kwargs):
+    """A ``ClaudePlayer`` wired to the stubs, not connected to any server."""
+    if player_cls is None:
+        from ClaudePlayer import ClaudePlayer as player_cls
+
+    kwargs.setdefault("start_listening", False)
+    # No opponent-stats checkpoint left behind in the working directory.
+    kwargs.setdefault("opponent_stats", OpponentStatsConfig(path=None))
+    # Benchmarks print their own tables; unless logging was configured, keep the bot quiet.
+    bot_logger = logging.getLogger("pokeagent")
+    if bot_logger.level == logging.NOTSET:
+        bot_logger.setLevel(logging.ERROR)
+    player = player_cls(
+        mongo_uri="mongodb://localhost:27017",
+        battle_format="gen1ou",
+        **kwargs,
+    )
+    client = StubBedrockClient(latency_s=bedrock_latency_s)
+    player.bedrock_runtime = client
+    player.bedrock_embeddings = client
+    player.collection = StubCollection(latency_s=mongo_latency_s)
+    player.log_writer.collection = player.collection
+    if hasattr(player.memory_backend, "collection"):
+        player.memory_backend.collection = player.collection
+    player.wins_collection = StubCollection(latency_s=mongo_latency_s)
+    return player
+
+
+def make_pool_player(account, **kwargs):
+    """bot_pool factory: a stubbed-backend player on a local Showdown server."""
+    from poke_env import AccountConfiguration, LocalhostServerConfiguration
+
+    from agent import LLMTeam, team_1
+
+    latency = kwargs.pop("stub_latency_s", 0.05)
+    return make_player(
+        bedrock_latency_s=latency,
+        account_configuration=AccountConfiguration(*account),
+        server_configuration=LocalhostServerConfiguration,
+        team=LLMTeam([team_1]),
+        start_listening=True,
+        **kwargs,
+    )
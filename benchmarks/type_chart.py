@@ -0,0 +1,84 @@
+"""Golden check and microbenchmark: TypeEffectivenessTable vs the per-call chart walk.
+
+    python -m benchmarks.type_chart
+
+The golden check compares ``move_type_damage_wrapper`` with
+``legacy_move_type_damage_wrapper`` for every type combination and every constraint
+_format_battle_state uses (none, one attack type, the opponent's two types). With a
+two-type constraint the legacy code orders types via a set, so names inside each
+sentence are compared order-insensitively there; everything else must match exactly.
+"""
+import itertools
+import re
+import timeit
+from types import SimpleNamespace
+
+from poke_env.data.gen_data import GenData
+from poke_env.environment.pokemon_type import PokemonType
+
+from helpers import (
+    TYPE_LIST,
+    compile_type_chart,
+    legacy_move_type_damage_wrapper,
+    move_type_damage_wrapper,
+)
+
+
+def defenders():
+    for type_1, type_2 in itertools.product(TYPE_LIST, [None] + TYPE_LIST):
+        if type_1 == type_2:
+            continue
+        yield SimpleNamespace(
+            species=f"{type_1.lower()}{type_2.lower() if type_2 else ''}mon",
+            type_1=PokemonType[type_1],
+            type_2=PokemonType[type_2] if type_2 else None,
+        )
+
+
+def unordered(prompt: str):
+    sentences = re.findall(r"([A-Z][a-z]+(?:, [A-Z][a-z]+)*)-type attack is (.*?) to ", prompt)
+    return [(sorted(names.split(", ")), effect) for names, effect in sentences]
+
+
+def golden_check(type_chart) -> int:
+    constraints = [None] + [[t] for t in TYPE_LIST] + [list(p) for p in itertools.combinations(TYPE_LIST, 2)]
+    checked = 0
+    for pokemon in defenders():
+        for constraint in constraints:
+            expected = legacy_move_type_damage_wrapper(pokemon, type_chart, constraint)
+            actual = move_type_damage_wrapper(pokemon, type_chart, constraint)
+            if constraint and len(constraint) > 1:
+                assert unordered(actual) == unordered(expected), (pokemon, constraint, actual, expected)
+            else:
+                assert actual == expected, (pokemon, constraint, actual, expected)
+            checked += 1
+    return checked
+
+
+def main():
+    type_chart = GenData.from_format("gen1ou").type_chart
+    print(f"golden check: {golden_check(type_chart)} cases identical")
+
+    # One turn of _format_battle_state: active matchup plus four moves.
+    active = SimpleNamespace(species="squirtle", type_1=PokemonType.WATER, type_2=None)
+    opponent = SimpleNamespace(species="gengar", type_1=PokemonType.GHOST, type_2=PokemonType.POISON)
+    moves = ["WATER", "NORMAL", "ICE", "FIGHTING"]
+
+    def turn(wrapper):
+        wrapper(active, type_chart, ["GHOST", "POISON"])
+        for move_type in moves:
+            wrapper(opponent, type_chart, [move_type])
+
+    n = 20000
+    legacy = timeit.timeit(lambda: turn(legacy_move_type_damage_wrapper), number=n) / n * 1e6
+    compiled = timeit.timeit(lambda: turn(move_type_damage_wrapper), number=n) / n * 1e6
+    print(f"per-turn type analysis: legacy {legacy:.1f} us, compiled {compiled:.1f} us ({legacy / compiled:.0f}x)")
+
+    table = compile_type_chart(type_chart)
+    known = [opponent, active]
+    vectorized = timeit.timeit(lambda: table.score_pokemon(moves, known), number=n) / n * 1e6
+    print(f"score all moves x known opponents in one call: {vectorized:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
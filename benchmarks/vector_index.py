@@ -0,0 +1,68 @@
+"""Recall and latency of the local IVF index against brute-force cosine search.
+
+    python -m benchmarks.vector_index --rows 50000 --partitions 64 --probe 4 8 16
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from memory_backends import LocalVectorIndex
+
+
+def synthetic_corpus(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, roughly like embeddings of repeated battle states."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+
+def timed_search(index, queries, k, exact):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search_many(query[None, :], k, exact=exact)[0])
+        latencies.append(time.perf_counter() - start)
+    return results, np.percentile(latencies, [50, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--partitions", type=int, default=64)
+    parser.add_argument("--probe", type=int, nargs="+", default=[2, 4, 8, 16])
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.rows + args.queries, args.dim, clusters=args.partitions * 4)
+    vectors, queries = corpus[:args.rows], corpus[args.rows:]
+    memories = [{"battle_id": f"battle-{i // 40}", "turn": i % 40, "action_type": "move",
+                 "action_name": "surf", "fallback_used": False} for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LocalVectorIndex(f"{tmp}/index", dim=args.dim, n_partitions=args.partitions,
+                                 ivf_min_rows=args.rows)
+        start = time.perf_counter()
+        index.add_many(vectors, memories)
+        print(f"indexed {args.rows} x {args.dim} in {time.perf_counter() - start:.2f}s")
+
+        exact, (p50, p99) = timed_search(index, queries, args.k, exact=True)
+        print(f"{'mode':>12} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        print(f"{'brute force':>12} {1.0:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+
+        truth = [{(m['battle_id'], m['turn']) for m in hits} for hits in exact]
+        for probe in args.probe:
+            index.n_probe = probe
+            approx, (p50, p99) = timed_search(index, queries, args.k, exact=False)
+            found = [len(t & {(m['battle_id'], m['turn']) for m in hits}) for t, hits in zip(truth, approx)]
+            recall = sum(found) / sum(len(t) for t in truth)
+            print(f"{f'ivf probe={probe}':>12} {recall:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Run several ClaudePlayer accounts as worker processes fed from one work queue.
+
+    python bot_pool.py --workers 4 --ladder 100
+    python bot_pool.py --workers 2 --accounts accounts.json --challenge human_player1 --games 10
+
+Each worker process owns one account, one player and its own Bedrock/Mongo clients.
+The supervisor hands jobs (ladder games or challenges) from one work queue to idle
+workers; crashed workers are restarted and their in-flight job is queued again.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from poke_env import AccountConfiguration, LocalhostServerConfiguration
+
+from instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+Account = Tuple[str, Optional[str]]
+
+
+def make_claude_player(account: Account, **player_kwargs):
+    """Default worker factory: the agent.py player on the local server."""
+    from agent import LLMTeam, team_1
+    from ClaudePlayer import ClaudePlayer
+
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri is None:
+        raise ValueError("MONGO_URI environment variable is not set.")
+    return ClaudePlayer(
+        account_configuration=AccountConfiguration(*account),
+        mongo_uri=mongo_uri,
+        server_configuration=LocalhostServerConfiguration,
+        battle_format="gen1ou",
+        team=LLMTeam([team_1]),
+        **player_kwargs,
+    )
+
+
+def _load_factory(path: str):
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _snapshot(player) -> Tuple[int, int, int]:
+    # ClaudePlayer evicts old finished battles from player.battles but keeps counting them.
+    turns = getattr(player, "n_finished_turns", None)
+    if turns is None:
+        turns = sum(b.turn for b in player.battles.values() if b.finished)
+    return player.n_finished_battles, player.n_won_battles, turns
+
+
+async def _run_job(player, job: dict):
+    if job["kind"] == "ladder":
+        await player.ladder(job["games"])
+    elif job["kind"] == "challenge":
+        await player.send_challenges(job["opponent"], n_challenges=job["games"])
+    elif job["kind"] == "accept":
+        await player.accept_challenges(job.get("opponent"), job["games"])
+    else:
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+
+
+async def _worker_loop(worker_id: int, account: Account, factory_path: str, player_kwargs: dict, jobs, events):
+    player = _load_factory(factory_path)(account, **player_kwargs)
+    try:
+        while True:
+            job = await asyncio.to_thread(jobs.get)
+            if job is None:
+                break
+            before = _snapshot(player)
+            await _run_job(player, job)
+            after = _snapshot(player)
+            events.put(("done", worker_id, tuple(a - b for a, b in zip(after, before))))
+    finally:
+        await player.shutdown()
+
+
+def _worker_main(worker_id: int, account: Account, factory_path: str, player_kwargs: dict, jobs, events):
+    configure_logging()
+    asyncio.run(_worker_loop(worker_id, account, factory_path, player_kwargs, jobs, events))
+
+
+@dataclass
+class WorkerStats:
+    account: str
+    battles: int = 0
+    wins: int = 0
+    turns: int = 0
+    jobs: int = 0
+    restarts: int = 0
+    in_flight: Optional[dict] = None
+
+
+class BotPool:
+    """Supervisor for ``len(accounts)`` worker processes sharing one work queue.
+
+    Each worker has its own inbox and gets one job at a time, so the supervisor
+    always knows which job to hand out again if a worker dies.
+    """
+
+    def __init__(
+        self,
+        accounts: List[Account],
+        factory_path: str = "bot_pool:make_claude_player",
+        player_kwargs: Optional[dict] = None,
+        max_restarts: int = 5,
+    ):
+        self.accounts = accounts
+        self.factory_path = factory_path
+        self.player_kwargs = player_kwargs or {}
+        self.max_restarts = max_restarts
+
+        # spawn, not fork: boto3 and pymongo clients must not be shared across processes.
+        self._ctx = mp.get_context("spawn")
+        self._pending = deque()
+        self._events = self._ctx.Queue()
+        self._inboxes: Dict[int, mp.Queue] = {}
+        self._processes: Dict[int, mp.Process] = {}
+        # Crashed workers waiting out their backoff, with the time.monotonic() to restart them at.
+        self._restart_at: Dict[int, float] = {}
+        self.stats = {i: WorkerStats(account[0]) for i, account in enumerate(accounts)}
+        self._outstanding = 0
+
+    def submit(self, job: dict):
+        self._outstanding += 1
+        self._pending.append(job)
+
+    def _dispatch(self):
+        for worker_id in self._processes:
+            stats = self.stats[worker_id]
+            if stats.in_flight is None and self._pending and worker_id not in self._restart_at:
+                stats.in_flight = self._pending.popleft()
+                self._inboxes[worker_id].put(stats.in_flight)
+
+    def _start(self, worker_id: int):
+        # A fresh inbox per incarnation; a crashed reader can leave the old one unusable.
+        self._inboxes[worker_id] = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.accounts[worker_id], self.factory_path, self.player_kwargs, self._inboxes[worker_id], self._events),
+            name=f"bot-{self.accounts[worker_id][0]}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def _check_workers(self):
+        """Requeue the jobs of crashed workers and restart them once their backoff has passed.
+
+        Backoffs are deadlines, not sleeps, so one crash-looping worker doesn't hold up
+        supervising the others.
+        """
+        now = time.monotonic()
+        for worker_id, process in list(self._processes.items()):
+            if worker_id in self._restart_at:
+                if now >= self._restart_at[worker_id]:
+                    del self._restart_at[worker_id]
+                    self._start(worker_id)
+                continue
+            if process.is_alive():
+                continue
+            stats = self.stats[worker_id]
+            logger.warning("💥 Worker %s exited with code %s", stats.account, process.exitcode)
+            if stats.in_flight is not None:
+                self._pending.appendleft(stats.in_flight)
+                stats.in_flight = None
+            if stats.restarts >= self.max_restarts:
+                logger.error("🛑 Worker %s exceeded %d restarts; not restarting", stats.account, self.max_restarts)
+                del self._processes[worker_id]
+                continue
+            stats.restarts += 1
+            self._restart_at[worker_id] = now + min(2 ** stats.restarts, 30)
+
+    def _handle(self, event):
+        _, worker_id, delta = event
+        stats = self.stats[worker_id]
+        stats.in_flight = None
+        battles, wins, turns = delta
+        stats.battles += battles
+        stats.wins += wins
+        stats.turns += turns
+        stats.jobs += 1
+        self._outstanding -= 1
+
+    def run(self) -> dict:
+        """Start the workers, wait until every submitted job is done, then stop them."""
+        started = time.perf_counter()
+        for worker_id in range(len(self.accounts)):
+            self._start(worker_id)
+        try:
+            while self._outstanding > 0 and self._processes:
+                self._dispatch()
+                try:
+                    self._handle(self._events.get(timeout=1.0))
+                except queue.Empty:
+                    pass
+                self._check_workers()
+        finally:
+            for worker_id in self._processes:
+                self._inboxes[worker_id].put(None)
+            for process in self._processes.values():
+                process.join(timeout=60)
+                if process.is_alive():
+                    process.terminate()
+        return self.summary(time.perf_counter() - started)
+
+    def summary(self, elapsed_s: float) -> dict:
+        battles = sum(s.battles for s in self.stats.values())
+        wins = sum(s.wins for s in self.stats.values())
+        return {
+            "workers": len(self.accounts),
+            "battles": battles,
+            "wins": wins,
+            "win_rate": wins / battles if battles else 0.0,
+            "turns": sum(s.turns for s in self.stats.values()),
+            "restarts": sum(s.restarts for s in self.stats.values()),
+            "elapsed_s": elapsed_s,
+            "battles_per_hour": battles / elapsed_s * 3600 if elapsed_s else 0.0,
+            "per_worker": {s.account: {"battles": s.battles, "wins": s.wins, "turns": s.turns} for s in self.stats.values()},
+        }
+
+
+def load_accounts(path: Optional[str], workers: int, prefix: str = "caveman_llm_bot") -> List[Account]:
+    """Accounts from a JSON list of {"username", "password"}, or numbered local accounts."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            accounts = [(a["username"], a.get("password")) for a in json.load(f)]
+        return accounts[:workers]
+    return [(f"{prefix}{i + 1}", None) for i in range(workers)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--accounts", help="JSON file with [{\"username\": ..., \"password\": ...}]")
+    parser.add_argument("--ladder", type=int, default=0, help="ladder games to play in total")
+    parser.add_argument("--challenge", help="username to challenge")
+    parser.add_argument("--games", type=int, default=1, help="challenges to send")
+    parser.add_argument("--battles-per-worker", type=int, default=1, help="max_concurrent_battles per player")
+    parser.add_argument("--factory", default="bot_pool:make_claude_player")
+    args = parser.parse_args()
+    configure_logging()
+
+    pool = BotPool(
+        load_accounts(args.accounts, args.workers),
+        factory_path=args.factory,
+        player_kwargs={"max_concurrent_battles": args.battles_per_worker},
+    )
+    # Jobs are sized to a worker's battle concurrency so poke-env runs them in parallel.
+    for start in range(0, args.ladder, args.battles_per_worker):
+        pool.submit({"kind": "ladder", "games": min(args.battles_per_worker, args.ladder - start)})
+    if args.challenge:
+        for _ in range(args.games):
+            pool.submit({"kind": "challenge", "opponent": args.challenge, "games": 1})
+    print(json.dumps(pool.run(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
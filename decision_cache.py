@@ -0,0 +1,192 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from poke_env.environment.battle import Battle
+
+
+def _hp_bucket(fraction: float, buckets: int) -> int:
+    return min(buckets, int(round(fraction * buckets)))
+
+
+def _pokemon_state(pkmn, buckets: int) -> list:
+    return [
+        pkmn.species,
+        _hp_bucket(pkmn.current_hp_fraction, buckets),
+        pkmn.status.name if pkmn.status else None,
+        sorted((stat, value) for stat, value in pkmn.boosts.items() if value),
+    ]
+
+
+def canonical_state_key(battle: Battle, hp_buckets: int = 10) -> str:
+    """Order-independent hash of the parts of a battle that drive the decision.
+
+    Covers both actives (species, HP bucket, status, non-zero boosts) and the
+    available moves and switches, sorted so list order doesn't matter.
+    """
+    state = {
+        "format": battle.battle_tag.split("-")[1] if battle.battle_tag.count("-") >= 2 else "",
+        "active": _pokemon_state(battle.active_pokemon, hp_buckets),
+        "opponent": _pokemon_state(battle.opponent_active_pokemon, hp_buckets),
+        "moves": sorted(move.id for move in battle.available_moves),
+        "switches": sorted(
+            (p.species, _hp_bucket(p.current_hp_fraction, hp_buckets), p.status.name if p.status else "")
+            for p in battle.available_switches
+        ),
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """Validated LLM decisions keyed on `canonical_state_key`.
+
+    Lookups are served from an in-memory LRU (``max_size`` entries, ``ttl_s`` expiry).
+    An optional sqlite file shares decisions between bot processes without touching
+    the turn path: it warms the LRU when the cache opens, and `sync` (run on an IO
+    executor after each battle) writes this process's new decisions in one
+    transaction and pulls in the ones other processes added since. Decisions are only
+    admitted when they weren't fallbacks and the battle they came from was won:
+    `record` holds them per battle until `battle_finished` says how it ended.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl_s: Optional[float] = 7 * 24 * 3600, db_path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._pending: Dict[str, List[Tuple[str, dict]]] = {}
+        # Admitted decisions not yet in sqlite, and the last sqlite rowid read.
+        self._unsynced: List[Tuple[str, dict, float]] = []
+        self._synced_rowid = 0
+
+        self.hits = 0
+        self.disk_loads = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.committed = 0
+        self.discarded = 0
+        self.syncs = 0
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path and self.enabled:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, decision TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._merge(self._sync_db([]))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_s is not None and time.time() - stored_at > self.ttl_s
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def _remember(self, key: str, decision: dict, stored_at: float):
+        self._entries[key] = (stored_at, decision)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key: str, decision: dict):
+        stored_at = time.time()
+        self._remember(key, decision, stored_at)
+        if self._db is not None:
+            self._unsynced.append((key, decision, stored_at))
+
+    def record(self, battle_tag: str, key: str, decision: dict, fallback_used: bool):
+        """Hold a decision until its battle ends; fallbacks are never cached."""
+        if self.enabled and not fallback_used:
+            self._pending.setdefault(battle_tag, []).append((key, decision))
+
+    def battle_finished(self, battle_tag: str, won: Optional[bool]):
+        pending = self._pending.pop(battle_tag, [])
+        if not won:
+            self.discarded += len(pending)
+            return
+        for key, decision in pending:
+            self.put(key, decision)
+        self.committed += len(pending)
+
+    def _sync_db(self, rows: List[Tuple[str, dict, float]]) -> List[Tuple[str, dict, float]]:
+        """Write ``rows`` in one transaction; return the unexpired rows added since the last read, newest last."""
+        with self._db_lock:
+            if rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO decisions (key, decision, stored_at) VALUES (?, ?, ?)",
+                    [(key, json.dumps(decision), stored_at) for key, decision, stored_at in rows],
+                )
+                self._db.commit()
+            # REPLACE gives the row a new rowid, so rowids order rows by their last write.
+            new = self._db.execute(
+                "SELECT rowid, key, decision, stored_at FROM decisions WHERE rowid > ? ORDER BY rowid",
+                (self._synced_rowid,),
+            ).fetchall()
+            if new:
+                self._synced_rowid = new[-1][0]
+        return [(key, json.loads(decision), stored_at) for _, key, decision, stored_at in new[-self.max_size:]
+                if not self._expired(stored_at)]
+
+    def _merge(self, rows: List[Tuple[str, dict, float]]):
+        for key, decision, stored_at in rows:
+            self._remember(key, decision, stored_at)
+        self.disk_loads += len(rows)
+
+    async def sync(self, executor):
+        """Write admitted decisions to sqlite and load other processes' new ones, on ``executor``."""
+        if self._db is None:
+            return
+        rows, self._unsynced = self._unsynced, []
+        try:
+            self._merge(await executor.run(self._sync_db, rows))
+        except Exception:
+            self._unsynced = rows + self._unsynced
+            raise
+        self.syncs += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_loads": self.disk_loads,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "pending": sum(len(p) for p in self._pending.values()),
+            "committed": self.committed,
+            "discarded": self.discarded,
+            "unsynced": len(self._unsynced),
+            "syncs": self.syncs,
+        }
+
+    def close(self):
+        if self._db is not None:
+            if self._unsynced:
+                self._sync_db(self._unsynced)
+                self._unsynced = []
+            self._db.close()
+            self._db = None
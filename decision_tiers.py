@@ -0,0 +1,168 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from poke_env.environment.battle import Battle
+from poke_env.environment.move import Move
+from poke_env.environment.pokemon import Pokemon
+
+from helpers import TYPE_INDEX, TypeEffectivenessTable
+from matchups import MatchupTable
+from opponent_stats import OpponentStats
+
+TIERS = ("forced", "heuristic", "cache", "llm")
+
+
+@dataclass
+class HeuristicConfig:
+    """Knobs for the damage-estimate scorer in front of the LLM.
+
+    A move's expected damage, as a fraction of the target's HP, is estimated as
+    ``base_power * type multiplier * STAB * accuracy / hp_scale``. The heuristic tier
+    decides a turn only when the best option beats the runner-up by at least
+    ``margin_threshold`` (relative to the best score); otherwise the LLM is asked.
+    With an opponent-stats index, switches are also scored against the attack types of
+    the moves the opponent's species revealed in at least ``threat_share`` of its battles.
+    """
+    enabled: bool = True
+    margin_threshold: float = 0.5
+    hp_scale: float = 300.0
+    stab: float = 1.5
+    ko_bonus: float = 1.0
+    switch_weight: float = 0.25
+    threat_share: float = 0.3
+
+
+@dataclass
+class TierDecision:
+    tier: str
+    option: Optional[Union[Move, Pokemon]]
+    score: float
+    margin: float
+    reason: str
+
+    @property
+    def action(self) -> Tuple[str, str]:
+        if isinstance(self.option, Move):
+            return "move", self.option.id
+        if isinstance(self.option, Pokemon):
+            return "switch", self.option.species
+        return "default", "struggle"
+
+
+class TieredDecisionEngine:
+    """Resolves forced turns and clear-cut turns locally, before the LLM.
+
+    `decide` returns None when the turn should escalate to the LLM. Every turn's
+    latency is recorded per tier so `stats` can report the tier mix and p50/p99.
+    """
+
+    def __init__(
+        self,
+        type_table: TypeEffectivenessTable,
+        config: Optional[HeuristicConfig] = None,
+        opponent_stats: Optional[OpponentStats] = None,
+        window: int = 10000,
+    ):
+        self.type_table = type_table
+        self.config = config or HeuristicConfig()
+        self.opponent_stats = opponent_stats
+        self._latencies = {tier: deque(maxlen=window) for tier in TIERS}
+        self._turns = {tier: 0 for tier in TIERS}
+
+    def forced(self, battle: Battle) -> Optional[TierDecision]:
+        options = battle.available_moves + battle.available_switches
+        if len(options) > 1:
+            return None
+        if not options:
+            return TierDecision("forced", None, 0.0, 1.0, "No legal move or switch; default order.")
+        option = options[0]
+        name = option.id if isinstance(option, Move) else option.species
+        return TierDecision("forced", option, 0.0, 1.0, f"Only one legal option: {name}.")
+
+    def move_damage(self, battle: Battle, move: Move, matchups: Optional[MatchupTable] = None) -> float:
+        """Estimated damage of ``move`` as a fraction of the opponent's max HP."""
+        if not move.base_power:
+            return 0.0
+        opponent = battle.opponent_active_pokemon
+        multiplier = None
+        if matchups is not None:
+            multiplier = matchups.move_multiplier_for(battle.active_pokemon.species, move.id, opponent.species)
+        if multiplier is None:
+            row = self.type_table.multiplier_row(*self.type_table.defender_types(opponent))
+            multiplier = row[TYPE_INDEX[move.type.name]]
+        stab = self.config.stab if move.type in battle.active_pokemon.types else 1.0
+        accuracy = move.accuracy if isinstance(move.accuracy, float) else 1.0
+        return move.base_power * multiplier * stab * accuracy / self.config.hp_scale
+
+    def score_options(self, battle: Battle, matchups: Optional[MatchupTable] = None) -> List[Tuple[Union[Move, Pokemon], float]]:
+        """Every legal option with its score, best first. With the battle's `MatchupTable`
+        the type multipliers are lookups; species it doesn't cover are computed."""
+        config = self.config
+        opponent = battle.opponent_active_pokemon
+        opponent_hp = opponent.current_hp_fraction
+        scored = []
+        for move in battle.available_moves:
+            damage = self.move_damage(battle, move, matchups)
+            score = min(damage, opponent_hp)
+            if opponent_hp and damage >= opponent_hp:
+                score += config.ko_bonus
+            scored.append((move, score))
+
+        opponent_types = [t.name for t in opponent.types]
+        threats = ()
+        if self.opponent_stats is not None:
+            threats = self.opponent_stats.threat_types(opponent.species, config.threat_share)
+        for pkmn in battle.available_switches:
+            # Best offensive multiplier of its typing against the opponent minus the
+            # worst multiplier the opponent's STAB types hit it for.
+            matchup = matchups.switch_matchup(pkmn.species, opponent.species) if matchups is not None else None
+            if matchup is not None:
+                offense, defense = matchup
+            else:
+                offense = self.type_table.score([t.name for t in pkmn.types], [self.type_table.defender_types(opponent)]).max()
+                defense = self.type_table.score_pokemon(opponent_types, [pkmn]).max() if opponent_types else 1.0
+            if threats:
+                # Moves it's known to carry outside its own types (coverage) count too.
+                defense = max(defense, self.type_table.score_pokemon(threats, [pkmn]).max())
+            scored.append((pkmn, config.switch_weight * pkmn.current_hp_fraction * float(offense - defense)))
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+    def heuristic(self, battle: Battle, matchups: Optional[MatchupTable] = None) -> Optional[TierDecision]:
+        if not self.config.enabled or battle.opponent_active_pokemon is None:
+            return None
+        scored = self.score_options(battle, matchups)
+        if len(scored) < 2 or scored[0][1] <= 0:
+            return None
+        (best, best_score), (_, runner_up) = scored[0], scored[1]
+        margin = (best_score - runner_up) / best_score
+        if margin < self.config.margin_threshold:
+            return None
+        name = best.id if isinstance(best, Move) else best.species
+        return TierDecision(
+            "heuristic", best, best_score, margin,
+            f"Heuristic: {name} scores {best_score:.2f}, {margin:.0%} ahead of the next option.",
+        )
+
+    def decide(self, battle: Battle, matchups: Optional[MatchupTable] = None) -> Optional[TierDecision]:
+        return self.forced(battle) or self.heuristic(battle, matchups)
+
+    def record(self, tier: str, latency_s: float):
+        self._turns[tier] += 1
+        self._latencies[tier].append(latency_s)
+
+    def stats(self) -> dict:
+        total = sum(self._turns.values())
+        report = {}
+        for tier in TIERS:
+            latencies = self._latencies[tier]
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies else (0.0, 0.0)
+            report[tier] = {
+                "turns": self._turns[tier],
+                "fraction": self._turns[tier] / total if total else 0.0,
+                "p50_ms": float(p50),
+                "p99_ms": float(p99),
+            }
+        return report
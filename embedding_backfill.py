@@ -0,0 +1,309 @@
+"""Embed, or re-embed, the ``battle_logs`` documents whose vectors are missing or stale.
+
+    python embedding_backfill.py
+    python embedding_backfill.py --model amazon.titan-embed-text-v2:0 --concurrency 16 --page-size 1000
+    python embedding_backfill.py --restart    # ignore the checkpoint and scan from the start
+
+A document is stale when it has no embedding (Titan failed while the turn was logged),
+was embedded with another model or an older `battle_context` format, or has no storage
+stamp (it was written before `EmbeddingStorage`). Stale documents
+are read in ``_id`` order one page at a time. Their contexts are rebuilt from the stored
+observation when needed and deduplicated, so each distinct context is embedded once. The
+results are written back with one ``bulk_write`` per page. Every updated document records
+``embedding_model`` and ``context_version``, which `$vectorSearch` can filter on. The last
+``_id`` written is checkpointed, so an interrupted run resumes where it stopped.
+
+Vectors are written in an `EmbeddingStorage` layout, 1024-d floats by default, with its
+stamp (``embedding_dim``, ``embedding_quantization``, ``embedding_storage_version``),
+which ``memory_compatible_only`` filters on. ``--dimensions``/``--quantization``/``--rerank``
+re-embed into another layout: documents written with other settings are stale too.
+Update the Atlas index definition to match.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from bson import json_util
+from pymongo import MongoClient, UpdateMany
+
+from ClaudePlayer import CONTEXT_FORMAT_VERSION, battle_context
+from bedrock_client import make_bedrock_client, retryable
+from embedding_cache import EmbeddingCache
+from embedding_storage import EMBEDDING_STORAGE_VERSION, QUANTIZATIONS, TITAN_V2_DIMENSIONS, EmbeddingStorage
+from executors import BoundedExecutor
+from instrumentation import configure_logging, get_logger
+from observations import battle_from_observation
+
+logger = get_logger(__name__)
+
+PROJECTION = {"observation": 1, "battle_id": 1, "turn": 1, "context": 1, "context_version": 1}
+
+
+def stale_filter(
+    model_id: str, context_version: int = CONTEXT_FORMAT_VERSION, storage: Optional[EmbeddingStorage] = None
+) -> dict:
+    """Documents without an embedding from ``model_id`` over the current context format,
+    stamped with a storage layout (with ``storage``, that layout)."""
+    stale = [
+        {"embedding": None},
+        {"embedding_model": {"$ne": model_id}},
+        {"context_version": {"$ne": context_version}},
+    ]
+    if storage is None:
+        stale += [{"embedding_dim": None}, {"embedding_storage_version": None}]
+    else:
+        stale += [
+            {"embedding_dim": {"$ne": storage.dimensions}},
+            {"embedding_quantization": {"$ne": storage.quantization}},
+            {"embedding_storage_version": {"$ne": EMBEDDING_STORAGE_VERSION}},
+        ]
+        if storage.reranks:
+            stale.append({"embedding_full": None})
+    return {"$or": stale}
+
+
+class EmbeddingBackfill:
+    """Streams stale `battle_logs` documents through Titan and writes the vectors back.
+
+    At most ``concurrency`` Titan calls are in flight. Throttling and timeouts are
+    retried up to ``max_retries`` times with exponential backoff and full jitter,
+    starting at ``base_delay_s`` and capped at ``max_delay_s``. Contexts already
+    embedded earlier in the run are served from an `EmbeddingCache`.
+    """
+
+    def __init__(
+        self,
+        collection,
+        bedrock_client,
+        model_id: str = "amazon.titan-embed-text-v2:0",
+        concurrency: int = 8,
+        page_size: int = 500,
+        checkpoint_path: Optional[str] = "embedding_backfill.checkpoint.json",
+        max_retries: int = 6,
+        base_delay_s: float = 0.5,
+        max_delay_s: float = 20.0,
+        cache_size: int = 50000,
+        storage: Optional[EmbeddingStorage] = None,
+    ):
+        self.collection = collection
+        self.bedrock = bedrock_client
+        self.model_id = model_id
+        # Every write carries the storage stamp, defaults included.
+        self.storage = EmbeddingStorage() if storage is None else storage
+        self.page_size = page_size
+        self.checkpoint_path = checkpoint_path
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.embedding_executor = BoundedExecutor("backfill-embeddings", concurrency)
+        self.mongo_executor = BoundedExecutor("backfill-mongo", 1)
+        self.cache = EmbeddingCache(cache_size, ttl_s=None)
+
+        self.pages = 0
+        self.scanned = 0
+        self.contexts = 0
+        self.embedded = 0
+        self.reused = 0
+        self.updated = 0
+        self.failed = 0
+        self.retries = 0
+        self.elapsed_s = 0.0
+
+    # ----------------------------
+    # Checkpoint
+    # ----------------------------
+
+    def load_checkpoint(self):
+        """The last ``_id`` written by a previous run with the same model and format, if any."""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json_util.loads(f.read())
+        if checkpoint.get("model") != self.model_id or checkpoint.get("context_version") != CONTEXT_FORMAT_VERSION:
+            return None
+        if checkpoint.get("storage") != self._storage_stamp():
+            return None
+        return checkpoint.get("after")
+
+    def _storage_stamp(self) -> dict:
+        return {**self.storage.stamp(), "rerank": self.storage.reranks}
+
+    def save_checkpoint(self, after):
+        if not self.checkpoint_path:
+            return
+        checkpoint = {
+            "after": after, "model": self.model_id, "context_version": CONTEXT_FORMAT_VERSION, "storage": self._storage_stamp(),
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps(checkpoint))
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # ----------------------------
+    # Embedding
+    # ----------------------------
+
+    def _invoke(self, text: str) -> List[float]:
+        # Only Titan v2 takes an output size; other models get the bare text, as in ClaudePlayer.
+        request = self.storage.titan_request(text) if "titan-embed-text-v2" in self.model_id else {"inputText": text}
+        response = self.bedrock.invoke_model(
+            body=json.dumps(request),
+            modelId=self.model_id,
+            accept="application/json",
+            contentType="application/json",
+        )
+        return json.loads(response.get("body").read())["embedding"]
+
+    async def _embed(self, context: str) -> Optional[List[float]]:
+        cached = self.cache.get(context)
+        if cached is not None:
+            self.reused += 1
+            return cached
+        for attempt in range(self.max_retries + 1):
+            try:
+                embedding = await self.embedding_executor.run(self._invoke, context)
+            except Exception as e:
+                if attempt == self.max_retries or not retryable(e):
+                    logger.warning("⚠️ Backfill embedding failed: %s", e)
+                    return None
+                self.retries += 1
+                delay = min(self.max_delay_s, self.base_delay_s * 2 ** attempt)
+                await asyncio.sleep(random.uniform(0, delay))
+                continue
+            self.embedded += 1
+            self.cache.put(context, embedding)
+            return embedding
+
+    @staticmethod
+    def context_for(doc: dict) -> str:
+        """The stored context when it's in the current format, else rebuilt from the observation."""
+        if doc.get("context") and doc.get("context_version") == CONTEXT_FORMAT_VERSION:
+            return doc["context"]
+        battle = battle_from_observation(doc["observation"], doc.get("battle_id") or "battle-backfill", doc.get("turn") or 1)
+        return battle_context(battle)
+
+    # ----------------------------
+    # Paging
+    # ----------------------------
+
+    def _find_page(self, after, limit: int) -> List[dict]:
+        query = stale_filter(self.model_id, storage=self.storage)
+        if after is not None:
+            query = {"$and": [{"_id": {"$gt": after}}, query]}
+        return list(self.collection.find(query, PROJECTION).sort("_id", 1).limit(limit))
+
+    async def _process_page(self, docs: List[dict]) -> int:
+        ids_by_context: Dict[str, list] = {}
+        for doc in docs:
+            try:
+                context = self.context_for(doc)
+            except Exception as e:
+                self.failed += 1
+                logger.warning("⚠️ Backfill can't rebuild the context of %s: %s", doc["_id"], e)
+                continue
+            ids_by_context.setdefault(context, []).append(doc["_id"])
+        self.contexts += len(ids_by_context)
+
+        embeddings = await asyncio.gather(*(self._embed(context) for context in ids_by_context))
+        requests = []
+        for (context, ids), embedding in zip(ids_by_context.items(), embeddings):
+            if embedding is None:
+                self.failed += len(ids)
+                continue
+            stored = self.storage.encode(embedding)
+            requests.append(UpdateMany(
+                {"_id": {"$in": ids}},
+                {"$set": {
+                    **stored,
+                    "embedding_model": self.model_id,
+                    "context": context,
+                    "context_version": CONTEXT_FORMAT_VERSION,
+                }},
+            ))
+        if not requests:
+            return 0
+        result = await self.mongo_executor.run(self.collection.bulk_write, requests, ordered=False)
+        return result.modified_count
+
+    async def run(self, limit: Optional[int] = None, restart: bool = False) -> dict:
+        """Backfill until no stale documents are left past the checkpoint, or ``limit`` are scanned."""
+        after = None if restart else self.load_checkpoint()
+        if after is not None:
+            logger.info("⏩ Resuming backfill after _id %s", after)
+        started = time.perf_counter()
+        try:
+            while limit is None or self.scanned < limit:
+                page_size = self.page_size if limit is None else min(self.page_size, limit - self.scanned)
+                docs = await self.mongo_executor.run(self._find_page, after, page_size)
+                if not docs:
+                    break
+                self.updated += await self._process_page(docs)
+                self.pages += 1
+                self.scanned += len(docs)
+                after = docs[-1]["_id"]
+                self.save_checkpoint(after)
+                logger.info(
+                    "🧮 Backfill page %d: %d docs, %d contexts, %d updated so far",
+                    self.pages, len(docs), self.contexts, self.updated,
+                )
+        finally:
+            self.elapsed_s += time.perf_counter() - started
+            self.embedding_executor.shutdown(wait=False)
+            self.mongo_executor.shutdown(wait=False)
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {
+            "pages": self.pages,
+            "scanned": self.scanned,
+            "contexts": self.contexts,
+            "embedded": self.embedded,
+            "reused": self.reused,
+            "updated": self.updated,
+            "failed": self.failed,
+            "retries": self.retries,
+            "elapsed_s": self.elapsed_s,
+            "docs_per_s": self.scanned / self.elapsed_s if self.elapsed_s else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="amazon.titan-embed-text-v2:0", help="embedding model id")
+    parser.add_argument("--db", default="pokemon_ai")
+    parser.add_argument("--collection", default="battle_logs")
+    parser.add_argument("--concurrency", type=int, default=8, help="Titan calls in flight")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, help="stop after scanning this many documents")
+    parser.add_argument("--checkpoint", default="embedding_backfill.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint")
+    parser.add_argument("--dimensions", type=int, choices=TITAN_V2_DIMENSIONS, help="Titan v2 output size")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, help="how the vectors are stored")
+    parser.add_argument("--rerank", action="store_true", help="also store float32 vectors for an exact rerank")
+    args = parser.parse_args()
+    configure_logging()
+
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri is None:
+        raise ValueError("MONGO_URI environment variable is not set.")
+    collection = MongoClient(mongo_uri)[args.db][args.collection]
+    backfill = EmbeddingBackfill(
+        collection,
+        make_bedrock_client(max(args.concurrency, 1)),
+        model_id=args.model,
+        concurrency=args.concurrency,
+        page_size=args.page_size,
+        checkpoint_path=args.checkpoint,
+        storage=EmbeddingStorage(args.dimensions or 1024, args.quantization or "float", args.rerank),
+    )
+    print(json.dumps(asyncio.run(backfill.run(args.limit, args.restart)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
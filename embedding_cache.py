@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class EmbeddingCache:
+    """LRU cache of embeddings keyed on the normalized context string.
+
+    Entries expire after ``ttl_s`` seconds (``None`` disables expiry) and the least
+    recently used entry is evicted once ``max_size`` is reached.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_s: Optional[float] = 6 * 3600):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple[float, List[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = self.normalize(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, embedding = entry
+        if self.ttl_s is not None and time.monotonic() - stored_at > self.ttl_s:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return embedding
+
+    def put(self, text: str, embedding: List[float]):
+        key = self.normalize(text)
+        self._entries[key] = (time.monotonic(), embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hit_rate,
+        }
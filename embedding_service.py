@@ -0,0 +1,168 @@
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from bedrock_client import BedrockGateway, BedrockUnavailable
+from embedding_cache import EmbeddingCache
+from executors import BoundedExecutor
+from instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# Embedding models whose InvokeModel body takes a list of texts, and how many per request.
+# Titan takes a single inputText, so its requests are only coalesced, not combined.
+BATCH_LIMITS = {
+    "cohere.embed-english-v3": 96,
+    "cohere.embed-multilingual-v3": 96,
+}
+
+
+def batch_limit(model_id: str) -> int:
+    return next((limit for prefix, limit in BATCH_LIMITS.items() if model_id.startswith(prefix)), 1)
+
+
+class EmbeddingService:
+    """Embeddings for every battle of a process, coalesced and dispatched in small batches.
+
+    ``embed`` is served from the cache when it can. Otherwise a caller asking for a text
+    that is already being embedded waits on that request (single-flight). New texts wait
+    up to ``window_s`` for company and are dispatched in batches of at most
+    ``max_batch``, at most ``max_in_flight`` batches at a time. With ``embed_batch``
+    (models in `BATCH_LIMITS`), a batch is one request; else its texts go out as
+    concurrent single-text requests. ``window_s=None`` dispatches every text as soon as
+    it's asked for. Failed texts resolve to None for every caller waiting on them.
+    """
+
+    def __init__(
+        self,
+        embed_one: Callable[[str], List[float]],
+        executor: BoundedExecutor,
+        gateway: Optional[BedrockGateway] = None,
+        cache: Optional[EmbeddingCache] = None,
+        embed_batch: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        max_batch: int = 16,
+        window_s: Optional[float] = 0.002,
+        max_in_flight: int = 8,
+        single_flight: bool = True,
+    ):
+        self.embed_one = embed_one
+        self.embed_batch = embed_batch
+        self.executor = executor
+        self.gateway = gateway
+        self.cache = cache
+        self.max_batch = max_batch
+        self.window_s = window_s
+        self.max_in_flight = max_in_flight
+        self.single_flight = single_flight
+        self._pending = []  # (key, text, deadline, future) waiting for the window to close
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.invocations = 0
+        self.embedded = 0
+        self.failures = 0
+
+    async def embed(self, text: str, deadline: Optional[float] = None) -> Optional[List[float]]:
+        """The embedding of ``text``, or None if Titan failed. ``deadline`` is event-loop time."""
+        self.requests += 1
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        key = EmbeddingCache.normalize(text)
+        future = self._in_flight.get(key) if self.single_flight else None
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            if self.single_flight:
+                self._in_flight[key] = future
+            self._pending.append((key, text, deadline, future))
+            self._schedule(loop)
+        # Shielded: a caller giving up doesn't cancel the request for the others.
+        return await asyncio.shield(future)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        if self.window_s is None or len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_s, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(pending), self.max_batch):
+            task = loop.create_task(self._dispatch(pending[start:start + self.max_batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _call(self, fn, arg, deadline: Optional[float]):
+        if self.gateway is None:
+            return await self.executor.run(fn, arg)
+        return await self.gateway.call(self.executor, fn, arg, deadline=deadline)
+
+    async def _dispatch(self, batch: list):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        texts = [text for _, text, _, _ in batch]
+        deadlines = [deadline for _, _, deadline, _ in batch if deadline is not None]
+        deadline = min(deadlines) if deadlines else None
+        async with self._slots:
+            self.batches += 1
+            if self.embed_batch is not None:
+                self.invocations += 1
+                try:
+                    results = await self._call(self.embed_batch, texts, deadline)
+                except Exception as e:
+                    results = [e] * len(texts)
+            else:
+                self.invocations += len(texts)
+                results = await asyncio.gather(
+                    *(self._call(self.embed_one, text, deadline) for text in texts), return_exceptions=True
+                )
+        for (key, text, _, future), result in zip(batch, results):
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            if isinstance(result, BaseException):
+                self.failures += 1
+                if isinstance(result, BedrockUnavailable):
+                    logger.debug("🔌 Embedding skipped: %s", result)
+                else:
+                    logger.warning("⚠️ Embedding error: %s", result)
+                result = None
+            else:
+                self.embedded += 1
+                if self.cache is not None:
+                    self.cache.put(text, result)
+            if not future.done():
+                future.set_result(result)
+
+    async def drain(self):
+        """Dispatch whatever is waiting for the window and wait for every batch to finish."""
+        if self._pending:
+            self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "invocations": self.invocations,
+            "embedded": self.embedded,
+            "failures": self.failures,
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "mean_batch": (self.embedded + self.failures) / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,141 @@
+import struct
+from dataclasses import dataclass
+from typing import List
+
+import bson
+import numpy as np
+from bson.binary import Binary
+
+# Titan Text Embeddings v2 output sizes.
+TITAN_V2_DIMENSIONS = (256, 512, 1024)
+QUANTIZATIONS = ("float", "int8", "binary")
+# Bump when the stored layout of a quantization changes.
+EMBEDDING_STORAGE_VERSION = 1
+
+# BSON binary vectors (subtype 9): a dtype byte, a padding byte, then the packed values.
+BSON_VECTOR_SUBTYPE = 9
+_VECTOR_DTYPES = {"int8": 0x03, "float32": 0x27, "packed_bit": 0x10}
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row so its largest component is ±127. Cosine doesn't see the scale."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    peak = np.abs(vectors).max(axis=-1, keepdims=True)
+    return np.round(vectors * (127 / np.where(peak == 0, 1, peak))).astype(np.int8)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed 8 to a byte."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def bson_vector(values: np.ndarray, dtype: str, padding: int = 0) -> Binary:
+    data = np.asarray(values).astype({"int8": "<i1", "float32": "<f4", "packed_bit": "u1"}[dtype]).tobytes()
+    return Binary(struct.pack("<BB", _VECTOR_DTYPES[dtype], padding) + data, BSON_VECTOR_SUBTYPE)
+
+
+def from_bson_vector(binary: bytes) -> np.ndarray:
+    """float32 or int8 values of a BSON binary vector, or the unpacked bits of a packed one."""
+    dtype, padding = struct.unpack_from("<BB", binary)
+    data = bytes(binary)[2:]
+    if dtype == _VECTOR_DTYPES["float32"]:
+        return np.frombuffer(data, dtype="<f4")
+    if dtype == _VECTOR_DTYPES["int8"]:
+        return np.frombuffer(data, dtype="<i1")
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    return bits[:len(bits) - padding]
+
+
+@dataclass
+class EmbeddingStorage:
+    """How turn embeddings are requested from Titan, stored in `battle_logs` and searched.
+
+    ``dimensions`` is the Titan v2 output size. ``quantization`` is how ``embedding``
+    is stored and indexed: a float array (the original layout), or an ``int8`` or
+    ``binary`` BSON vector (1 byte or 1 bit per dimension). ``rerank`` also stores
+    the float32 vector, unindexed, as ``embedding_full``. Searches then fetch
+    ``rerank_candidates`` by the quantized vectors and rescore them with exact cosine.
+    Every document records the settings it was written with (`stamp`).
+    """
+    dimensions: int = 1024
+    quantization: str = "float"
+    rerank: bool = False
+    rerank_candidates: int = 50
+
+    def __post_init__(self):
+        if self.dimensions not in TITAN_V2_DIMENSIONS:
+            raise ValueError(f"dimensions must be one of {TITAN_V2_DIMENSIONS}, got {self.dimensions}")
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}, got {self.quantization!r}")
+
+    @property
+    def reranks(self) -> bool:
+        return self.rerank and self.quantization != "float"
+
+    def titan_request(self, text: str) -> dict:
+        return {"inputText": text, "dimensions": self.dimensions, "normalize": True}
+
+    def stamp(self) -> dict:
+        return {
+            "embedding_dim": self.dimensions,
+            "embedding_quantization": self.quantization,
+            "embedding_storage_version": EMBEDDING_STORAGE_VERSION,
+        }
+
+    def encode(self, embedding: List[float]) -> dict:
+        """Fields to store for a float embedding: the indexed vector, the rerank copy and the stamp."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self.quantization == "float":
+            fields = {"embedding": [float(x) for x in embedding]}
+        elif self.quantization == "int8":
+            fields = {"embedding": bson_vector(quantize_int8(vector), "int8")}
+        else:
+            fields = {"embedding": bson_vector(quantize_binary(vector), "packed_bit", -len(vector) % 8)}
+        if self.reranks:
+            fields["embedding_full"] = bson_vector(vector, "float32")
+        return {**fields, **self.stamp()}
+
+    def encode_doc(self, doc: dict) -> dict:
+        """A copy of a turn log with its float ``embedding`` replaced by the stored fields."""
+        if not doc.get("embedding"):
+            return doc
+        return {**doc, **self.encode(doc["embedding"])}
+
+    def query_vector(self, embedding: List[float]):
+        """``queryVector`` for `$vectorSearch`; it has to match the indexed vector type."""
+        return self.encode(embedding)["embedding"]
+
+    def index_definition(self, definition: dict) -> dict:
+        """An Atlas Vector Search definition (e.g. mongodb-index.json) with its ``embedding``
+        field sized and typed for these settings."""
+        vector = {
+            "numDimensions": self.dimensions,
+            "path": "embedding",
+            # Atlas compares packed bits by Hamming distance, reported as "euclidean".
+            "similarity": "euclidean" if self.quantization == "binary" else "cosine",
+            "type": "vector",
+        }
+        fields = [vector if field.get("path") == "embedding" else field for field in definition["fields"]]
+        return {**definition, "fields": fields}
+
+
+def rerank_exact(embedding: List[float], candidates: List[dict], k: int) -> List[dict]:
+    """Rescore candidates carrying ``embedding_full`` by exact cosine, on the
+    ``(1 + cosine) / 2`` scale, and keep the best ``k``."""
+    query = np.asarray(embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1)
+    rescored = []
+    for candidate in candidates:
+        full = candidate.pop("embedding_full", None)
+        if full is not None:
+            vector = from_bson_vector(full)
+            candidate["score"] = float((1 + vector @ query / (np.linalg.norm(vector) or 1)) / 2)
+        rescored.append(candidate)
+    rescored.sort(key=lambda c: c["score"], reverse=True)
+    return rescored[:k]
+
+
+def stored_bytes(storage: EmbeddingStorage, embedding: List[float]) -> int:
+    """BSON size of the embedding fields one document stores under ``storage``."""
+    return len(bson.BSON.encode(storage.encode(embedding))) - len(bson.BSON.encode(storage.stamp()))
+
@@ -0,0 +1,47 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+
+class BoundedExecutor:
+    """Runs blocking client calls (boto3, pymongo) off the event loop.
+
+    At most ``max_concurrency`` calls run at once; extra callers wait their turn
+    without blocking the loop. ``max_concurrency=0`` runs calls inline, which is the
+    old blocking behaviour.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._pool = (
+            ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=name)
+            if max_concurrency > 0
+            else None
+        )
+        self.in_flight = 0
+        self.completed = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        self.in_flight += 1
+        try:
+            if self._pool is None:
+                return fn(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
@@ -1,3 +1,21 @@
+import numpy as np
+
+TYPE_LIST = "BUG,DARK,DRAGON,ELECTRIC,FAIRY,FIGHTING,FIRE,FLYING,GHOST,GRASS,GROUND,ICE,NORMAL,POISON,PSYCHIC,ROCK,STEEL,WATER".split(
+    ","
+)
+TYPE_INDEX = {type: i for i, type in enumerate(TYPE_LIST)}
+NO_TYPE = len(TYPE_LIST)  # second-type slot for single-typed defenders
+
+# (multiplier, sentence) in the order the prompt lists them
+DAMAGE_CATEGORIES = (
+    (4, "extremely-effective (4x damage)"),
+    (2, "super-effective (2x damage)"),
+    (1 / 2, "ineffective (0.5x damage)"),
+    (1 / 4, "highly ineffective (0.25x damage)"),
+    (0, "zero effect (0x damage)"),
+)
+
+
 def calculate_move_type_damage_multiplier(
     type_1, type_2, type_chart, constraint_type_list
 ):
@@ -62,7 +80,8 @@ def calculate_move_type_damage_multiplier(
         list(map(lambda x: x.capitalize(), immune_type_list)),
     )
 
-def move_type_damage_wrapper(pokemon, type_chart, constraint_type_list=None):
+def legacy_move_type_damage_wrapper(pokemon, type_chart, constraint_type_list=None):
+    """Walks the type chart on every call. Kept as the reference for TypeEffectivenessTable."""
 
     type_1 = None
     type_2 = None
@@ -124,3 +143,87 @@ def move_type_damage_wrapper(pokemon, type_chart, constraint_type_list=None):
         )
 
     return move_type_damage_prompt
+
+
+
+class TypeEffectivenessTable:
+    """Type chart compiled into a dense multiplier array.
+
+    ``multipliers[attack, defender_type_1, defender_type_2]`` holds the damage
+    multiplier, with ``NO_TYPE`` as the second index for single-typed defenders.
+    Rendered prompt fragments are cached per (species, types, constraint).
+    """
+
+    def __init__(self, type_chart):
+        chart = np.ones((len(TYPE_LIST), len(TYPE_LIST) + 1))
+        for defender, row in type_chart.items():
+            if defender in TYPE_INDEX:
+                for attack, value in row.items():
+                    if attack in TYPE_INDEX:
+                        chart[TYPE_INDEX[attack], TYPE_INDEX[defender]] = value
+        self.multipliers = chart[:, :, None] * chart[:, None, :]
+        self._fragments = {}
+
+    @staticmethod
+    def defender_types(pokemon):
+        type_1 = pokemon.type_1.name if pokemon.type_1 else None
+        type_2 = pokemon.type_2.name if type_1 and pokemon.type_2 else None
+        return type_1, type_2
+
+    def multiplier_row(self, type_1, type_2):
+        return self.multipliers[:, TYPE_INDEX[type_1], TYPE_INDEX[type_2] if type_2 else NO_TYPE]
+
+    def score(self, attack_types, defenders):
+        """Multipliers for every attack type against every defender in one lookup.
+
+        ``defenders`` is a list of ``(type_1, type_2)`` names (``type_2`` may be None);
+        returns an array of shape ``(len(attack_types), len(defenders))``.
+        """
+        attack = np.array([TYPE_INDEX[t] for t in attack_types], dtype=np.intp)
+        type_1 = np.array([TYPE_INDEX[t1] for t1, _ in defenders], dtype=np.intp)
+        type_2 = np.array([TYPE_INDEX[t2] if t2 else NO_TYPE for _, t2 in defenders], dtype=np.intp)
+        return self.multipliers[attack[:, None], type_1[None, :], type_2[None, :]]
+
+    def score_pokemon(self, attack_types, pokemons):
+        return self.score(attack_types, [self.defender_types(p) for p in pokemons])
+
+    def describe(self, pokemon, constraint_type_list=None):
+        """Same text as ``legacy_move_type_damage_wrapper``."""
+        type_1, type_2 = self.defender_types(pokemon)
+        constraint = tuple(constraint_type_list) if constraint_type_list else None
+        key = (pokemon.species, type_1, type_2, constraint)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._render(pokemon.species, self.multiplier_row(type_1, type_2), constraint)
+            self._fragments[key] = fragment
+        return fragment
+
+    @staticmethod
+    def _render(species, row, constraint):
+        allowed = set(constraint) if constraint else None
+        prompt = ""
+        for value, effect in DAMAGE_CATEGORIES:
+            types = [
+                type.capitalize()
+                for type, multiplier in zip(TYPE_LIST, row)
+                if multiplier == value and (allowed is None or type in allowed)
+            ]
+            if types:
+                prompt += " " + ", ".join(types) + f"-type attack is {effect} to {species}."
+        return prompt
+
+
+_compiled_type_charts = {}
+
+
+def compile_type_chart(type_chart):
+    """The TypeEffectivenessTable for a GenData type chart, built once per chart."""
+    entry = _compiled_type_charts.get(id(type_chart))
+    if entry is None or entry[0] is not type_chart:
+        entry = (type_chart, TypeEffectivenessTable(type_chart))
+        _compiled_type_charts[id(type_chart)] = entry
+    return entry[1]
+
+
+def move_type_damage_wrapper(pokemon, type_chart, constraint_type_list=None):
+    return compile_type_chart(type_chart).describe(pokemon, constraint_type_list)
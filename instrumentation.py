@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+LOGGER_NAME = "pokeagent"
+# Finished battles remembered so late spans of theirs don't start new per-battle histograms.
+FINISHED_BATTLES_KEPT = 4096
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: the message plus any ``extra`` fields, as text or JSON."""
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}
+        message = record.getMessage()
+        if self.json_lines:
+            line = {"ts": record.created, "level": record.levelname, "logger": record.name, "msg": message, **fields}
+            if record.exc_info:
+                line["exc"] = self.formatException(record.exc_info)
+            return json.dumps(line, default=str, ensure_ascii=False)
+        if fields:
+            message += "  " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+def get_logger(module: str) -> logging.Logger:
+    """The bot's loggers live under one parent so they can be configured apart from poke-env's."""
+    return logging.getLogger(f"{LOGGER_NAME}.{module}")
+
+
+def configure_logging(level: Optional[str] = None, json_lines: Optional[bool] = None):
+    """Send the bot's loggers to stderr.
+
+    Defaults come from ``LOG_LEVEL`` (INFO) and ``LOG_FORMAT`` (``json`` for JSON lines).
+    DEBUG adds the full observation and retrieved memories to each LLM turn.
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_lines is None:
+        json_lines = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(StructuredFormatter(json_lines))
+    # poke-env gives each player its own logger and handler; ours stay separate from them.
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+
+class Histogram:
+    """Count, sum and a sliding window of samples for quantiles."""
+
+    def __init__(self, window: int = 10000):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.percentile(np.fromiter(self.samples, dtype=np.float64), [q * 100 for q in QUANTILES])
+        return dict(zip(QUANTILES, values.tolist()))
+
+    def summary(self) -> dict:
+        quantiles = self.quantiles()
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            **{f"p{int(q * 100)}_ms": v * 1000 for q, v in quantiles.items()},
+        }
+
+
+class Instrumentation:
+    """Timed spans per decision stage, Bedrock counters and their exports.
+
+    Every span feeds a process-wide histogram for its stage and, when it belongs to a
+    battle, a per-battle one that is summarized into the trace and dropped when the
+    battle ends. Spans of a battle that already ended (background logging of its last
+    turns) only feed the stage histograms. With ``trace_path`` set, spans are also appended to a JSONL trace.
+    `prometheus_text` renders everything in the Prometheus text format, and `serve`
+    exposes it on a local ``/metrics`` endpoint.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, window: int = 10000, namespace: str = "pokeagent"):
+        self.window = window
+        self.namespace = namespace
+        self.stages: Dict[str, Histogram] = defaultdict(lambda: Histogram(window))
+        self.battles: Dict[str, Dict[str, Histogram]] = {}
+        self._finished: Dict[str, None] = {}  # recently finished battle tags, oldest first
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._gauges: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, "a", encoding="utf-8") if trace_path else None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def observe(self, stage: str, seconds: float, battle_tag: Optional[str] = None, **attrs):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+            if battle_tag is not None and battle_tag not in self._finished:
+                battle = self.battles.setdefault(battle_tag, {})
+                if stage not in battle:
+                    battle[stage] = Histogram(self.window)
+                battle[stage].observe(seconds)
+            if self._trace is not None:
+                record = {"ts": time.time(), "stage": stage, "ms": round(seconds * 1000, 3)}
+                if battle_tag is not None:
+                    record["battle"] = battle_tag
+                record.update(attrs)
+                self._trace.write(json.dumps(record, default=str) + "\n")
+
+    @contextmanager
+    def span(self, stage: str, battle_tag: Optional[str] = None, **attrs):
+        """Time the enclosed block, including awaits, as one sample of ``stage``.
+
+        The yielded dict can be filled with attributes that are only known at the end.
+        """
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.observe(stage, time.perf_counter() - started, battle_tag, **attrs)
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def register_gauges(self, name: str, stats: Callable[[], dict]):
+        """Export the numeric fields of ``stats()`` as gauges named ``<name>_<field>``."""
+        self._gauges[name] = stats
+
+    def battle_summary(self, battle_tag: str) -> dict:
+        with self._lock:
+            return {stage: h.summary() for stage, h in self.battles.get(battle_tag, {}).items()}
+
+    def finish_battle(self, battle_tag: str, **attrs) -> dict:
+        """Write the battle's per-stage summary to the trace and drop its histograms."""
+        summary = self.battle_summary(battle_tag)
+        with self._lock:
+            self.battles.pop(battle_tag, None)
+            self._finished[battle_tag] = None
+            if len(self._finished) > FINISHED_BATTLES_KEPT:
+                del self._finished[next(iter(self._finished))]
+            if self._trace is not None:
+                record = {"ts": time.time(), "stage": "battle", "battle": battle_tag, "stages": summary, **attrs}
+                self._trace.write(json.dumps(record, default=str) + "\n")
+                self._trace.flush()
+        return summary
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {stage: h.summary() for stage, h in self.stages.items()}
+
+    def prometheus_text(self) -> str:
+        ns = self.namespace
+        lines = [f"# TYPE {ns}_stage_seconds summary"]
+        with self._lock:
+            stages = {stage: (h.count, h.total, h.quantiles()) for stage, h in self.stages.items()}
+            counters = dict(self.counters)
+        for stage, (count, total, quantiles) in sorted(stages.items()):
+            for q, value in quantiles.items():
+                lines.append(f'{ns}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{ns}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_text}}} {_number(value)}" if label_text else f"{metric} {_number(value)}")
+
+        for name, stats in sorted(self._gauges.items()):
+            for field, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"{ns}_{name}_{field}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve `prometheus_text` at ``http://host:port/metrics`` from a daemon thread."""
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = instrumentation.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server
+
+    def flush(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.flush()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from poke_env.environment.battle import Battle
+
+from helpers import TYPE_INDEX, TypeEffectivenessTable
+
+SYSTEM_PROMPT = """
+You are an expert Pokémon battle strategist. Use both the current battle state and past experiences to make optimal decisions.
+Prioritize actions that succeeded in similar situations, especially in battles that were won. Avoid strategies that failed (marked as 'fallback') or that came from lost battles.
+""".strip()
+
+FORMAT_RULES = """
+--- FORMAT: GEN 1 OU ---
+- Singles, 6v6 at most, level 100. There are no abilities, held items, natures or weather.
+- Special is a single stat used both to attack and to defend with special moves.
+- Move category is decided by type: Normal, Fighting, Flying, Ground, Rock, Bug, Ghost and Poison moves are physical; Fire, Water, Grass, Electric, Ice, Psychic and Dragon moves are special.
+- Same-type attack bonus (STAB) multiplies damage by 1.5. Type effectiveness multiplies by 0, 0.25, 0.5, 1, 2 or 4.
+- Gen 1 type quirks: Ghost moves do not affect Psychic types; Bug and Poison are super effective against each other; Ice is neutral against Fire.
+- Critical hit chance scales with the attacker's base Speed; Slash and other high-critical moves almost always crit.
+- Freeze does not thaw on its own. Sleep lasts 1-7 turns and the sleeping Pokémon wakes without acting.
+- Paralysis quarters Speed and skips a quarter of turns. Burn halves Attack. Toxic damage grows each turn.
+- Hyper Beam needs no recharge turn if it knocks the target out. Partial-trapping moves (Wrap, Fire Spin) stop the target from acting.
+- Stat boosts range from -6 to +6; Agility doubles Speed. Switching out resets boosts and confusion.
+- A fainted Pokémon must be replaced before the next turn. The side that loses all its Pokémon loses the battle.
+""".strip()
+
+RESPONSE_FORMAT = """
+--- INSTRUCTIONS ---
+Respond with ONLY a valid JSON object. No extra text, markdown, or explanation.
+
+Valid formats:
+{"thought":"<1-4 sentence reasoning>", "move":"<exact move name>"}
+OR
+{"thought":"<1-4 sentence reasoning>", "switch":"<exact pokemon species>"}
+""".strip()
+
+GEN1_TYPES = (
+    "NORMAL", "FIRE", "WATER", "ELECTRIC", "GRASS", "ICE", "FIGHTING", "POISON",
+    "GROUND", "FLYING", "PSYCHIC", "BUG", "ROCK", "GHOST", "DRAGON",
+)
+
+
+def type_chart_rules(type_table: TypeEffectivenessTable) -> str:
+    """Every non-neutral gen 1 matchup, one line per attacking type."""
+    lines = ["--- TYPE CHART (attacking type: multiplier against defending types) ---"]
+    for attack in GEN1_TYPES:
+        row = type_table.multipliers[TYPE_INDEX[attack], :, -1]
+        groups = []
+        for value in (2, 0.5, 0):
+            defenders = [t.capitalize() for t in GEN1_TYPES if row[TYPE_INDEX[t]] == value]
+            if defenders:
+                groups.append(f"{value:g}x {', '.join(defenders)}")
+        lines.append(f"{attack.capitalize()}: {'; '.join(groups) or 'neutral against all'}")
+    return "\n".join(lines)
+
+
+def system_text(type_table: TypeEffectivenessTable) -> str:
+    """The stable prefix: the same for every turn of every battle."""
+    return "\n\n".join((SYSTEM_PROMPT, FORMAT_RULES, type_chart_rules(type_table), RESPONSE_FORMAT))
+
+
+@dataclass
+class LLMPromptConfig:
+    """How `_get_llm_decision` lays out its request.
+
+    The prompt is a stable prefix and a short per-turn suffix. The system text (rules
+    and response format) is the same for every call. The per-battle brief of our team
+    follows it, as the first block of the user message. With ``cache`` both get a
+    Bedrock prompt-cache breakpoint, so later turns read them from the cache instead of
+    paying for them again. Anthropic models cache prefixes of at least 1024 tokens
+    (2048 for Haiku); shorter ones are just sent uncached. The reply is one small JSON
+    object, so ``max_tokens`` stays low.
+    """
+    cache: bool = True
+    max_tokens: int = 256
+    model_id: str = "apac.anthropic.claude-sonnet-4-20250514-v1:0"
+
+
+def team_brief(battle: Battle, type_table: TypeEffectivenessTable) -> str:
+    """Our roster for the whole battle: types, base stats, weaknesses and full movesets."""
+    lines = ["--- YOUR TEAM (fixed for this battle) ---"]
+    for pkmn in battle.team.values():
+        stats = pkmn.base_stats
+        lines.append(
+            f"{pkmn.species}: {' / '.join(t.name for t in pkmn.types)} | "
+            f"HP {stats.get('hp')} Atk {stats.get('atk')} Def {stats.get('def')} "
+            f"Spc {stats.get('spa')} Spe {stats.get('spe')}"
+        )
+        lines.append(" " + type_table.describe(pkmn, GEN1_TYPES))
+        for move in pkmn.moves.values():
+            accuracy = "-" if move.accuracy is True else f"{move.accuracy * 100:.0f}%"
+            lines.append(
+                f"  - {move.id} ({move.type.name}, {move.category.name}, BP: {move.base_power}, "
+                f"Acc: {accuracy}, PP: {move.max_pp})"
+            )
+    return "\n".join(lines)
+
+
+def turn_prompt(past_memories: str, battle_state: str, opponent_model: Optional[str] = None) -> str:
+    opponent = f"\n\n--- OPPONENT MODEL (from past battles) ---\n{opponent_model}" if opponent_model else ""
+    return f"""
+--- PAST EXPERIENCES (most relevant first) ---
+{past_memories}
+
+--- CURRENT BATTLE STATE ---
+{battle_state}{opponent}
+
+Begin your response now.
+""".strip()
+
+
+def llm_request(system: str, brief: str, turn: str, config: LLMPromptConfig) -> dict:
+    """Anthropic Messages body: the system text and team brief (cached), then the turn."""
+    cache_control = {"cache_control": {"type": "ephemeral"}} if config.cache else {}
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": config.max_tokens,
+        "system": [{"type": "text", "text": system, **cache_control}],
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": brief, **cache_control},
+                {"type": "text", "text": turn},
+            ],
+        }],
+    }
+
+
+def input_token_usage(usage: Optional[dict]) -> dict:
+    """Uncached, cache-read and cache-write input tokens of one Anthropic ``usage`` block."""
+    usage = usage or {}
+    return {
+        "input_tokens": usage.get("input_tokens"),
+        "cache_read_tokens": usage.get("cache_read_input_tokens") or 0,
+        "cache_write_tokens": usage.get("cache_creation_input_tokens") or 0,
+    }
+
+
+def input_cost(usage: dict, cache_read_rate: float = 0.1, cache_write_rate: float = 1.25) -> float:
+    """Input tokens in uncached-token equivalents: cache reads bill at a tenth, 5-minute cache writes at 1.25x."""
+    return (
+        (usage.get("input_tokens") or 0)
+        + cache_read_rate * usage.get("cache_read_tokens", 0)
+        + cache_write_rate * usage.get("cache_write_tokens", 0)
+    )
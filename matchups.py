@@ -0,0 +1,197 @@
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from poke_env.data.gen_data import GenData
+from poke_env.data.normalize import to_id_str
+from poke_env.environment.battle import Battle
+
+from helpers import NO_TYPE, TYPE_INDEX, TypeEffectivenessTable
+
+# Our team as species id -> move ids, in team order.
+Team = Dict[str, List[str]]
+
+SPEED_LABELS = {1: "faster", 0: "speed tie", -1: "slower"}
+
+
+def team_from_packed(packed: str) -> Team:
+    """Species and move ids from a packed Showdown team (what a Teambuilder yields)."""
+    team = {}
+    for entry in packed.split("]"):
+        fields = entry.split("|")
+        if len(fields) < 5:
+            continue
+        nickname, species, moves = fields[0], fields[1], fields[4]
+        team[to_id_str(species or nickname)] = [to_id_str(m) for m in moves.split(",") if m]
+    return team
+
+
+def team_from_battle(battle: Battle) -> Team:
+    return {pkmn.species: list(pkmn.moves) for pkmn in battle.team.values()}
+
+
+class MatchupTable:
+    """Our team against every species of the format, computed once per team.
+
+    Rows are our team members (``T``) or their moves (``M``), columns are the format's
+    species (``S``), all held in numpy arrays:
+
+    - ``move_multiplier[M, S]``: type effectiveness of each of our moves;
+    - ``move_power[M, S]``: base power x effectiveness x STAB x accuracy;
+    - ``offense[T, S]``: best multiplier of the member's own types against the species;
+    - ``defense[T, S]``: worst multiplier the species' types hit the member for;
+    - ``speed[T, S]``: +1 faster, 0 tie, -1 slower, by base speed;
+    - ``switch_ins[S, T]``: members ordered from best to worst switch-in.
+
+    Per-turn callers only index into these; `summary` renders (and caches) the prompt
+    section for an opponent and the members still standing.
+    """
+
+    def __init__(self, type_table: TypeEffectivenessTable, team: Team, gen: int = 1, stab: float = 1.5):
+        data = GenData.from_gen(gen)
+        self.type_table = type_table
+        self.members = list(team)
+        self.member_index = {species: i for i, species in enumerate(self.members)}
+
+        # Format species only: gen 1 dex numbers, no megas/regional formes.
+        self.species = [sid for sid, entry in data.pokedex.items() if 0 < entry["num"] <= 151 and "forme" not in entry]
+        self.species += [m for m in self.members if m not in self.species]
+        self.species_index = {sid: i for i, sid in enumerate(self.species)}
+        types = np.full((len(self.species), 2), NO_TYPE, dtype=np.int16)
+        base_speed = np.zeros(len(self.species), dtype=np.int16)
+        for i, sid in enumerate(self.species):
+            entry = data.pokedex[sid]
+            for slot, name in enumerate(entry["types"][:2]):
+                types[i, slot] = TYPE_INDEX[name.upper()]
+            base_speed[i] = entry["baseStats"]["spe"]
+        self.types = types
+        self.base_speed = base_speed
+        member_rows = np.array([self.species_index[m] for m in self.members], dtype=np.intp)
+
+        multipliers = type_table.multipliers
+        # multiplier of every attack type against every species: (18, S)
+        by_attack = multipliers[:, types[:, 0], types[:, 1]]
+
+        self.moves: List[Tuple[int, str]] = []
+        move_types, powers = [], []
+        for t, species in enumerate(self.members):
+            member_types = {int(x) for x in types[member_rows[t]] if x != NO_TYPE}
+            for move_id in team[species]:
+                move = data.moves.get(move_id)
+                if move is None:
+                    continue
+                attack = TYPE_INDEX[move["type"].upper()]
+                accuracy = 1.0 if move["accuracy"] is True else move["accuracy"] / 100
+                bonus = stab if attack in member_types else 1.0
+                self.moves.append((t, move_id))
+                move_types.append(attack)
+                powers.append((move.get("basePower") or 0) * bonus * accuracy)
+        self.move_index = {key: i for i, key in enumerate(self.moves)}
+        self.move_multiplier = by_attack[np.array(move_types, dtype=np.intp)].astype(np.float32)
+        self.move_power = (self.move_multiplier * np.array(powers, dtype=np.float32)[:, None]).astype(np.float32)
+
+        offense = np.zeros((len(self.members), len(self.species)), dtype=np.float32)
+        defense = np.zeros_like(offense)
+        for t, row in enumerate(member_rows):
+            own = [int(x) for x in types[row] if x != NO_TYPE]
+            offense[t] = by_attack[own].max(axis=0)
+            # Each species' own types attacking this member; NO_TYPE indexes the 0 pad.
+            against_member = np.append(multipliers[:, types[row, 0], types[row, 1]], 0.0)
+            defense[t] = against_member[types].max(axis=1)
+        self.offense = offense
+        self.defense = defense
+        self.speed = np.sign(base_speed[member_rows][:, None] - base_speed[None, :]).astype(np.int8)
+
+        # Best switch-in: type matchup first, then speed.
+        switch_score = (offense - defense) + 0.1 * self.speed
+        self.switch_ins = np.argsort(-switch_score.T, axis=1, kind="stable").astype(np.int8)
+
+        self._best_move = np.full((len(self.members), len(self.species)), -1, dtype=np.int16)
+        for t in range(len(self.members)):
+            rows = [i for i, (member, _) in enumerate(self.moves) if member == t]
+            if rows:
+                self._best_move[t] = np.array(rows)[self.move_power[rows].argmax(axis=0)]
+        self._summaries = {}
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+
+    def move_multiplier_for(self, member: str, move_id: str, opponent: str) -> Optional[float]:
+        move = self.move_index.get((self.member_index.get(member, -1), move_id))
+        column = self.species_index.get(opponent)
+        if move is None or column is None:
+            return None
+        return float(self.move_multiplier[move, column])
+
+    def switch_matchup(self, member: str, opponent: str) -> Optional[Tuple[float, float]]:
+        """(offense, defense) multipliers of ``member``'s typing against ``opponent``."""
+        t, column = self.member_index.get(member), self.species_index.get(opponent)
+        if t is None or column is None:
+            return None
+        return float(self.offense[t, column]), float(self.defense[t, column])
+
+    def best_switch_ins(self, opponent: str, available: Sequence[str], n: int = 2) -> List[str]:
+        column = self.species_index.get(opponent)
+        if column is None:
+            return []
+        allowed = set(available)
+        return [self.members[t] for t in self.switch_ins[column] if self.members[t] in allowed][:n]
+
+    # ----------------------------
+    # Prompt summary
+    # ----------------------------
+
+    def summary(self, opponent: str, standing: Sequence[str], mode: str = "text") -> str:
+        key = (opponent, tuple(standing), mode)
+        cached = self._summaries.get(key)
+        if cached is None:
+            cached = self._summary(opponent, standing, mode)
+            self._summaries[key] = cached
+        return cached
+
+    def _member_rows(self, column: int, standing: Sequence[str]):
+        for species in standing:
+            t = self.member_index.get(species)
+            if t is None:
+                continue
+            best = self._best_move[t, column]
+            move = self.moves[best][1] if best >= 0 else None
+            multiplier = float(self.move_multiplier[best, column]) if best >= 0 else None
+            yield species, move, multiplier, float(self.defense[t, column]), int(self.speed[t, column])
+
+    def _summary(self, opponent: str, standing: Sequence[str], mode: str) -> str:
+        column = self.species_index.get(opponent)
+        if column is None:
+            return "{}" if mode == "json" else f"No precomputed matchups for {opponent}."
+        rows = list(self._member_rows(column, standing))
+        switch_ins = self.best_switch_ins(opponent, standing)
+        if mode == "json":
+            return json.dumps({
+                "vs": opponent,
+                "members": {
+                    species: {"move": move, "eff": multiplier, "takes": takes, "speed": speed}
+                    for species, move, multiplier, takes, speed in rows
+                },
+                "switch_in": switch_ins,
+            }, separators=(",", ":"))
+        lines = [f"vs {opponent} (base speed {int(self.base_speed[column])}):"]
+        for species, move, multiplier, takes, speed in rows:
+            best = f"best {move} ({multiplier:g}x)" if move else "no damaging move"
+            lines.append(f"- {species}: {best}, takes up to {takes:g}x, {SPEED_LABELS[speed]}")
+        lines.append(f"Best switch-ins: {', '.join(switch_ins) or 'None'}")
+        return "\n".join(lines)
+
+
+_tables = {}
+
+
+def matchup_table(type_table: TypeEffectivenessTable, team: Team, gen: int = 1) -> MatchupTable:
+    """The MatchupTable for a team, built once and shared by every battle that uses it."""
+    key = (id(type_table), gen, tuple((species, tuple(moves)) for species, moves in team.items()))
+    table = _tables.get(key)
+    if table is None or table.type_table is not type_table:
+        table = MatchupTable(type_table, team, gen)
+        _tables[key] = table
+    return table
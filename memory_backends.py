@@ -0,0 +1,347 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from bson import json_util
+
+from embedding_storage import EmbeddingStorage, quantize_binary, quantize_int8, rerank_exact
+from executors import BoundedExecutor
+
+# Fields returned for each memory, matching the Atlas `$project` stage.
+MEMORY_FIELDS = ("thought", "action_type", "action_name", "turn", "battle_id", "fallback_used", "outcome", "timestamp")
+
+
+def memory_from_log(doc: dict) -> dict:
+    """Project a `battle_logs` document onto the fields retrieval returns."""
+    decision = doc.get("llm_decision_raw") or {}
+    memory = {field: doc.get(field) for field in MEMORY_FIELDS if field != "thought"}
+    if "thought" in decision:
+        memory["thought"] = decision["thought"]
+    return memory
+
+
+class MemoryBackend:
+    """Where `_get_battle_memories` looks up similar past turns."""
+
+    async def search(self, embedding: List[float], k: int) -> List[dict]:
+        raise NotImplementedError
+
+    def add(self, doc: dict):
+        """Called for every logged turn; backends that index locally pick it up here."""
+
+    def battle_finished(self, battle_id: str, outcome: str):
+        """Called when a battle ends, after its turns were back-linked with the outcome."""
+
+
+class AtlasMemoryBackend(MemoryBackend):
+    """Atlas `$vectorSearch` over `battle_logs`.
+
+    ``storage`` says how the vectors were stored (see `EmbeddingStorage`): the query is
+    sent as the same vector type, and with ``rerank`` the top ``rerank_candidates`` are
+    fetched with their ``embedding_full`` and rescored by exact cosine. Binary vectors
+    searched without a rerank score ``1 / (1 + hamming distance)``.
+    """
+
+    def __init__(
+        self,
+        collection,
+        executor: BoundedExecutor,
+        index_name: str = "vector_index",
+        num_candidates: int = 100,
+        filter: Optional[dict] = None,
+        storage: Optional[EmbeddingStorage] = None,
+    ):
+        self.collection = collection
+        self.executor = executor
+        self.index_name = index_name
+        self.num_candidates = num_candidates
+        # Pre-filter on indexed filter fields, e.g. embedding_model / context_version.
+        self.filter = filter
+        self.storage = storage
+
+    @property
+    def reranks(self) -> bool:
+        return self.storage is not None and self.storage.reranks
+
+    def _pipeline(self, embedding: List[float], k: int) -> list:
+        limit = max(k, self.storage.rerank_candidates) if self.reranks else k
+        vector_search = {
+            "index": self.index_name,
+            "path": "embedding",
+            "queryVector": embedding if self.storage is None else self.storage.query_vector(embedding),
+            "numCandidates": max(self.num_candidates, limit),
+            "limit": limit
+        }
+        if self.filter:
+            vector_search["filter"] = self.filter
+        project = {
+            "_id": 0,
+            "thought": "$llm_decision_raw.thought",
+            "action_type": 1,
+            "action_name": 1,
+            "turn": 1,
+            "battle_id": 1,
+            "fallback_used": 1,
+            "outcome": 1,
+            "timestamp": 1,
+            "score": {"$meta": "vectorSearchScore"}
+        }
+        if self.reranks:
+            project["embedding_full"] = 1
+        return [{"$vectorSearch": vector_search}, {"$project": project}]
+
+    async def search(self, embedding: List[float], k: int) -> List[dict]:
+        pipeline = self._pipeline(embedding, k)
+        results = await self.executor.run(lambda: list(self.collection.aggregate(pipeline)))
+        return rerank_exact(embedding, results, k) if self.reranks else results
+
+
+class LocalVectorIndex(MemoryBackend):
+    """In-process cosine index over a memory-mapped float32 matrix.
+
+    Vectors live in ``<path>.f32`` (rows are L2-normalized, the file grows by
+    doubling) and their projected metadata in ``<path>.meta.jsonl``, one line per row.
+    Scores are reported as ``(1 + cosine) / 2``, the same scale Atlas uses for cosine
+    `vectorSearchScore`.
+
+    With ``n_partitions > 0`` the index also keeps an IVF layout: rows are assigned to
+    the nearest of ``n_partitions`` k-means centroids and a query only scores the rows
+    in its ``n_probe`` closest partitions. Partitions are trained once
+    ``ivf_min_rows`` rows are indexed; below that every search is exact.
+
+    ``storage`` sets the dimension and, with int8 or binary ``quantization``, keeps
+    quantized codes in memory and scores candidates on those (binary by Hamming
+    distance, as the cosine it estimates). With ``rerank`` the best
+    ``rerank_candidates`` are rescored exactly against the float rows.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = 1024,
+        n_partitions: int = 0,
+        n_probe: int = 8,
+        ivf_min_rows: int = 10000,
+        initial_capacity: int = 1024,
+        storage: Optional[EmbeddingStorage] = None,
+    ):
+        self.path = path
+        self.dim = dim if storage is None else storage.dimensions
+        self.storage = storage
+        self.n_partitions = n_partitions
+        self.n_probe = n_probe
+        self.ivf_min_rows = ivf_min_rows
+
+        self._vectors_path = path + ".f32"
+        self._meta_path = path + ".meta.jsonl"
+        self.metadata: List[dict] = []
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.metadata = [json.loads(line) for line in f if line.strip()]
+
+        row_bytes = self.dim * 4
+        existing = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        self._matrix = self._open(max(existing, initial_capacity, len(self.metadata)))
+        self._meta_file = open(self._meta_path, "a", encoding="utf-8")
+
+        # Quantized rows (and int8 row norms), grown by doubling like the matrix.
+        self.quantization = "float" if storage is None else storage.quantization
+        self._codes: Optional[np.ndarray] = None
+        self._code_norms: Optional[np.ndarray] = None
+        if self.quantization != "float":
+            for start in range(0, len(self), 65536):
+                self._store_codes(start, self.vectors[start:start + 65536])
+
+        # Rows of battles still running, so their outcome can be filled in when they end.
+        # Only the in-memory metadata is updated; reload from an export to persist it.
+        self._running: Dict[str, List[int]] = {}
+
+        self.centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        if n_partitions and len(self) >= ivf_min_rows:
+            self.train_partitions()
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def _open(self, capacity: int) -> np.memmap:
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(max(os.path.getsize(self._vectors_path), capacity * self.dim * 4))
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self)]
+
+    # ----------------------------
+    # Building
+    # ----------------------------
+
+    def add_many(self, embeddings: np.ndarray, memories: List[dict]):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+        start = len(self)
+        end = start + len(embeddings)
+        if end > self._matrix.shape[0]:
+            self._matrix.flush()
+            self._matrix = self._open(max(end, 2 * self._matrix.shape[0]))
+        self._matrix[start:end] = embeddings
+        if self.quantization != "float":
+            self._store_codes(start, embeddings)
+        for memory in memories:
+            self._meta_file.write(json.dumps(memory, default=str) + "\n")
+        self.metadata.extend(memories)
+
+        if self.centroids is not None:
+            self._assignments = np.concatenate([self._assignments, self._assign(embeddings)])
+        elif self.n_partitions and len(self) >= self.ivf_min_rows:
+            self.train_partitions()
+
+    def _store_codes(self, start: int, embeddings: np.ndarray):
+        codes = quantize_int8(embeddings) if self.quantization == "int8" else quantize_binary(embeddings)
+        end = start + len(codes)
+        if self._codes is None or end > len(self._codes):
+            capacity = max(end, 1024 if self._codes is None else 2 * len(self._codes))
+            grown = np.zeros((capacity, codes.shape[1]), dtype=codes.dtype)
+            norms = np.zeros(capacity, dtype=np.float32)
+            if self._codes is not None:
+                grown[:start] = self._codes[:start]
+                norms[:start] = self._code_norms[:start]
+            self._codes, self._code_norms = grown, norms
+        self._codes[start:end] = codes
+        self._code_norms[start:end] = np.linalg.norm(codes.astype(np.float32), axis=1)
+
+    def add(self, doc: dict):
+        if doc.get("embedding"):
+            self._running.setdefault(doc.get("battle_id"), []).append(len(self))
+            self.add_many(np.asarray([doc["embedding"]]), [memory_from_log(doc)])
+
+    def battle_finished(self, battle_id: str, outcome: str):
+        for row in self._running.pop(battle_id, []):
+            self.metadata[row]["outcome"] = outcome
+
+    def load_logs(self, docs: Iterable[dict], batch_size: int = 4096) -> int:
+        """Index `battle_logs` documents (a cursor or a parsed export) that have embeddings."""
+        loaded = 0
+        embeddings, memories = [], []
+        for doc in docs:
+            if not doc.get("embedding"):
+                continue
+            embeddings.append(doc["embedding"])
+            memories.append(memory_from_log(doc))
+            if len(embeddings) >= batch_size:
+                self.add_many(np.asarray(embeddings), memories)
+                loaded += len(embeddings)
+                embeddings, memories = [], []
+        if embeddings:
+            self.add_many(np.asarray(embeddings), memories)
+            loaded += len(embeddings)
+        self.flush()
+        return loaded
+
+    def load_export(self, export_path: str) -> int:
+        """Index a `mongoexport --collection battle_logs` JSON-lines export."""
+        with open(export_path, encoding="utf-8") as f:
+            return self.load_logs(json_util.loads(line) for line in f if line.strip())
+
+    def flush(self):
+        self._matrix.flush()
+        self._meta_file.flush()
+
+    def close(self):
+        self.flush()
+        self._meta_file.close()
+
+    # ----------------------------
+    # IVF partitions
+    # ----------------------------
+
+    def train_partitions(self, iterations: int = 10, sample_size: int = 50000, seed: int = 0):
+        """Spherical k-means over a sample of the rows, then assign every row."""
+        vectors = self.vectors
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), self.n_partitions, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(self.n_partitions):
+                members = sample[labels == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1)
+        self.centroids = centroids
+        self._assignments = np.concatenate(
+            [self._assign(vectors[i:i + 65536]) for i in range(0, len(vectors), 65536)]
+        )
+
+    def _assign(self, embeddings: np.ndarray) -> np.ndarray:
+        return np.argmax(embeddings @ self.centroids.T, axis=1).astype(np.int32)
+
+    # ----------------------------
+    # Search
+    # ----------------------------
+
+    def search_many(self, queries: np.ndarray, k: int, exact: bool = False) -> List[List[dict]]:
+        """Top-k memories for each query, scored with one batched matmul."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        if not len(self):
+            return [[] for _ in queries]
+
+        if self.centroids is None or exact:
+            rows = np.arange(len(self))
+            scores = self._scores(queries, None)
+            return [self._select(query, row, rows, k) for query, row in zip(queries, scores)]
+
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :self.n_probe]
+        results = []
+        for query, probe in zip(queries, probes):
+            rows = np.flatnonzero(np.isin(self._assignments, probe))
+            results.append(self._select(query, self._scores(query[None, :], rows)[0], rows, k))
+        return results
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Cosine of each query to each row (all rows when None), estimated from the codes if quantized."""
+        if self.quantization == "float":
+            return queries @ (self.vectors if rows is None else self.vectors[rows]).T
+        codes = self._codes[:len(self)] if rows is None else self._codes[rows]
+        if self.quantization == "int8":
+            norms = self._code_norms[:len(self)] if rows is None else self._code_norms[rows]
+            q = quantize_int8(queries).astype(np.float32)
+            # Cast a block of rows at a time: a float32 copy of every code costs more than the matmul.
+            dots = np.empty((len(q), len(codes)), dtype=np.float32)
+            for start in range(0, len(codes), 4096):
+                dots[:, start:start + 4096] = q @ codes[start:start + 4096].astype(np.float32).T
+            return dots / (np.linalg.norm(q, axis=1, keepdims=True) * np.where(norms == 0, 1, norms))
+        # The fraction of differing sign bits estimates the angle between the vectors.
+        hamming = np.stack([np.bitwise_count(codes ^ q).sum(axis=1, dtype=np.int32) for q in quantize_binary(queries)])
+        return np.cos(np.pi * hamming / self.dim).astype(np.float32)
+
+    def _select(self, query: np.ndarray, scores: np.ndarray, rows: np.ndarray, k: int) -> List[dict]:
+        if self.storage is not None and self.storage.reranks:
+            candidates = self._best(scores, max(k, self.storage.rerank_candidates))
+            rows = rows[candidates]
+            scores = self._matrix[rows] @ query
+        return self._top_k(scores, rows, k)
+
+    @staticmethod
+    def _best(scores: np.ndarray, k: int) -> np.ndarray:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+        else:
+            best = np.arange(len(scores))
+        return best[np.argsort(-scores[best])]
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, k: int) -> List[dict]:
+        best = self._best(scores, k)
+        return [
+            {**self.metadata[rows[i]], "score": float((1 + scores[i]) / 2)}
+            for i in best
+        ]
+
+    async def search(self, embedding: List[float], k: int) -> List[dict]:
+        return self.search_many(np.asarray([embedding]), k)[0]
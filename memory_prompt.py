@@ -0,0 +1,119 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# How a memory's battle result is shown in the prompt.
+OUTCOME_LABELS = {"win": "(won)", "loss": "(lost)", "tie": "(tie)"}
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+@dataclass
+class MemoryPromptConfig:
+    """How retrieved memories are condensed into the PAST EXPERIENCES section.
+
+    Memories are grouped into one line per action, with the count, best and mean
+    similarity and the outcomes behind them. A memory from the same battle as one
+    already in its group, or whose thought overlaps one by at least
+    ``duplicate_overlap`` (word Jaccard), is a near-duplicate: it adds to the counts
+    but its thought isn't repeated. Lines go in order of their best rank score until
+    ``token_budget`` is spent; tokens are estimated at ``chars_per_token`` characters.
+    """
+    enabled: bool = True
+    token_budget: int = 160
+    max_thought_chars: int = 200
+    duplicate_overlap: float = 0.6
+    chars_per_token: int = 4
+
+    def tokens(self, text: str) -> int:
+        return -(-len(text) // self.chars_per_token)
+
+
+@dataclass
+class MemorySummary:
+    text: str
+    memories: int       # memories represented in the text
+    lines: int
+    tokens: int
+    baseline_tokens: int  # the same memories, one full line each
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.baseline_tokens - self.tokens, 0)
+
+
+def memory_line(memory: dict) -> str:
+    """One memory in full, the format used before summarization."""
+    thought = memory.get("thought", "No reasoning.")
+    outcome = OUTCOME_LABELS.get(memory.get("outcome"), "")
+    fallback = "(fallback)" if memory.get("fallback_used") else ""
+    return (
+        f"- Similarity {memory['score']:.3f} {outcome} {fallback} → {thought} → "
+        f"Action: {memory['action_type']} '{memory['action_name']}'"
+    )
+
+
+def _words(text: Optional[str]) -> set:
+    return set(_WORD.findall((text or "").lower()))
+
+
+def _duplicate(a: dict, b: dict, overlap: float) -> bool:
+    if a.get("battle_id") is not None and a.get("battle_id") == b.get("battle_id"):
+        return True
+    words_a, words_b = _words(a.get("thought")), _words(b.get("thought"))
+    if not words_a or not words_b:
+        return words_a == words_b
+    return len(words_a & words_b) / len(words_a | words_b) >= overlap
+
+
+def _group_line(group: List[dict], thoughts: List[str]) -> str:
+    best = group[0]
+    scores = [m["score"] for m in group]
+    outcomes = [m.get("outcome") for m in group]
+    notes = [f"×{len(group)}" if len(group) > 1 else ""]
+    notes += [f"{outcomes.count(outcome)} {label.strip('()')}" for outcome, label in OUTCOME_LABELS.items() if outcome in outcomes]
+    fallbacks = sum(1 for m in group if m.get("fallback_used"))
+    notes.append(f"{fallbacks} fallback" if fallbacks else "")
+    notes = ", ".join(n for n in notes if n)
+
+    similarity = f"{best['score']:.3f}"
+    if len(group) > 1:
+        similarity += f" (avg {sum(scores) / len(scores):.3f})"
+    line = f"- {best['action_type']} '{best['action_name']}' Similarity {similarity}"
+    if notes:
+        line += f" [{notes}]"
+    if thoughts:
+        line += " → " + " / ".join(thoughts)
+    return line
+
+
+def summarize_memories(memories: List[dict], config: MemoryPromptConfig, max_groups: int) -> MemorySummary:
+    """Collapse, group and budget ``memories`` (best first) into prompt lines."""
+    groups: List[Tuple[Tuple[str, str], List[dict], List[dict]]] = []  # action, all memories, distinct ones
+    for memory in memories:
+        action = (memory["action_type"], memory["action_name"])
+        group = next((g for g in groups if g[0] == action), None)
+        if group is None:
+            groups.append((action, [memory], [memory]))
+            continue
+        group[1].append(memory)
+        # Near-duplicates add to the group's count and scores but not to its text.
+        if not any(_duplicate(memory, kept, config.duplicate_overlap) for kept in group[2]):
+            group[2].append(memory)
+
+    lines, represented, tokens = [], [], 0
+    for _, group, distinct in groups[:max_groups]:
+        thoughts = [m["thought"][:config.max_thought_chars] for m in distinct if m.get("thought")]
+        # Drop the least similar distinct thoughts until the line fits the budget.
+        for n in range(len(thoughts), -1, -1):
+            line = _group_line(group, thoughts[:n])
+            cost = config.tokens(line) + 1
+            if tokens + cost <= config.token_budget:
+                break
+        else:
+            break
+        lines.append(line)
+        represented.extend(group)
+        tokens += cost
+
+    baseline = sum(config.tokens(memory_line(m)) + 1 for m in represented)
+    return MemorySummary("\n".join(lines), len(represented), len(lines), tokens, baseline)
@@ -0,0 +1,106 @@
+"""Rebuild poke-env ``Battle`` objects from the observations stored in ``battle_logs``.
+
+An observation is what `_format_battle_state` rendered for the prompt, in either the
+text or the JSON state format. It carries enough to reconstruct both actives, the
+team's HP and status, the available moves with PP and the available switches, which
+is what `_get_battle_context` and the decision tiers read.
+"""
+import ast
+import json
+import logging
+import re
+
+from poke_env.environment.battle import Battle
+from poke_env.environment.move import Move
+from poke_env.environment.pokemon import Pokemon
+from poke_env.environment.status import Status
+
+from state_renderer import SECTION_SEPARATOR, BattleStateRenderer
+
+_TEAM_LINE = re.compile(r"^- (\S+): HP ([\d.]+)%( \(Fainted\))?, Status: (\w+)( \[ACTIVE\])?$", re.M)
+_POKEMON = re.compile(r": (\S+)\nType: .*\nHP: ([\d.]+)% .*\nStatus: (\w+)\nBoosts: (\{.*\})")
+_MOVE_LINE = re.compile(r"^- (\w+) \(Type: \w+, BP: [^,]*, Acc: [^,]*, PP: (\d+)/\d+,", re.M)
+_SWITCH_LINE = re.compile(r"^- (\S+) \(HP: ([\d.]+)%, Status: (\w+)\)$", re.M)
+_LIST_LINE = re.compile(r"^- (\S+)$", re.M)
+
+
+def _parse_text_observation(observation: str) -> dict:
+    sections = {}
+    for part in observation.split(SECTION_SEPARATOR):
+        title, _, body = part.partition("\n")
+        for name, section_title in BattleStateRenderer.TITLES.items():
+            if section_title.strip() == title.strip():
+                sections[name] = body
+
+    def pokemon(text: str) -> dict:
+        species, hp, status, boosts = _POKEMON.search(text).groups()
+        return {"species": species, "hp": float(hp) / 100, "status": status, "boosts": ast.literal_eval(boosts)}
+
+    return {
+        "team": [
+            {"species": s, "hp": float(hp) / 100, "status": status, "active": bool(active)}
+            for s, hp, _, status, active in _TEAM_LINE.findall(sections["team"])
+        ],
+        "active": pokemon(sections["active"]),
+        "opponent": pokemon(sections["opponent"]),
+        "opponent_team": _LIST_LINE.findall(sections["opponent_team"]),
+        "moves": [{"id": m, "pp": int(pp)} for m, pp in _MOVE_LINE.findall(sections["moves"])],
+        "switches": [s for s, _, _ in _SWITCH_LINE.findall(sections["switches"])],
+    }
+
+
+def _parse_json_observation(observation: str) -> dict:
+    state = json.loads(observation)
+    return {
+        "team": state["team"],
+        "active": state["active"],
+        "opponent": state["opponent"],
+        "opponent_team": state["opponent_team"],
+        "moves": state["moves"],
+        "switches": [s["species"] for s in state["switches"]],
+    }
+
+
+def _pokemon(species: str, state: dict, active: bool) -> Pokemon:
+    pokemon = Pokemon(gen=1, species=species)
+    pokemon._max_hp = 100
+    pokemon._current_hp = int(round(100 * state.get("hp", 1.0)))
+    pokemon._active = active
+    status = state.get("status")
+    if status and status != "None":
+        pokemon._status = Status[status]
+    pokemon._boosts.update(state.get("boosts", {}))
+    return pokemon
+
+
+def battle_from_observation(observation: str, tag: str = "battle-gen1ou-replay", turn: int = 1) -> Battle:
+    """Rebuild a ``Battle`` from a rendered observation (text or JSON state format)."""
+    if observation.lstrip().startswith("{"):
+        state = _parse_json_observation(observation)
+    else:
+        state = _parse_text_observation(observation)
+
+    battle = Battle(tag, "caveman_llm_bot1", logging.getLogger("observations"), gen=1)
+    battle._player_role = "p1"
+    battle._turn = turn
+
+    active_species = state["active"]["species"]
+    for member in state["team"]:
+        is_active = member["species"] == active_species
+        battle._team[f"p1: {member['species']}"] = _pokemon(
+            member["species"], {**member, **state["active"]} if is_active else member, is_active
+        )
+    active = battle._team[f"p1: {active_species}"]
+    for move_state in state["moves"]:
+        move = Move(move_state["id"], gen=1)
+        move._current_pp = move_state["pp"]
+        active._moves[move.id] = move
+
+    opponent_species = state["opponent"]["species"]
+    for species in state["opponent_team"]:
+        battle._opponent_team[f"p2: {species}"] = _pokemon(species, {}, False)
+    battle._opponent_team[f"p2: {opponent_species}"] = _pokemon(opponent_species, state["opponent"], True)
+
+    battle._available_moves = [active.moves[m["id"]] for m in state["moves"]]
+    battle._available_switches = [battle._team[f"p1: {s}"] for s in state["switches"]]
+    return battle
@@ -0,0 +1,388 @@
+"""Opponent model: what each opponent species has shown against us, kept as an in-memory index.
+
+    python opponent_stats.py --rebuild               # aggregate battle_logs into the checkpoint
+    python opponent_stats.py --rebuild --since 2026-01-01
+    python opponent_stats.py --show starmie snorlax  # print what the prompt gets for these species
+
+Per opponent species the index counts the battles and turns it was seen in, the moves
+it revealed (per battle), how often it switched out, into what and facing which of our
+Pokémon, and how our actions against it turned out. The player updates it as turns
+are logged; action outcomes are folded in when the battle ends. Every
+``checkpoint_interval_s`` it is written to a gzipped JSON checkpoint, which the next
+player starts from. ``--rebuild`` recomputes it from `battle_logs` with an aggregation
+that streams one battle (its turns in order) at a time through the same code.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from poke_env.data.gen_data import GenData
+
+from instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when the checkpoint layout changes; older checkpoints are ignored.
+OPPONENT_STATS_VERSION = 1
+
+# Turn log fields the index reads.
+PROJECTION = {
+    "_id": 0,
+    "turn": 1,
+    "active_pokemon": 1,
+    "opponent_active": 1,
+    "opponent_moves": 1,
+    "opponent_fainted": 1,
+    "action_type": 1,
+    "action_name": 1,
+}
+
+
+@dataclass
+class OpponentStatsConfig:
+    """The opponent-stats index behind the prompt's OPPONENT MODEL section and switch scoring.
+
+    ``path`` is the checkpoint loaded at start and rewritten at most every
+    ``checkpoint_interval_s`` when a battle ends (None keeps the index in memory only).
+    Species seen in fewer than ``min_battles`` battles are left out of the prompt and
+    the heuristic. The prompt lists at most ``top_n`` moves, switch targets and actions.
+    """
+    enabled: bool = True
+    path: Optional[str] = "opponent_stats.json.gz"
+    checkpoint_interval_s: float = 60.0
+    min_battles: int = 2
+    top_n: int = 4
+    gen: int = 1
+
+
+class SpeciesStats:
+    """Counters for one opponent species. ``actions`` maps ``"move:surf"`` to [uses, wins]."""
+
+    __slots__ = ("battles", "turns", "moves", "switches", "switch_targets", "switch_threats", "actions")
+
+    def __init__(self):
+        self.battles = 0
+        self.turns = 0
+        self.moves: Dict[str, int] = {}
+        self.switches = 0
+        self.switch_targets: Dict[str, int] = {}
+        self.switch_threats: Dict[str, int] = {}
+        self.actions: Dict[str, List[int]] = {}
+
+    def to_list(self) -> list:
+        return [self.battles, self.turns, self.moves, self.switches, self.switch_targets, self.switch_threats, self.actions]
+
+    @classmethod
+    def from_list(cls, values: list) -> "SpeciesStats":
+        stats = cls()
+        (stats.battles, stats.turns, stats.moves, stats.switches,
+         stats.switch_targets, stats.switch_threats, stats.actions) = values
+        return stats
+
+
+class _BattleTrack:
+    """What the index remembers about a running battle between two of its turns."""
+
+    __slots__ = ("opponent", "active", "seen", "moves", "actions")
+
+    def __init__(self):
+        self.opponent: Optional[str] = None
+        self.active: Optional[str] = None
+        self.seen = set()
+        self.moves = set()
+        self.actions: Dict[Tuple[str, str], int] = {}
+
+
+def _bump(counts: Dict[str, int], key: str, value: int = 1):
+    counts[key] = counts.get(key, 0) + value
+
+
+def _top(counts: Dict[str, int], n: int) -> List[Tuple[str, int]]:
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+def battle_turns_pipeline(since: Optional[datetime] = None) -> list:
+    """Aggregation over `battle_logs`: one document per battle with its outcome and its
+    turns in order, reduced to the fields the index reads."""
+    match = {"opponent_active": {"$ne": None}}
+    if since is not None:
+        match["timestamp"] = {"$gte": since}
+    turn = {field: f"${field}" for field in PROJECTION if field != "_id"}
+    return [
+        {"$match": match},
+        {"$sort": {"battle_id": 1, "turn": 1}},
+        {"$group": {"_id": "$battle_id", "outcome": {"$first": "$outcome"}, "turns": {"$push": turn}}},
+    ]
+
+
+class OpponentStats:
+    """Per-species opponent statistics with O(1) lookups.
+
+    `observe` takes each logged turn of a battle, in order, and `battle_finished` credits
+    the battle's actions with its outcome. `summary` and `threat_types` are cached per
+    species until one of its counters they show changes.
+    """
+
+    def __init__(self, config: Optional[OpponentStatsConfig] = None):
+        self.config = OpponentStatsConfig() if config is None else config
+        self.species: Dict[str, SpeciesStats] = {}
+        self._battles: Dict[str, _BattleTrack] = {}
+        self._summaries: Dict[str, Optional[str]] = {}
+        self._threats: Dict[str, Dict[float, Tuple[str, ...]]] = {}
+        moves = GenData.from_gen(self.config.gen).moves
+        # Attack type of every damaging move, for threat_types.
+        self._move_types = {
+            move_id: entry["type"].upper() for move_id, entry in moves.items() if entry.get("basePower")
+        }
+        self.observed = 0
+        self.checkpoints = 0
+        self._last_checkpoint = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.species)
+
+    def _stats(self, species: str) -> SpeciesStats:
+        stats = self.species.get(species)
+        if stats is None:
+            stats = self.species[species] = SpeciesStats()
+        return stats
+
+    def _changed(self, species: str):
+        self._summaries.pop(species, None)
+        self._threats.pop(species, None)
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+
+    def observe(self, doc: dict):
+        """Fold in one turn log (`ClaudePlayer._build_log_entry`) of a running battle."""
+        species = doc.get("opponent_active")
+        if not species:
+            return
+        track = self._battles.get(doc["battle_id"])
+        if track is None:
+            track = self._battles[doc["battle_id"]] = _BattleTrack()
+        stats = self._stats(species)
+        stats.turns += 1
+        self.observed += 1
+        changed = False
+        if species not in track.seen:
+            track.seen.add(species)
+            stats.battles += 1
+            changed = True
+
+        previous = track.opponent
+        if previous is not None and previous != species and previous not in (doc.get("opponent_fainted") or ()):
+            left = self._stats(previous)
+            left.switches += 1
+            _bump(left.switch_targets, species)
+            if track.active:
+                _bump(left.switch_threats, track.active)
+            self._changed(previous)
+
+        for move in doc.get("opponent_moves") or ():
+            if (species, move) not in track.moves:
+                track.moves.add((species, move))
+                _bump(stats.moves, move)
+                changed = True
+
+        action_type, action_name = doc.get("action_type"), doc.get("action_name")
+        if action_type in ("move", "switch") and action_name:
+            key = (species, f"{action_type}:{action_name}")
+            track.actions[key] = track.actions.get(key, 0) + 1
+
+        track.opponent, track.active = species, doc.get("active_pokemon")
+        if changed:
+            self._changed(species)
+
+    def battle_finished(self, battle_id: str, outcome: Optional[str]):
+        """Credit the battle's actions with its outcome, then checkpoint if one is due."""
+        track = self._battles.pop(battle_id, None)
+        if track is not None and outcome is not None:
+            for (species, action), uses in track.actions.items():
+                counts = self._stats(species).actions.setdefault(action, [0, 0])
+                counts[0] += uses
+                counts[1] += uses if outcome == "win" else 0
+                self._changed(species)
+        self.maybe_checkpoint()
+
+    def add_battle(self, battle: dict):
+        """One `battle_turns_pipeline` document: its turns, in order, then its outcome."""
+        battle_id = battle["_id"]
+        for turn in battle["turns"]:
+            self.observe({**turn, "battle_id": battle_id})
+        # A battle still running when aggregated has no outcome to credit its actions with.
+        self.battle_finished(battle_id, battle.get("outcome"))
+
+    @classmethod
+    def rebuild(cls, battles: Iterable[dict], config: Optional[OpponentStatsConfig] = None) -> "OpponentStats":
+        """A fresh index from `battle_turns_pipeline` documents (e.g. its aggregation cursor)."""
+        config = OpponentStatsConfig() if config is None else config
+        # Checkpointing waits until the whole rebuild is in.
+        index = cls(replace(config, path=None))
+        for battle in battles:
+            index.add_battle(battle)
+        index.config = config
+        return index
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+
+    def get(self, species: Optional[str]) -> Optional[SpeciesStats]:
+        stats = self.species.get(species) if species else None
+        if stats is None or stats.battles < self.config.min_battles:
+            return None
+        return stats
+
+    def summary(self, species: Optional[str]) -> Optional[str]:
+        """The prompt's OPPONENT MODEL line for ``species``, or None if it's rarely been seen."""
+        if not species:
+            return None
+        if species in self._summaries:
+            return self._summaries[species]
+        stats = self.get(species)
+        text = None if stats is None else self._render(species, stats)
+        self._summaries[species] = text
+        return text
+
+    def _render(self, species: str, stats: SpeciesStats) -> str:
+        n = self.config.top_n
+        parts = [f"{species} (seen in {stats.battles} battles)"]
+        if stats.moves:
+            moves = ", ".join(f"{move} {count / stats.battles:.0%}" for move, count in _top(stats.moves, n))
+            parts.append(f"moves revealed: {moves}")
+        if stats.switches:
+            targets = ", ".join(f"{target} ({count})" for target, count in _top(stats.switch_targets, n))
+            switch = f"switched out {stats.switches} times, into {targets}"
+            if stats.switch_threats:
+                switch += f"; facing {', '.join(f'{t} ({c})' for t, c in _top(stats.switch_threats, n))}"
+            parts.append(switch)
+        if stats.actions:
+            ranked = sorted(stats.actions.items(), key=lambda item: (-item[1][0], item[0]))[:n]
+            actions = ", ".join(f"{action} {wins / uses:.0%} won ({uses} turns)" for action, (uses, wins) in ranked)
+            parts.append(f"our actions: {actions}")
+        return ". ".join(parts) + "."
+
+    def threat_types(self, species: Optional[str], share: float) -> Tuple[str, ...]:
+        """Attack types of the damaging moves ``species`` revealed in at least ``share`` of its battles."""
+        if not species:
+            return ()
+        cached = self._threats.setdefault(species, {})
+        threats = cached.get(share)
+        if threats is None:
+            stats = self.get(species)
+            threats = () if stats is None else tuple(sorted({
+                self._move_types[move]
+                for move, count in stats.moves.items()
+                if move in self._move_types and count >= share * stats.battles
+            }))
+            cached[share] = threats
+        return threats
+
+    # ----------------------------
+    # Checkpoints
+    # ----------------------------
+
+    def to_dict(self) -> dict:
+        return {
+            "version": OPPONENT_STATS_VERSION,
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "species": {species: stats.to_list() for species, stats in self.species.items()},
+        }
+
+    def save(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the checkpoint atomically; returns its path."""
+        path = path or self.config.path
+        if not path:
+            return None
+        data = json.dumps(self.to_dict(), separators=(",", ":")).encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(gzip.compress(data, compresslevel=6))
+        os.replace(tmp_path, path)
+        self.checkpoints += 1
+        self._last_checkpoint = time.monotonic()
+        return path
+
+    def maybe_checkpoint(self) -> bool:
+        if not self.config.path or time.monotonic() - self._last_checkpoint < self.config.checkpoint_interval_s:
+            return False
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning("⚠️ Opponent stats checkpoint failed: %s", e)
+            return False
+        return True
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Replace the counters with a checkpoint's; False if there is none or it's outdated."""
+        path = path or self.config.path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(gzip.decompress(f.read()))
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable opponent stats checkpoint %s: %s", path, e)
+            return False
+        if data.get("version") != OPPONENT_STATS_VERSION:
+            logger.warning("⚠️ Ignoring opponent stats checkpoint %s (version %s)", path, data.get("version"))
+            return False
+        self.species = {species: SpeciesStats.from_list(values) for species, values in data["species"].items()}
+        self._summaries.clear()
+        self._threats.clear()
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "species": len(self.species),
+            "running_battles": len(self._battles),
+            "observed": self.observed,
+            "checkpoints": self.checkpoints,
+        }
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="pokemon_ai")
+    parser.add_argument("--collection", default="battle_logs")
+    parser.add_argument("--checkpoint", default=OpponentStatsConfig.path)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the checkpoint from battle_logs")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only turns logged from this date")
+    parser.add_argument("--show", nargs="*", default=[], help="species to print")
+    args = parser.parse_args()
+    config = OpponentStatsConfig(path=args.checkpoint)
+
+    if args.rebuild:
+        mongo_uri = os.getenv("MONGO_URI")
+        if mongo_uri is None:
+            raise ValueError("MONGO_URI environment variable is not set.")
+        collection = MongoClient(mongo_uri)[args.db][args.collection]
+        started = time.perf_counter()
+        cursor = collection.aggregate(battle_turns_pipeline(args.since), allowDiskUse=True, batchSize=100)
+        index = OpponentStats.rebuild(cursor, config)
+        index.save()
+        print(
+            f"Rebuilt {len(index)} species from {index.observed} turns "
+            f"in {time.perf_counter() - started:.1f}s → {args.checkpoint}"
+        )
+    else:
+        index = OpponentStats(config)
+        index.load()
+    for species in args.show:
+        print(index.summary(species) or f"{species}: not enough battles")
+
+
+if __name__ == "__main__":
+    main()
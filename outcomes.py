@@ -0,0 +1,194 @@
+"""Battle outcomes: what gets written when a battle ends, how they rerank memories, and the
+win-rate-by-memory-usage report.
+
+    python outcomes.py                 # win rate by the share of turns that used memories
+    python outcomes.py --since 2026-01-01
+"""
+import argparse
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from poke_env.environment.battle import Battle
+
+OUTCOMES = ("win", "loss", "tie")
+# Shares of a battle's turns that had memories in the prompt; 0 is its own bucket.
+USAGE_BOUNDARIES = [0, 1e-9, 0.25, 0.5, 0.75, 1.000001]
+
+
+def utc_now() -> datetime:
+    """Naive UTC now, like the dates pymongo reads back, so stored timestamps compare with it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def battle_outcome(battle: Battle) -> str:
+    if battle.won:
+        return "win"
+    if battle.lost:
+        return "loss"
+    return "tie"
+
+
+def outcome_record(battle: Battle) -> dict:
+    """The ``wins`` document for a finished battle."""
+    return {
+        "battle_id": battle.battle_tag,
+        "timestamp": utc_now(),
+        "player_username": battle.player_username,
+        "opponent_username": battle.opponent_username,
+        "outcome": battle_outcome(battle),
+        "won": bool(battle.won),
+        "turns": battle.turn,
+    }
+
+
+def outcome_update(battle: Battle) -> dict:
+    """``$set`` applied to every `battle_logs` turn of the battle once it ends."""
+    return {"$set": {"outcome": battle_outcome(battle), "won": bool(battle.won), "battle_turns": battle.turn}}
+
+
+@dataclass
+class MemoryRanking:
+    """How retrieved memories are reranked before they go into the prompt.
+
+    ``candidates`` memories are fetched by vector similarity and rescored as
+    ``similarity * outcome weight * recency``, where recency decays from 1 towards
+    ``recency_floor`` with a half-life of ``half_life_days``. At most ``k`` are kept,
+    and only those within ``min_relative_score`` of the best one. Memories from
+    battles still running (or logged before outcomes were recorded) get
+    ``unknown_weight``. ``exclude_losses`` drops lost battles altogether, in the
+    `$vectorSearch` filter when the backend is Atlas.
+    """
+    enabled: bool = True
+    candidates: int = 12
+    k: int = 3
+    win_weight: float = 1.0
+    loss_weight: float = 0.6
+    tie_weight: float = 0.8
+    unknown_weight: float = 0.8
+    half_life_days: float = 30.0
+    recency_floor: float = 0.5
+    min_relative_score: float = 0.85
+    exclude_losses: bool = False
+
+    def outcome_weight(self, outcome: Optional[str]) -> float:
+        return {"win": self.win_weight, "loss": self.loss_weight, "tie": self.tie_weight}.get(outcome, self.unknown_weight)
+
+    def recency(self, timestamp, now: datetime) -> float:
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.fromisoformat(timestamp)
+            except ValueError:
+                timestamp = None
+        if not isinstance(timestamp, datetime) or not self.half_life_days:
+            return 1.0
+        age_days = max((now - timestamp.replace(tzinfo=None)).total_seconds() / 86400, 0.0)
+        return self.recency_floor + (1 - self.recency_floor) * 0.5 ** (age_days / self.half_life_days)
+
+    def rerank(self, memories: List[dict], now: Optional[datetime] = None, k: Optional[int] = None) -> List[dict]:
+        """Top ``k`` (default ``self.k``) memories by combined score; each gets ``rank_score``
+        next to its raw ``score``."""
+        now = now or utc_now()
+        ranked = []
+        for memory in memories:
+            if self.exclude_losses and memory.get("outcome") == "loss":
+                continue
+            rank_score = memory["score"] * self.outcome_weight(memory.get("outcome")) * self.recency(memory.get("timestamp"), now)
+            ranked.append({**memory, "rank_score": rank_score})
+        ranked.sort(key=lambda m: m["rank_score"], reverse=True)
+        if not ranked:
+            return ranked
+        cutoff = ranked[0]["rank_score"] * self.min_relative_score
+        return [m for m in ranked[:self.k if k is None else k] if m["rank_score"] >= cutoff]
+
+
+# ----------------------------
+# Report
+# ----------------------------
+
+def win_rate_by_memory_usage_pipeline(since: Optional[datetime] = None) -> list:
+    """Aggregation over `battle_logs`: finished battles bucketed by the share of their
+    turns that had retrieved memories in the prompt, with the win rate per bucket."""
+    match = {"outcome": {"$in": list(OUTCOMES)}}
+    if since is not None:
+        match["timestamp"] = {"$gte": since}
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": "$battle_id",
+                "won": {"$first": "$won"},
+                "turns": {"$sum": 1},
+                "llm_turns": {"$sum": {"$cond": [{"$eq": ["$decision_tier", "llm"]}, 1, 0]}},
+                "memory_turns": {"$sum": {"$cond": [{"$gt": ["$memories_used", 0]}, 1, 0]}},
+                "memories": {"$sum": {"$ifNull": ["$memories_used", 0]}},
+            }
+        },
+        {"$set": {"usage": {"$divide": ["$memory_turns", "$turns"]}}},
+        {
+            "$bucket": {
+                "groupBy": "$usage",
+                "boundaries": USAGE_BOUNDARIES,
+                "default": "unknown",
+                "output": {
+                    "battles": {"$sum": 1},
+                    "wins": {"$sum": {"$cond": ["$won", 1, 0]}},
+                    "avg_turns": {"$avg": "$turns"},
+                    "avg_llm_turns": {"$avg": "$llm_turns"},
+                    "avg_memories": {"$avg": "$memories"},
+                },
+            }
+        },
+        {"$set": {"win_rate": {"$divide": ["$wins", "$battles"]}}},
+    ]
+
+
+def win_rate_by_memory_usage(collection, since: Optional[datetime] = None) -> List[dict]:
+    return list(collection.aggregate(win_rate_by_memory_usage_pipeline(since)))
+
+
+def _bucket_label(lower) -> str:
+    if lower == 0:
+        return "none"
+    if lower == USAGE_BOUNDARIES[1]:
+        return f"(0, {USAGE_BOUNDARIES[2]:.0%})"
+    i = USAGE_BOUNDARIES.index(lower)
+    return f"[{lower:.0%}, {min(USAGE_BOUNDARIES[i + 1], 1):.0%}]"
+
+
+def print_report(rows: List[dict]):
+    print(f"{'memory turns':>14} {'battles':>8} {'wins':>6} {'win rate':>9} {'turns':>6} {'llm turns':>10} {'memories':>9}")
+    for row in rows:
+        label = _bucket_label(row["_id"]) if row["_id"] != "unknown" else "unknown"
+        print(
+            f"{label:>14} {row['battles']:>8} {row['wins']:>6} {row['win_rate']:>9.1%} "
+            f"{row['avg_turns']:>6.1f} {row['avg_llm_turns']:>10.1f} {row['avg_memories']:>9.1f}"
+        )
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="pokemon_ai")
+    parser.add_argument("--collection", default="battle_logs")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only turns logged from this date")
+    parser.add_argument("--json", action="store_true", help="print the raw buckets as JSON")
+    args = parser.parse_args()
+
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri is None:
+        raise ValueError("MONGO_URI environment variable is not set.")
+    rows = win_rate_by_memory_usage(MongoClient(mongo_uri)[args.db][args.collection], args.since)
+    if args.json:
+        print(json.dumps(rows, indent=2, default=str))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
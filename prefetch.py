@@ -0,0 +1,257 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from poke_env.environment.battle import Battle
+from poke_env.environment.pokemon import Pokemon
+
+from instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+
+class ContextState(NamedTuple):
+    """The battle fields `battle_context` is built from."""
+    active: str
+    opponent: str
+    active_hp: float
+    opponent_hp: float
+    moves: tuple
+    switches: tuple
+
+
+def context_state(battle: Battle) -> ContextState:
+    active, opponent = battle.active_pokemon, battle.opponent_active_pokemon
+    return ContextState(
+        active.species.lower(),
+        opponent.species.lower(),
+        active.current_hp_fraction,
+        opponent.current_hp_fraction,
+        tuple(m.id for m in battle.available_moves),
+        tuple(p.species.lower() for p in battle.available_switches),
+    )
+
+
+def state_key(state: ContextState) -> tuple:
+    """What a prediction has to get right to be used: HP is left out, list order too."""
+    return state.active, state.opponent, frozenset(state.moves), frozenset(state.switches)
+
+
+def predict_states(battle: Battle, chosen=None, faint_hp: float = 0.5) -> Iterator[ContextState]:
+    """Likely states of the battle's next request, most likely first, given our ``chosen``
+    move or switch: the same actives (or our switch-in), our active fainted and a forced
+    switch, then each opponent Pokémon we've seen coming in. HPs are today's."""
+    active, opponent = battle.active_pokemon, battle.opponent_active_pokemon
+    if active is None or opponent is None:
+        return
+    current = context_state(battle)
+    if isinstance(chosen, Pokemon):
+        bench = tuple(p.species.lower() for p in battle.available_switches if p is not chosen)
+        if not active.fainted:
+            bench += (current.active,)
+        ours = current._replace(
+            active=chosen.species.lower(),
+            active_hp=chosen.current_hp_fraction,
+            moves=tuple(chosen.moves),
+            switches=bench,
+        )
+    else:
+        ours = current
+    yield ours
+    if not isinstance(chosen, Pokemon) and ours.switches and active.current_hp_fraction <= faint_hp:
+        yield ours._replace(active_hp=0.0, moves=())
+    for pkmn in battle.opponent_team.values():
+        if not pkmn.active and not pkmn.fainted:
+            yield ours._replace(opponent=pkmn.species.lower(), opponent_hp=pkmn.current_hp_fraction)
+
+
+@dataclass
+class PrefetchConfig:
+    """Speculative embedding and memory search for a battle's next turn.
+
+    After each order goes out, up to ``max_states`` likely next states are embedded and
+    searched in the background, while the opponent moves. Predicting them may take at
+    most ``cpu_budget_ms`` of event-loop time, and at most ``max_in_flight`` prefetches
+    run at once across battles (each costs an embedding and a search); predictions past
+    either budget are skipped. When the real request arrives, the prefetch matching it
+    is used and the others are cancelled.
+    """
+    enabled: bool = True
+    max_states: int = 3
+    max_in_flight: int = 8
+    cpu_budget_ms: float = 2.0
+    # Below this HP fraction our active fainting (and a forced switch) is predicted too.
+    faint_hp: float = 0.5
+
+
+class Prefetch:
+    __slots__ = ("key", "context", "task", "elapsed_s")
+
+    def __init__(self, key: tuple, context: str):
+        self.key = key
+        self.context = context
+        self.task: Optional[asyncio.Task] = None
+        self.elapsed_s = 0.0
+
+
+class Prefetcher:
+    """Runs `PrefetchConfig` predictions through ``embed`` and ``search`` and hands the
+    memory candidates of the right one to the next LLM turn.
+
+    ``context_fn`` formats a `ContextState` the way turns are embedded. The hit rate
+    counts LLM turns. ``saved_ms`` adds up the prefetch's own duration, less any wait for
+    it to finish. That is a lower bound: a hit also takes the turn's own embedding off
+    its critical path.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Awaitable[Optional[List[float]]]],
+        search: Callable[[List[float]], Awaitable[List[dict]]],
+        context_fn: Callable[[ContextState], str],
+        config: Optional[PrefetchConfig] = None,
+    ):
+        self.embed = embed
+        self.search = search
+        self.context_fn = context_fn
+        self.config = PrefetchConfig() if config is None else config
+        self._battles: Dict[str, Dict[tuple, Prefetch]] = {}
+        self._tasks = set()
+        self.scheduled = 0
+        self.skipped = 0
+        self.over_budget = 0
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.wasted = 0
+        self.saved_s = 0.0
+        self.cpu_s = 0.0
+
+    def schedule(self, battle: Battle, chosen=None) -> int:
+        """Start prefetching the battle's likely next states; returns how many were started."""
+        config = self.config
+        if not config.enabled or battle.finished:
+            return 0
+        self.battle_finished(battle.battle_tag)
+        started = time.perf_counter()
+        entries: Dict[tuple, Prefetch] = {}
+        try:
+            for state in predict_states(battle, chosen, config.faint_hp):
+                if len(entries) >= config.max_states:
+                    break
+                if (time.perf_counter() - started) * 1000 > config.cpu_budget_ms:
+                    self.over_budget += 1
+                    break
+                key = state_key(state)
+                if key in entries:
+                    continue
+                if len(self._tasks) >= config.max_in_flight:
+                    self.skipped += 1
+                    continue
+                entry = entries[key] = Prefetch(key, self.context_fn(state))
+                entry.task = asyncio.get_running_loop().create_task(self._run(entry))
+                self._tasks.add(entry.task)
+                entry.task.add_done_callback(self._done)
+        except Exception as e:
+            logger.debug("🔮 Prefetch prediction failed: %s", e, extra={"battle": battle.battle_tag})
+        self.cpu_s += time.perf_counter() - started
+        self.scheduled += len(entries)
+        if entries:
+            self._battles[battle.battle_tag] = entries
+        return len(entries)
+
+    async def _run(self, entry: Prefetch) -> Optional[List[dict]]:
+        started = time.perf_counter()
+        embedding = await self.embed(entry.context)
+        results = None if embedding is None else await self.search(embedding)
+        entry.elapsed_s = time.perf_counter() - started
+        return results
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("🔮 Prefetch failed: %s", task.exception())
+
+    def take(self, battle: Battle) -> Optional[Prefetch]:
+        """The prefetch matching the battle's actual state, if any. The others are cancelled."""
+        entries = self._battles.pop(battle.battle_tag, None)
+        if not entries:
+            return None
+        try:
+            entry = entries.pop(state_key(context_state(battle)), None)
+        except AttributeError:  # no active Pokémon yet
+            entry = None
+        for other in entries.values():
+            self._discard(other)
+        return entry
+
+    async def resolve(self, entry: Optional[Prefetch], deadline: Optional[float] = None) -> Optional[List[dict]]:
+        """Memory candidates for an LLM turn from its prefetch (waiting for it if it's
+        still running), or None on a miss.
+
+        The wait ends at ``deadline`` (event-loop time): a prefetch still running then is
+        cancelled and counted as a miss, so a stalled search can't hold the turn.
+        """
+        if entry is None:
+            self.misses += 1
+            return None
+        started = time.perf_counter()
+        if not entry.task.done():
+            timeout = None if deadline is None else max(deadline - asyncio.get_running_loop().time(), 0.0)
+            await asyncio.wait({entry.task}, timeout=timeout)
+            if not entry.task.done():
+                entry.task.cancel()
+                self.timeouts += 1
+                self.misses += 1
+                return None
+            self.partial_hits += 1
+        waited = time.perf_counter() - started
+        task = entry.task
+        results = None if task.cancelled() or task.exception() is not None else task.result()
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_s += max(0.0, entry.elapsed_s - waited)
+        return results
+
+    def drop(self, entry: Optional[Prefetch]):
+        """The turn was decided without the LLM."""
+        if entry is not None:
+            self._discard(entry)
+
+    def _discard(self, entry: Prefetch):
+        if entry.task.done():
+            self.wasted += 1
+        else:
+            entry.task.cancel()
+            self.cancelled += 1
+
+    def battle_finished(self, battle_tag: str):
+        for entry in self._battles.pop(battle_tag, {}).values():
+            self._discard(entry)
+
+    def cancel_all(self):
+        for battle_tag in list(self._battles):
+            self.battle_finished(battle_tag)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "over_budget": self.over_budget,
+            "in_flight": len(self._tasks),
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "wasted": self.wasted,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_ms": self.saved_s * 1000,
+            "cpu_ms": self.cpu_s * 1000,
+        }
@@ -0,0 +1,262 @@
+import json
+from typing import Optional
+
+from poke_env.environment.battle import Battle
+
+from helpers import TYPE_INDEX, TypeEffectivenessTable
+from matchups import MatchupTable
+
+SECTION_SEPARATOR = "\n" + "-" * 40 + "\n"
+
+
+def _status(pkmn) -> str:
+    return pkmn.status.name if pkmn.status else "None"
+
+
+def _types(pkmn) -> tuple:
+    return tuple(t.name for t in pkmn.types)
+
+
+def _pokemon_key(pkmn) -> tuple:
+    return (pkmn.species, _types(pkmn), pkmn.current_hp_fraction, pkmn.fainted, _status(pkmn), tuple(pkmn.boosts.items()))
+
+
+class BattleStateRenderer:
+    """Renders `_format_battle_state` for one battle, section by section.
+
+    Each section is cached together with a key built from the battle fields it reads,
+    and only re-rendered when that key changes between turns. ``mode="json"`` renders
+    a compact JSON object instead of the prose sections, which costs far fewer prompt
+    tokens. Given the battle's `MatchupTable`, a ``matchups`` section summarizes our
+    standing members against the opponent's active Pokémon from the precomputed arrays.
+    """
+
+    SECTIONS = ("team", "active", "type_advantage", "opponent", "opponent_team", "moves", "switches")
+
+    TITLES = {
+        "team": "📋 YOUR TEAM STATUS:\n",
+        "active": "⚡ YOUR ACTIVE POKÉMON:\n",
+        "type_advantage": "🛡️ TYPE ADVANTAGE:\n",
+        "opponent": "💥 OPPONENT ACTIVE:\n",
+        "opponent_team": "🌐 OPPONENT KNOWN TEAM:\n",
+        "moves": "⚔️ AVAILABLE MOVES:\n",
+        "switches": "🔁 AVAILABLE SWITCHES:\n",
+        "matchups": "🧮 MATCHUPS (precomputed):\n",
+    }
+
+    def __init__(self, type_table: TypeEffectivenessTable, mode: str = "text", matchups: Optional[MatchupTable] = None):
+        if mode not in ("text", "json"):
+            raise ValueError(f"Unknown battle state format: {mode}")
+        self.type_table = type_table
+        self.mode = mode
+        self.matchups = matchups
+        self.sections = self.SECTIONS + (("matchups",) if matchups is not None else ())
+        self._cache = {}
+        self.renders = 0
+        self.reuses = 0
+
+    def render(self, battle: Battle) -> str:
+        parts = []
+        for section in self.sections:
+            key = getattr(self, f"_{section}_key")(battle)
+            cached = self._cache.get(section)
+            if cached is not None and cached[0] == key:
+                self.reuses += 1
+                parts.append(cached[1])
+                continue
+            rendered = getattr(self, f"_{section}_{self.mode}")(battle)
+            self._cache[section] = (key, rendered)
+            self.renders += 1
+            parts.append(rendered)
+
+        if self.mode == "json":
+            return "{" + ",".join(f'"{section}":{part}' for section, part in zip(self.sections, parts)) + "}"
+        return SECTION_SEPARATOR.join(self.TITLES[section] + part for section, part in zip(self.sections, parts))
+
+    def clear(self):
+        self._cache.clear()
+
+    # ----------------------------
+    # Section keys
+    # ----------------------------
+
+    def _team_key(self, battle: Battle) -> tuple:
+        return tuple(
+            (pkmn.species, pkmn.current_hp_fraction, _status(pkmn), pkmn.fainted, pkmn.active)
+            for pkmn in battle.team.values()
+        )
+
+    def _active_key(self, battle: Battle) -> tuple:
+        return _pokemon_key(battle.active_pokemon)
+
+    def _type_advantage_key(self, battle: Battle) -> tuple:
+        active = battle.active_pokemon
+        return (active.species, _types(active), _types(battle.opponent_active_pokemon))
+
+    def _opponent_key(self, battle: Battle) -> tuple:
+        return _pokemon_key(battle.opponent_active_pokemon)
+
+    def _opponent_team_key(self, battle: Battle) -> tuple:
+        return (battle.opponent_active_pokemon.species, tuple(p.species for p in battle.opponent_team.values()))
+
+    def _moves_key(self, battle: Battle) -> tuple:
+        opponent = battle.opponent_active_pokemon
+        return (opponent.species, _types(opponent)) + tuple(
+            (m.id, m.type.name, m.base_power, m.accuracy, m.current_pp, m.max_pp, m.category.name)
+            for m in battle.available_moves
+        )
+
+    def _switches_key(self, battle: Battle) -> tuple:
+        return tuple((p.species, p.current_hp_fraction, _status(p)) for p in battle.available_switches)
+
+    def _matchups_key(self, battle: Battle) -> tuple:
+        return (battle.opponent_active_pokemon.species, tuple(p.species for p in battle.team.values() if not p.fainted))
+
+    # ----------------------------
+    # Text sections
+    # ----------------------------
+
+    def _team_text(self, battle: Battle) -> str:
+        your_team_info = "Your full team status:\n"
+        for pkmn in battle.team.values():
+            hp_pct = pkmn.current_hp_fraction * 100
+            fainted_str = " (Fainted)" if pkmn.fainted else ""
+            active_str = " [ACTIVE]" if pkmn == battle.active_pokemon else ""
+            your_team_info += f"- {pkmn.species}: HP {hp_pct:.1f}%{fainted_str}, Status: {_status(pkmn)}{active_str}\n"
+        return your_team_info.strip()
+
+    @staticmethod
+    def _pokemon_text(title: str, pkmn) -> str:
+        return (
+            f"{title}: {pkmn.species}\n"
+            f"Type: {' / '.join(t.name for t in pkmn.types)}\n"
+            f"HP: {pkmn.current_hp_fraction * 100:.1f}% ({'Fainted' if pkmn.fainted else 'Active'})\n"
+            f"Status: {_status(pkmn)}\n"
+            f"Boosts: {pkmn.boosts}"
+        )
+
+    def _active_text(self, battle: Battle) -> str:
+        return self._pokemon_text("Your active Pokemon", battle.active_pokemon)
+
+    def _type_advantage_text(self, battle: Battle) -> str:
+        opponent_type_list = []
+        opp = battle.opponent_active_pokemon
+        if opp.type_1:
+            opponent_type_list.append(opp.type_1.name)
+            if opp.type_2:
+                opponent_type_list.append(opp.type_2.name)
+        return self.type_table.describe(battle.active_pokemon, opponent_type_list) or "No opponent type advantage."
+
+    def _opponent_text(self, battle: Battle) -> str:
+        return self._pokemon_text("Opponent's active Pokemon", battle.opponent_active_pokemon)
+
+    def _opponent_team_text(self, battle: Battle) -> str:
+        known_opponent_pokemon = {battle.opponent_active_pokemon.species}
+        known_opponent_pokemon.update(p.species for p in battle.opponent_team.values())
+        opponent_team_info = "Opponent's known Pokémon:\n"
+        for species in sorted(known_opponent_pokemon):
+            opponent_team_info += f"- {species}\n"
+        return opponent_team_info.strip()
+
+    def _moves_text(self, battle: Battle) -> str:
+        available_moves_info = "Available moves:\n"
+        if battle.available_moves:
+            for move in battle.available_moves:
+                effectiveness = self.type_table.describe(
+                    battle.opponent_active_pokemon, [move.type.name]
+                ) or "Neutral effectiveness"
+                available_moves_info += (
+                    f"- {move.id} (Type: {move.type.name}, BP: {move.base_power}, "
+                    f"Acc: {move.accuracy}, PP: {move.current_pp}/{move.max_pp}, "
+                    f"Cat: {move.category.name}) - {effectiveness}\n"
+                )
+        else:
+            available_moves_info += "- None (Must switch or Struggle)\n"
+        return available_moves_info.strip()
+
+    def _switches_text(self, battle: Battle) -> str:
+        available_switches_info = "Available switches (non-fainted, not active):\n"
+        if battle.available_switches:
+            for pkmn in battle.available_switches:
+                available_switches_info += (
+                    f"- {pkmn.species} (HP: {pkmn.current_hp_fraction * 100:.1f}%, "
+                    f"Status: {_status(pkmn)})\n"
+                )
+        else:
+            available_switches_info += "- None\n"
+        return available_switches_info.strip()
+
+    def _matchups_text(self, battle: Battle) -> str:
+        return self.matchups.summary(*self._matchups_key(battle))
+
+    # ----------------------------
+    # JSON sections
+    # ----------------------------
+
+    @staticmethod
+    def _dumps(value) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    def _multiplier_row(self, defender):
+        return self.type_table.multiplier_row(*self.type_table.defender_types(defender))
+
+    @staticmethod
+    def _pokemon_json(pkmn) -> dict:
+        data = {"species": pkmn.species, "types": list(_types(pkmn)), "hp": round(pkmn.current_hp_fraction, 2)}
+        if pkmn.status:
+            data["status"] = pkmn.status.name
+        boosts = {stat: value for stat, value in pkmn.boosts.items() if value}
+        if boosts:
+            data["boosts"] = boosts
+        return data
+
+    def _team_json(self, battle: Battle) -> str:
+        team = []
+        for pkmn in battle.team.values():
+            entry = {"species": pkmn.species, "hp": round(pkmn.current_hp_fraction, 2)}
+            if pkmn.status:
+                entry["status"] = pkmn.status.name
+            if pkmn.active:
+                entry["active"] = True
+            team.append(entry)
+        return self._dumps(team)
+
+    def _active_json(self, battle: Battle) -> str:
+        return self._dumps(self._pokemon_json(battle.active_pokemon))
+
+    def _type_advantage_json(self, battle: Battle) -> str:
+        # Multiplier of each opponent STAB type against our active Pokémon.
+        row = self._multiplier_row(battle.active_pokemon)
+        return self._dumps({t: float(row[TYPE_INDEX[t]]) for t in _types(battle.opponent_active_pokemon)})
+
+    def _opponent_json(self, battle: Battle) -> str:
+        return self._dumps(self._pokemon_json(battle.opponent_active_pokemon))
+
+    def _opponent_team_json(self, battle: Battle) -> str:
+        known = {battle.opponent_active_pokemon.species}
+        known.update(p.species for p in battle.opponent_team.values())
+        return self._dumps(sorted(known))
+
+    def _moves_json(self, battle: Battle) -> str:
+        row = self._multiplier_row(battle.opponent_active_pokemon)
+        return self._dumps([
+            {
+                "id": move.id,
+                "type": move.type.name,
+                "bp": move.base_power,
+                "acc": move.accuracy,
+                "pp": move.current_pp,
+                "cat": move.category.name,
+                "eff": float(row[TYPE_INDEX[move.type.name]]),
+            }
+            for move in battle.available_moves
+        ])
+
+    def _switches_json(self, battle: Battle) -> str:
+        return self._dumps([
+            {"species": p.species, "hp": round(p.current_hp_fraction, 2), **({"status": p.status.name} if p.status else {})}
+            for p in battle.available_switches
+        ])
+
+    def _matchups_json(self, battle: Battle) -> str:
+        return self.matchups.summary(*self._matchups_key(battle), mode="json")
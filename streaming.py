@@ -0,0 +1,80 @@
+import json
+import re
+from typing import Optional
+
+ACTION_KEYS = ("move", "switch")
+_STRING_FIELD = r'"{key}"\s*:\s*"((?:[^"\\]|\\.)*)"'
+
+
+class IncrementalDecisionParser:
+    """Finds the decision JSON object in a streamed LLM reply as the text arrives.
+
+    `feed` tracks brace depth outside of strings and returns the first complete
+    top-level object that parses and names a move or switch, so the caller can stop
+    reading the stream right there. `partial` salvages whatever fields are already
+    complete when the turn deadline hits first.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._scan = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.decision: Optional[dict] = None
+
+    def feed(self, chunk: str) -> Optional[dict]:
+        if self.decision is not None:
+            return self.decision
+        self.text += chunk
+        for i in range(self._scan, len(self.text)):
+            char = self.text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._start is not None:
+                self._in_string = True
+            elif char == "{":
+                if self._start is None:
+                    self._start = i
+                self._depth += 1
+            elif char == "}" and self._start is not None:
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self._parse(self.text[self._start:i + 1])
+                    self._start = None
+                    if candidate is not None:
+                        self._scan = i + 1
+                        self.decision = candidate
+                        return candidate
+        self._scan = len(self.text)
+        return None
+
+    @staticmethod
+    def _parse(text: str) -> Optional[dict]:
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(obj, dict) and any(isinstance(obj.get(k), str) for k in ACTION_KEYS):
+            return obj
+        return None
+
+    def partial(self) -> Optional[dict]:
+        """Best-effort decision from an unfinished reply: needs a complete move/switch value."""
+        if self.decision is not None:
+            return self.decision
+        partial = {}
+        for key in ACTION_KEYS + ("thought",):
+            match = re.search(_STRING_FIELD.format(key=key), self.text)
+            if match:
+                partial[key] = json.loads(f'"{match.group(1)}"')
+        if not any(k in partial for k in ACTION_KEYS):
+            return None
+        partial["partial"] = True
+        return partial